@@ -0,0 +1,114 @@
+from typing import Dict, List, Any, Tuple
+from os.path import join, dirname, abspath
+from os import makedirs, environ, pathsep
+from time import strftime
+import subprocess
+import argparse
+import json
+import sys
+import yaml
+
+import pandas as pd
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+repository_dir = abspath(join(dirname(abspath(__file__)), "../"))
+
+# Code run in a fresh interpreter, printing the time taken by a statement and the modules it imported
+timing_code = """
+import sys, time, json
+{setup}
+modules = set(sys.modules)
+start = time.perf_counter()
+{statement}
+print(json.dumps([time.perf_counter() - start, sorted(set(sys.modules) - modules)]))
+"""
+
+
+def time_statement(statement: str, setup: str = "", repeats: int = 5) -> Tuple[float, List[str]]:
+    """
+    Time a statement in fresh interpreters.
+
+    Parameters
+    ----------
+    statement: str
+        Python statement (generally an import).
+    setup: str (default: '')
+        Python statement run before timing.
+    repeats: int (default: 5)
+        Number of interpreters in which the statement is timed.
+
+    Returns
+    -------
+    float
+        Minimum time (in seconds) taken by the statement.
+    List[str]
+        Modules imported by the statement.
+    """
+    env = {**environ, "PYTHONPATH": pathsep.join([repository_dir] + environ.get("PYTHONPATH", "").split(pathsep))}
+    times = []
+    modules = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", timing_code.format(setup=setup, statement=statement)], cwd=repository_dir,
+                                env=env, capture_output=True, text=True, check=True).stdout
+        time, modules = json.loads(output.strip().split("\n")[-1])
+        times += [time]
+    return min(times), modules
+
+
+def check_statements(config: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Time each statement of the configuration and check that it does not exceed its time and module limits.
+
+    Parameters
+    ----------
+    config: Dict[str, Any]
+        Import time benchmark configuration.
+
+    Returns
+    -------
+    pd.DataFrame
+        Time, overhead on top of the baseline, number of modules imported, forbidden modules imported
+        and status ('ok' or 'regression') of each statement.
+    """
+
+    baseline_time, _ = time_statement(config["baseline"], repeats=config["repeats"])
+    logger.info(f"Baseline '{config['baseline']}': {baseline_time:.3f}s")
+
+    results = []
+    for params in config["statements"]:
+        # Dependencies common to all statements are imported before timing
+        time, modules = time_statement(params["statement"], config["baseline"], config["repeats"])
+        forbidden = [m for m in modules
+                     if any(m == f or m.startswith(f + ".") for f in params.get("forbidden_modules", []))]
+        status = "ok" if time <= params["max_overhead"] and len(forbidden) == 0 else "regression"
+        logger.info(f"'{params['statement']}': {time:.3f}s on top of the baseline ({status})")
+        results += [{"statement": params["statement"], "time": time, "max_overhead": params["max_overhead"],
+                     "nb_modules": len(modules), "forbidden_modules": " ".join(forbidden), "status": status}]
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--config", help="Import time benchmark configuration file",
+                        default=join(dirname(abspath(__file__)), 'import_time.default.yaml'))
+    parser.add_argument("-o", "--output", help="Output csv file", default=None)
+    arguments = vars(parser.parse_args())
+
+    config_ = yaml.load(open(arguments['config'], 'r'), Loader=yaml.FullLoader)
+    output_fn = arguments['output'] if arguments['output'] is not None \
+        else join(repository_dir, f"output/benchmarks/import_time_{strftime('%Y%m%d_%H%M%S')}.csv")
+    makedirs(dirname(abspath(output_fn)), exist_ok=True)
+
+    results_df = check_statements(config_)
+    results_df.to_csv(output_fn, index=False)
+    logger.info(f"Import time results saved in {output_fn}")
+
+    # Non-zero exit code so that regressions make automated runs fail
+    if any(results_df.status != "ok"):
+        logger.error(f"Import time regressions:\n{results_df[results_df.status != 'ok'].to_string()}")
+        sys.exit(1)
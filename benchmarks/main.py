@@ -0,0 +1,232 @@
+from typing import Callable, Dict, List, Any
+from os.path import join, dirname, abspath
+from os import makedirs, close
+from tempfile import TemporaryDirectory
+from time import strftime
+import subprocess
+import argparse
+import yaml
+
+import pandas as pd
+
+import pypsa
+from pypsa.linopf import prepare_lopf
+from pypsa.opf import network_lopf_build_model
+
+from network import *
+from network.instrumentation import start_tracing, stop_tracing, trace_stage
+import network.globals.pyomo as pyomo_funcs
+import network.globals.nomopyomo as nomopyomo_funcs
+import network.globals.array as array_funcs
+import postprocessing.utils as pp_utils
+
+from tests.network.synthetic import define_synthetic_network, add_synthetic_results
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Postprocessing metrics taking a solved network as only argument
+postprocessing_metrics = ["get_generators_capacity", "get_generators_generation", "get_generators_average_usage",
+                          "get_generators_curtailment", "get_generators_cost",
+                          "get_links_capacity", "get_links_power", "get_links_usage", "get_links_capex",
+                          "get_storage_power_capacity", "get_storage_energy_capacity", "get_storage_power",
+                          "get_storage_energy_in", "get_storage_spillage", "get_storage_cost"]
+
+
+def run_stage(name: str, func: Callable, net: pypsa.Network, errors: Dict[str, str]):
+    """Run and trace a stage, storing the error message instead of raising if the stage fails."""
+    try:
+        with trace_stage(name, net):
+            func()
+    except Exception as e:
+        logger.warning(f"Stage {name} failed: {type(e).__name__}: {e}")
+        errors[name] = f"{type(e).__name__}: {e}"
+
+
+# Functions adding each type of component to a network made of synthetic buses and loads
+components_builders = \
+    {"add_res_per_bus": lambda net: add_res_per_bus(net, ["wind_onshore", "pv_utility"]),
+     "add_res_in_grid_cells": lambda net: add_res_in_grid_cells(net, ["wind_onshore", "pv_utility"], "BENELUX", 0.5),
+     "add_nuclear": lambda net: add_nuclear(net, list(net.buses.country.unique())),
+     "add_phs_plants": lambda net: add_phs_plants(net, "countries"),
+     "add_ror_plants": lambda net: add_ror_plants(net, "countries"),
+     "add_sto_plants": lambda net: add_sto_plants(net, "countries"),
+     "add_conventional": lambda net: add_conventional(net, "ccgt"),
+     "add_batteries": lambda net: add_batteries(net, "Li-ion"),
+     "add_load_shedding": lambda net: add_load_shedding(net, net.loads_t.p_set)}
+
+# Functions adding each functionality to the optimization model of a network, common to both modes
+functionalities = \
+    {"add_co2_budget_per_country":
+        lambda funcs, net, p: funcs.add_co2_budget_per_country(net, dict.fromkeys(net.loads.bus,
+                                                                                  p["co2_mitigation_factor"]),
+                                                               p["co2_reference_year"]),
+     "add_co2_budget_global":
+        lambda funcs, net, p: funcs.add_co2_budget_global(net, "EU", p["co2_mitigation_factor"],
+                                                          p["co2_reference_year"]),
+     "dispatchable_capacity_lower_bound":
+        lambda funcs, net, p: funcs.dispatchable_capacity_lower_bound(net, dict.fromkeys(net.loads.bus,
+                                                                                         p["disp_threshold"])),
+     "add_planning_reserve_constraint": lambda funcs, net, p: funcs.add_planning_reserve_constraint(net, p["prm"]),
+     "store_links_constraint": lambda funcs, net, p: funcs.store_links_constraint(net, p["ctd_ratio"]),
+     "add_snsp_constraint_tyndp":
+        lambda funcs, net, p: funcs.add_snsp_constraint_tyndp(net, net.snapshots, p["snsp_share"]),
+     "add_curtailment_penalty_term":
+        lambda funcs, net, p: funcs.add_curtailment_penalty_term(net, net.snapshots, p["curtailment_cost"]),
+     "add_curtailment_constraints":
+        lambda funcs, net, p: funcs.add_curtailment_constraints(net, net.snapshots, p["allowed_curtailment_share"])}
+
+# Functionalities only available with pyomo
+pyomo_functionalities = \
+    {"add_import_limit_constraint":
+        lambda funcs, net, p: funcs.add_import_limit_constraint(net, p["import_share"], list(net.loads.bus))}
+
+# Functionalities only available without pyomo (with the nomopyomo and array backends)
+nomopyomo_functionalities = \
+    {"add_import_limit_constraint": lambda funcs, net, p: funcs.add_import_limit_constraint(net, p["import_share"]),
+     "min_links_capacity": lambda funcs, net, p: funcs.min_links_capacity(net, p["mga_epsilon"])}
+
+
+def write_nomopyomo_lp(net: pypsa.Network, tmp_dir: str, extra_functionality: Callable = None):
+    """Write the LP file of a network without pyomo."""
+    fdp, _ = prepare_lopf(net, extra_functionality=extra_functionality, solver_dir=tmp_dir)
+    close(fdp)
+
+
+def benchmark_size(nb_buses: int, nb_snapshots: int, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Benchmark all stages on synthetic networks of a given size.
+
+    Parameters
+    ----------
+    nb_buses: int
+        Number of buses of the synthetic networks.
+    nb_snapshots: int
+        Number of time steps of the synthetic networks.
+    config: Dict[str, Any]
+        Benchmark configuration.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        One record per stage. Stages nested in other stages (e.g. functionalities added while writing
+        the LP file without pyomo or traced functions called by a stage) have a depth higher than 0.
+    """
+
+    net_params = config["network"]
+    stages = config["stages"]
+    errors = {}
+
+    def synthetic_network(**kwargs):
+        params = {**net_params, **kwargs}
+        return define_synthetic_network(nb_buses, nb_snapshots, params["nb_res_sites_per_bus"],
+                                        params["nb_storage_per_bus"], params.get("nb_closed_loop_storage_per_bus", 0),
+                                        params["nb_links"], params["seed"])
+
+    tracer = start_tracing()
+    run_stage("synthetic_network", synthetic_network, None, errors)
+
+    with TemporaryDirectory() as tmp_dir:
+
+        if stages["components"]:
+            for name, builder in components_builders.items():
+                net = synthetic_network(nb_res_sites_per_bus=0, nb_storage_per_bus=0)
+                run_stage(f"components.{name}", lambda: builder(net), net, errors)
+
+        if stages["functionalities"]:
+            for backend, funcs in [("pyomo", pyomo_funcs), ("nomopyomo", nomopyomo_funcs), ("array", array_funcs)]:
+                pyomo = backend == "pyomo"
+                backend_functionalities = {**functionalities,
+                                           **(pyomo_functionalities if pyomo else nomopyomo_functionalities)}
+                base_net = synthetic_network(nb_closed_loop_storage_per_bus=1)
+                for name, functionality in backend_functionalities.items():
+                    # Each functionality is added to a fresh model
+                    net = base_net.copy()
+                    net.cc_ds = base_net.cc_ds
+                    net.objective = 0.
+                    net.links_to_minimize = net.links.index[net.links.carrier == "DC"]
+                    stage_name = f"{backend}.{name}"
+                    stage_func = lambda: functionality(funcs, net, config["functionalities"])
+                    if pyomo:
+                        run_stage("pyomo.build_model", lambda: network_lopf_build_model(net, net.snapshots),
+                                  net, errors)
+                        run_stage(stage_name, stage_func, net, errors)
+                    else:
+                        run_stage(f"{backend}.prepare_lopf",
+                                  lambda: write_nomopyomo_lp(net, tmp_dir,
+                                                             lambda n, s: run_stage(stage_name, stage_func, n, errors)),
+                                  net, errors)
+
+        if stages["lp_writing"]:
+            net = synthetic_network(nb_closed_loop_storage_per_bus=1)
+            run_stage("pyomo.build_model", lambda: network_lopf_build_model(net, net.snapshots), net, errors)
+            run_stage("pyomo.lp_writing",
+                      lambda: net.model.write(join(tmp_dir, "model.lp"),
+                                              io_options={"symbolic_solver_labels": False}), None, errors)
+            net = synthetic_network(nb_closed_loop_storage_per_bus=1)
+            run_stage("nomopyomo.lp_writing", lambda: write_nomopyomo_lp(net, tmp_dir), net, errors)
+
+        if stages["export"] or stages["postprocessing"]:
+            net = add_synthetic_results(synthetic_network())
+
+            if stages["export"]:
+                run_stage("export.csv_folder", lambda: net.export_to_csv_folder(join(tmp_dir, "csv/")), None, errors)
+                run_stage("export.netcdf", lambda: net.export_to_netcdf(join(tmp_dir, "net.nc")), None, errors)
+
+            if stages["postprocessing"]:
+                for metric in postprocessing_metrics:
+                    run_stage(f"postprocessing.{metric}", lambda: getattr(pp_utils, metric)(net), None, errors)
+
+    stop_tracing()
+
+    records = []
+    for record in tracer.records:
+        records += [{"nb_buses": nb_buses, "nb_snapshots": nb_snapshots,
+                     "stage": record["name"], "depth": record["depth"],
+                     "wall_time": record["wall_time"],
+                     "cpu_time": record["cpu_time"],
+                     "peak_rss_delta_mb": record["peak_rss_delta_mb"],
+                     "components_added": sum(record["components_added"].values()),
+                     "constraints_added": record["constraints_added"],
+                     "status": "error" if record["name"] in errors else "ok",
+                     "error": errors.get(record["name"], "")}]
+    return records
+
+
+def get_revision() -> str:
+    """Return the current git commit of the repository (or 'unknown')."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=dirname(abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--config", help="Benchmark configuration file",
+                        default=join(dirname(abspath(__file__)), 'config.default.yaml'))
+    parser.add_argument("-o", "--output", help="Output csv file", default=None)
+    arguments = vars(parser.parse_args())
+
+    config = yaml.load(open(arguments['config'], 'r'), Loader=yaml.FullLoader)
+    output_dir = join(dirname(abspath(__file__)), "../output/benchmarks/")
+    output_fn = arguments['output'] if arguments['output'] is not None \
+        else join(output_dir, f"{strftime('%Y%m%d_%H%M%S')}.csv")
+    makedirs(dirname(abspath(output_fn)), exist_ok=True)
+
+    revision = get_revision()
+    results = []
+    for nb_buses in config["sizes"]["nb_buses"]:
+        for nb_snapshots in config["sizes"]["nb_snapshots"]:
+            logger.info(f"Benchmarking networks with {nb_buses} buses and {nb_snapshots} time steps.")
+            results += benchmark_size(nb_buses, nb_snapshots, config)
+            # Save after each size so that partial results are kept
+            results_df = pd.DataFrame(results)
+            results_df.insert(0, "revision", revision)
+            results_df.insert(1, "pypsa_version", pypsa.__version__)
+            results_df.to_csv(output_fn, index=False)
+
+    logger.info(f"Benchmark results saved in {output_fn}")
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List
+from os.path import join, dirname, abspath
+from os import makedirs
+from time import strftime
+import argparse
+import yaml
+
+import pandas as pd
+
+import pypsa
+
+from network.instrumentation import start_tracing, stop_tracing, trace_stage
+import network.globals.pyomo as expressions_funcs
+import network.globals.pyomo.co2
+import benchmarks.pyomo_rules as rules_funcs
+
+from tests.network.synthetic import define_synthetic_network, define_synthetic_pyomo_model
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Functions adding each functionality to the pyomo model of a network
+functionalities = \
+    {"add_snsp_constraint_tyndp":
+        lambda funcs, net, p: funcs.add_snsp_constraint_tyndp(net, net.snapshots, p["snsp_share"]),
+     "add_curtailment_penalty_term":
+        lambda funcs, net, p: funcs.add_curtailment_penalty_term(net, net.snapshots, p["curtailment_cost"]),
+     "add_curtailment_constraints":
+        lambda funcs, net, p: funcs.add_curtailment_constraints(net, net.snapshots, p["allowed_curtailment_share"]),
+     "add_co2_budget_global":
+        lambda funcs, net, p: funcs.add_co2_budget_global(net, "EU", p["co2_mitigation_factor"], 1990),
+     "add_co2_budget_per_country":
+        lambda funcs, net, p: funcs.add_co2_budget_per_country(net, dict.fromkeys(net.loads.bus,
+                                                                                  p["co2_mitigation_factor"]), 1990),
+     "add_import_limit_constraint":
+        lambda funcs, net, p: funcs.add_import_limit_constraint(net, p["import_share"], list(net.loads.bus)),
+     "dispatchable_capacity_lower_bound":
+        lambda funcs, net, p: funcs.dispatchable_capacity_lower_bound(net, dict.fromkeys(net.loads.bus,
+                                                                                         p["disp_threshold"])),
+     "add_planning_reserve_constraint": lambda funcs, net, p: funcs.add_planning_reserve_constraint(net, p["prm"])}
+
+# Implementations of the functionalities, the one building linear expressions being run first so that
+# its peak memory is not hidden by the one of the rules
+implementations = [("expressions", expressions_funcs), ("rules", rules_funcs)]
+
+
+def use_synthetic_data():
+    """Replace the data read by the functionalities (emissions, and loads for the rules) by synthetic data."""
+    for module in [rules_funcs, network.globals.pyomo.co2]:
+        module.get_tech_info = lambda tech, attrs: ("gas", 0.5)
+        module.get_fuel_info = lambda fuel, attrs: pd.Series([0.2])
+        module.get_reference_emission_levels_for_region = lambda region, year: 1e5
+        module.get_co2_emission_level_for_country = lambda country, year: 1e4
+        module.get_load = lambda timestamps, countries, missing_data: pd.DataFrame(1e3, index=timestamps,
+                                                                                   columns=countries)
+
+
+def benchmark_size(nb_snapshots: int, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Benchmark the construction of each functionality with each implementation on a synthetic network.
+
+    Parameters
+    ----------
+    nb_snapshots: int
+        Number of time steps of the synthetic network.
+    config: Dict[str, Any]
+        Benchmark configuration.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        One record per functionality and implementation.
+    """
+
+    net_params = config["network"]
+    net = define_synthetic_network(net_params["nb_buses"], nb_snapshots, net_params["nb_res_sites_per_bus"],
+                                   net_params["nb_storage_per_bus"], seed=net_params["seed"])
+    net.generators.loc[net.generators.type == "ccgt", "carrier"] = "gas"
+
+    tracer = start_tracing()
+    for implementation, funcs in implementations:
+        for name, functionality in functionalities.items():
+            # Each functionality is added to a fresh model
+            define_synthetic_pyomo_model(net)
+            with trace_stage(f"{implementation}.{name}", net):
+                functionality(funcs, net, config["functionalities"])
+            del net.model
+    stop_tracing()
+
+    records = []
+    for record in tracer.records:
+        # Functions traced inside the functionalities are not kept
+        if record["depth"] == 0:
+            implementation, name = record["name"].split(".")
+            records += [{"nb_snapshots": nb_snapshots, "functionality": name, "implementation": implementation,
+                         "wall_time": record["wall_time"], "peak_rss_delta_mb": record["peak_rss_delta_mb"],
+                         "constraints_added": record["constraints_added"]}]
+    return records
+
+
+def get_speedups(results_df: pd.DataFrame) -> pd.DataFrame:
+    """Return the construction time of each functionality with each implementation and the speedup of expressions."""
+    times = results_df.pivot_table(index=["functionality", "nb_snapshots"], columns="implementation",
+                                   values="wall_time")
+    times["speedup"] = times["rules"] / times["expressions"]
+    return times
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--config", help="Benchmark configuration file",
+                        default=join(dirname(abspath(__file__)), 'pyomo_expressions.default.yaml'))
+    parser.add_argument("-o", "--output", help="Output csv file", default=None)
+    arguments = vars(parser.parse_args())
+
+    config_ = yaml.load(open(arguments['config'], 'r'), Loader=yaml.FullLoader)
+    output_fn = arguments['output'] if arguments['output'] is not None \
+        else join(dirname(abspath(__file__)), f"../output/benchmarks/pyomo_expressions_{strftime('%Y%m%d_%H%M%S')}.csv")
+    makedirs(dirname(abspath(output_fn)), exist_ok=True)
+
+    use_synthetic_data()
+    results = []
+    for nb_snapshots_ in config_["nb_snapshots"]:
+        logger.info(f"Benchmarking functionalities on networks with {nb_snapshots_} time steps.")
+        results += benchmark_size(nb_snapshots_, config_)
+        # Save after each size so that partial results are kept
+        results_df_ = pd.DataFrame(results)
+        results_df_.insert(0, "pypsa_version", pypsa.__version__)
+        results_df_.to_csv(output_fn, index=False)
+
+    logger.info(f"Construction times (in seconds):\n{get_speedups(results_df_).round(3).to_string()}")
+    logger.info(f"Benchmark results saved in {output_fn}")
@@ -0,0 +1,366 @@
+"""
+Rule-based builders of the pyomo functionalities, as they were before being built with linear expressions
+(see network.globals.pyomo.expressions). They are only kept to benchmark the construction of the functionalities.
+"""
+from typing import Dict, List
+
+import pandas as pd
+
+from pyomo.environ import Constraint, Var, Param, NonNegativeReals
+import pypsa
+
+from iepy.technologies import get_fuel_info, get_tech_info
+from iepy.indicators.emissions import get_co2_emission_level_for_country, get_reference_emission_levels_for_region
+from iepy.load import get_load
+
+
+def add_snsp_constraint_tyndp(net: pypsa.Network, snapshots: pd.DatetimeIndex, snsp_share: float):
+    """
+    Add system non-synchronous generation share constraint to the model.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    snsp_share: float
+        Share of system non-synchronous generation.
+
+    """
+
+    model = net.model
+    model.snsp_share = Param(initialize=snsp_share, mutable=True)
+    nonsync_gen_types = 'wind|pv'
+    nonsync_gen_ids = net.generators.index[net.generators.type.str.contains(nonsync_gen_types)]
+    nonsync_storage_ids = net.storage_units.index[net.storage_units.type == "Li-ion"]
+
+    # Impose for each time step the non-synchronous production be lower than a part of the total production
+    def snsp_rule(model, snapshot):
+
+        # Non-synchronous 'production'
+        nonsync_gen_p = sum(model.generator_p[idx, snapshot] for idx in nonsync_gen_ids)\
+            if len(nonsync_gen_ids) != 0 else 0
+        nonsync_storage_dispatch = sum(model.storage_p_dispatch[idx, snapshot] for idx in nonsync_storage_ids)\
+            if len(nonsync_storage_ids) != 0 else 0
+
+        # Synchronous production
+        full_gen_p = sum(model.generator_p[:, snapshot]) if len(net.generators) != 0 else 0
+        full_storage_dispatch = sum(model.storage_p_dispatch[:, snapshot]) if len(net.storage_units) != 0 else 0
+
+        return nonsync_gen_p + nonsync_storage_dispatch <= model.snsp_share * (full_gen_p + full_storage_dispatch)
+
+    model.snsp = Constraint(list(snapshots), rule=snsp_rule)
+
+
+def add_curtailment_penalty_term(network: pypsa.Network, snapshots: pd.DatetimeIndex, curtailment_cost: float):
+    """
+    Add curtailment penalties to the objective function.
+
+    Parameters
+    ----------
+    network: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    curtailment_cost: float
+        Cost of curtailing in M€/MWh # TODO: to be checked
+
+    """
+
+    techs = ['wind', 'pv']
+    gens = network.generators.index[network.generators.index.str.contains('|'.join(techs))]
+
+    model = network.model
+    gens_p_max_pu = network.generators_t.p_max_pu
+
+    model.generator_c = Var(gens, snapshots, within=NonNegativeReals)
+
+    def generation_curtailment_rule(model, gen, snapshot):
+        return model.generator_c[gen, snapshot] == \
+               model.generator_p_nom[gen] * gens_p_max_pu.loc[snapshot, gen] - model.generator_p[gen, snapshot]
+    model.generation_curtailment = Constraint(list(gens), list(snapshots), rule=generation_curtailment_rule)
+
+    model.curtailment_cost = Param(initialize=curtailment_cost, mutable=True)
+    model.objective.expr += model.curtailment_cost * sum(model.generator_c[gen, s] for gen in gens for s in snapshots)
+
+
+def add_curtailment_constraints(network: pypsa.Network, snapshots: pd.DatetimeIndex, allowed_curtailment_share: float):
+    """
+    Add extra constrains limiting curtailment of each generator, at each time step, as a share of p_max_pu*p_nom.
+
+    Parameters
+    ----------
+    network: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    allowed_curtailment_share: float
+        Maximum allowed share of generation that can be curtailed.
+
+    """
+
+    model = network.model
+    gens_p_max_pu = network.generators_t.p_max_pu
+
+    techs = ['wind', 'pv']
+    gens = network.generators.index[network.generators.index.str.contains('|'.join(techs))]
+
+    model.generator_c = Var(gens, snapshots, within=NonNegativeReals)
+
+    def generation_curtailment_rule(model, gen, snapshot):
+        return model.generator_c[gen, snapshot] == \
+               model.generator_p_nom[gen] * gens_p_max_pu.loc[snapshot, gen] - model.generator_p[gen, snapshot]
+    model.generation_curtailment = Constraint(list(gens), list(snapshots), rule=generation_curtailment_rule)
+
+    model.allowed_curtailment_share = Param(initialize=allowed_curtailment_share, mutable=True)
+
+    def curtailment_rule(model, gen, snapshot):
+        return model.generator_c[gen, snapshot] <= \
+               model.allowed_curtailment_share * gens_p_max_pu.loc[snapshot, gen] * model.generator_p_nom[gen]
+    model.limit_curtailment = Constraint(list(gens), list(snapshots), rule=curtailment_rule)
+
+
+def add_co2_budget_per_country(net: pypsa.Network,
+                               reduction_share_per_country: Dict[str, float],
+                               refyear: int):
+    """
+    Add CO2 budget per country.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    reduction_share_per_country: Dict[str, float]
+        Percentage of reduction of emission for each country.
+    refyear: int
+        Reference year from which the reduction in emission is computed.
+
+    """
+
+    model = net.model
+    nb_hours = net.snapshot_weightings[net.snapshots].sum()
+    model.co2_reduction_share_per_country = Param(list(reduction_share_per_country.keys()),
+                                                  initialize=reduction_share_per_country, mutable=True)
+
+    def generation_emissions_per_bus_rule(model, bus):
+
+        bus_emission_reference = get_co2_emission_level_for_country(bus, refyear)
+        bus_emission_target = \
+            (1-model.co2_reduction_share_per_country[bus]) * bus_emission_reference * nb_hours / 8760.
+
+        bus_gens = net.generators[(net.generators.carrier.astype(bool)) & (net.generators.bus == bus)]
+
+        generator_emissions_sum = 0.
+        for tech in bus_gens.type.unique():
+
+            fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
+            fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
+            fuel_emissions_thermal = fuel_emissions_el/efficiency
+
+            gens = bus_gens[bus_gens.type == tech]
+
+            for g in gens.index.values:
+                for s in net.snapshots:
+                    generator_emissions_sum += model.generator_p[g, s]*fuel_emissions_thermal.values[0] \
+                        * net.snapshot_weightings[s]
+
+        return generator_emissions_sum <= bus_emission_target
+    model.generation_emissions_per_bus = Constraint(list(reduction_share_per_country.keys()),
+                                                    rule=generation_emissions_per_bus_rule)
+
+
+def add_co2_budget_global(network: pypsa.Network, region: str, co2_reduction_share: float, co2_reduction_refyear: int):
+    """
+    Add global CO2 budget.
+
+    Parameters
+    ----------
+    region: str
+        Region over which the network is defined.
+    network: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    co2_reduction_share: float
+        Percentage of reduction of emission.
+    co2_reduction_refyear: int
+        Reference year from which the reduction in emission is computed.
+
+    """
+
+    model = network.model
+
+    co2_reference_kt = get_reference_emission_levels_for_region(region, co2_reduction_refyear)
+    model.co2_reduction_share = Param(initialize=co2_reduction_share, mutable=True)
+    co2_budget = co2_reference_kt * (1 - model.co2_reduction_share) \
+        * network.snapshot_weightings[network.snapshots].sum() / 8760.
+
+    # Drop rows (gens) without an associated carrier (i.e., technologies not emitting)
+    gens = network.generators[network.generators.carrier.astype(bool)]
+
+    def generation_emissions_rule(model):
+
+        generator_emissions_sum = 0.
+        for tech in gens.type.unique():
+
+            fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
+            fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
+            fuel_emissions_thermal = fuel_emissions_el/efficiency
+
+            gen = gens[gens.index.str.contains(tech)]
+
+            for g in gen.index.values:
+                for s in network.snapshots:
+                    generator_emissions_sum += model.generator_p[g, s]*fuel_emissions_thermal.values[0] \
+                        * network.snapshot_weightings[s]
+
+        return generator_emissions_sum <= co2_budget
+    model.generation_emissions_global = Constraint(rule=generation_emissions_rule)
+
+
+def add_import_limit_constraint(network: pypsa.Network, import_share: float, countries: List[str]):
+    """
+    Add per-bus constraint on import budgets.
+
+    Parameters
+    ----------
+    network: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    import_share: float
+        Maximum share of load that can be satisfied via imports.
+    countries: List[str]
+        ISO2 codes of countries on which to impose import limit constraints
+
+    Notes
+    -----
+    Using a flat value across EU, could be updated to support different values for different countries.
+
+    """
+
+    model = network.model
+    links = network.links
+    snapshots = network.snapshots
+    model.import_share = Param(initialize=import_share, mutable=True)
+
+    def import_constraint_rule(model, bus):
+
+        load_at_bus = get_load(timestamps=snapshots, countries=[bus], missing_data='interpolate').sum()
+        import_budget = model.import_share * load_at_bus.values[0]
+
+        links_in = links[links.bus1 == bus].index
+        links_out = links[links.bus0 == bus].index
+
+        imports = 0.
+        if not links_in.empty:
+            imports += sum(model.link_p[e, s] for e in links_in for s in network.snapshots)
+        if not links_out.empty:
+            imports -= sum(model.link_p[e, s] for e in links_out for s in network.snapshots)
+        return imports <= import_budget
+
+    # TODO: based on the assumption that the bus is associated to a country
+    model.import_constraint = Constraint(countries, rule=import_constraint_rule)
+
+
+def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
+    """
+    Constraint that ensures a minimum dispatchable installed capacity.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+
+    thresholds: Dict
+        Dict containing scalar thresholds for disp_capacity/peak_load for each bus
+    """
+    # TODO: extend for different topologies, if necessary
+    model = net.model
+    buses = net.loads.bus
+    dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
+
+    def dispatchable_capacity_constraint_rule(model, bus):
+
+        if bus in thresholds.keys():
+
+            lhs = 0
+            legacy_at_bus = 0
+
+            gens = net.generators[(net.generators.bus == bus) & (net.generators.type.isin(dispatchable_technologies))]
+            for gen in gens.index:
+                if gens.loc[gen].p_nom_extendable:
+                    lhs += model.generator_p_nom[gen]
+                else:
+                    legacy_at_bus += gens.loc[gen].p_nom_min
+
+            stos = net.storage_units[(net.storage_units.bus == bus) &
+                                     (net.storage_units.type.isin(dispatchable_technologies))]
+            for sto in stos.index:
+                if stos.loc[sto].p_nom_extendable:
+                    lhs += model.storage_unit_p_nom[gen]
+                else:
+                    legacy_at_bus += stos.loc[sto].p_nom_min
+
+            # Get load for country
+            load_idx = net.loads[net.loads.bus == bus].index
+            load_peak = net.loads_t.p_set[load_idx].max()
+
+            load_peak_threshold = load_peak * thresholds[bus]
+            rhs = max(0, load_peak_threshold.values[0] - legacy_at_bus)
+
+            return lhs >= rhs
+
+    model.dispatchable_capacity_constraint = Constraint(buses, rule=dispatchable_capacity_constraint_rule)
+
+
+def add_planning_reserve_constraint(net: pypsa.Network, prm: float):
+    """
+    Constraint that ensures a minimum dispatchable installed capacity.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    prm: float
+        Planning reserve margin.
+    """
+    model = net.model
+    buses = net.loads.bus
+    cc_ds = net.cc_ds
+    model.prm = Param(initialize=prm, mutable=True)
+    dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
+    res_technologies = ['wind_onshore', 'wind_offshore', 'pv_utility', 'pv_residential']
+
+    def planning_reserve_constraint_rule(model, bus):
+
+        lhs = 0
+        legacy_at_bus = 0
+
+        gens = net.generators[(net.generators.bus == bus) & (net.generators.type.isin(dispatchable_technologies))]
+        for gen in gens.index:
+            if gens.loc[gen].p_nom_extendable:
+                lhs += model.generator_p_nom[gen]
+            else:
+                legacy_at_bus += gens.loc[gen].p_nom_min
+
+        stos = net.storage_units[(net.storage_units.bus == bus) &
+                                 (net.storage_units.type.isin(dispatchable_technologies))]
+        for sto in stos.index:
+            if stos.loc[sto].p_nom_extendable:
+                lhs += model.storage_unit_p_nom[gen]
+            else:
+                legacy_at_bus += stos.loc[sto].p_nom_min
+
+        res_gens = net.generators[(net.generators.bus == bus) &
+                                  (net.generators.type.str.contains('|'.join(res_technologies)))]
+        for gen in res_gens.index:
+            lhs += model.generator_p_nom[gen] * cc_ds.loc[' '.join(gen.split(' ')[1:])]
+
+        # Get load for country
+        load_idx = net.loads[net.loads.bus == bus].index
+        load_peak = net.loads_t.p_set[load_idx].max()
+
+        load_corrected_with_margin = load_peak.values[0] * (1 + model.prm)
+        rhs = load_corrected_with_margin - legacy_at_bus
+
+        return lhs >= rhs
+
+    model.planning_reserve_margin = Constraint(buses, rule=planning_reserve_constraint_rule)
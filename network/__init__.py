@@ -1,10 +1,47 @@
-from network.components.res import \
-    add_generators_using_siting as add_res, \
-    add_generators_in_grid_cells as add_res_in_grid_cells, \
-    add_generators_per_bus as add_res_per_bus
-from network.components.nuclear import add_generators as add_nuclear
-from network.components.hydro import add_phs_plants, add_ror_plants, add_sto_plants
-from network.components.conventional import add_generators as add_conventional
-from network.components.battery import add_batteries
-from network.globals.functionalities import add_extra_functionalities
-from network.components.load_shed import add_load_shedding
+from importlib import import_module
+import sys
+
+# Public functions of the package, given as (module, name in module).
+# Modules are only imported when one of their functions is first accessed, so that importing a single function
+# does not import the data libraries (iepy, resite, powerplant data, ...) used by the other ones.
+_lazy_attributes = \
+    {"add_res": ("network.components.res", "add_generators_using_siting"),
+     "add_res_in_grid_cells": ("network.components.res", "add_generators_in_grid_cells"),
+     "get_res_in_grid_cells": ("network.components.res", "get_generators_in_grid_cells"),
+     "add_res_per_bus": ("network.components.res", "add_generators_per_bus"),
+     "add_nuclear": ("network.components.nuclear", "add_generators"),
+     "add_phs_plants": ("network.components.hydro", "add_phs_plants"),
+     "add_ror_plants": ("network.components.hydro", "add_ror_plants"),
+     "add_sto_plants": ("network.components.hydro", "add_sto_plants"),
+     "add_conventional": ("network.components.conventional", "add_generators"),
+     "add_batteries": ("network.components.battery", "add_batteries"),
+     "add_extra_functionalities": ("network.globals.functionalities", "add_extra_functionalities"),
+     "add_load_shedding": ("network.components.load_shed", "add_load_shedding"),
+     "remove_empty_buses": ("network.topology", "remove_empty_buses"),
+     "start_tracing": ("network.instrumentation", "start_tracing"),
+     "stop_tracing": ("network.instrumentation", "stop_tracing"),
+     "trace_stage": ("network.instrumentation", "trace_stage"),
+     "apply_memory_budget": ("network.memory", "apply_memory_budget"),
+     "resample_network": ("network.resampling", "resample_network"),
+     "export_weather_year_networks": ("network.weather_years", "export_weather_year_networks"),
+     "clone_network": ("network.clones", "clone_network"),
+     "get_base_network_clone": ("network.clones", "get_base_network_clone"),
+     "benders_lopf": ("network.solvers.benders", "benders_lopf"),
+     "column_generation_lopf": ("network.solvers.column_generation", "column_generation_lopf")}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute_name = _lazy_attributes[name]
+    attribute = getattr(import_module(module_name), attribute_name)
+    # Cache the attribute so that this function is only called once per attribute
+    # (the builtin globals is shadowed by the network.globals subpackage once it is imported)
+    setattr(sys.modules[__name__], name, attribute)
+    return attribute
+
+
+def __dir__():
+    return sorted(set(vars(sys.modules[__name__])) | set(__all__))
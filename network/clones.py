@@ -0,0 +1,134 @@
+from typing import Dict, Tuple
+from os import scandir
+from os.path import abspath
+from copy import copy
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+import pypsa.descriptors
+
+from network.instrumentation import traced
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Base networks imported from csv folders, indexed by folder (see load_base_network)
+_base_networks: Dict[str, Tuple[float, pypsa.Network]] = {}
+# Network without components used to create networks with PyPSA's default component definitions
+_empty_network = None
+
+
+def get_network_shell(net: pypsa.Network) -> pypsa.Network:
+    """Return a network without components, with the same component definitions and other attributes as a network."""
+
+    global _empty_network
+    if type(net) is pypsa.Network and net.component_attrs is pypsa.components.component_attrs:
+        # Building the component definitions is the costly part of pypsa.Network(), they are shared instead
+        if _empty_network is None:
+            _empty_network = pypsa.Network()
+        shell = copy(_empty_network)
+        for c in shell.all_components:
+            list_name = shell.components[c]["list_name"]
+            setattr(shell, list_name, getattr(_empty_network, list_name).copy())
+            empty_pnl = getattr(_empty_network, list_name + "_t")
+            setattr(shell, list_name + "_t", pypsa.descriptors.Dict({k: df.copy() for k, df in empty_pnl.items()}))
+    else:
+        override_components, override_component_attrs = net._retrieve_overridden_components()
+        shell = net.__class__(override_components=override_components,
+                              override_component_attrs=override_component_attrs)
+    # Keep the other attributes (name, configuration, etc.)
+    for name, attribute in vars(net).items():
+        if name not in vars(shell):
+            setattr(shell, name, attribute)
+    shell.name = net.name
+    return shell
+
+
+def clone_network(net: pypsa.Network, deep: bool = False) -> pypsa.Network:
+    """
+    Return a copy of a network without its results, much cheaper than pypsa.Network.copy.
+
+    Static data (components and their attributes) is copied, as PyPSA modifies it in place when preparing an
+    optimization. Input time series are shared with the network without copying them, unless deep is True:
+    they are read-only in the clone, so that modifying them in place raises an error instead of modifying
+    the network. They must be replaced by modified copies instead (e.g. clone.generators_t.p_max_pu = new_df).
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    deep: bool (default: False)
+        Whether to copy the time series.
+
+    Returns
+    -------
+    pypsa.Network
+        Clone of the network.
+    """
+
+    clone = get_network_shell(net)
+    # Snapshots are set directly, pypsa.Network.set_snapshots reindexing all time series
+    clone.snapshots = net.snapshots
+    clone.snapshot_weightings = net.snapshot_weightings.copy()
+    for c in net.all_components:
+        list_name = net.components[c]["list_name"]
+        setattr(clone, list_name, net.df(c).copy())
+
+        attrs = net.components[c]["attrs"]
+        pnl = pypsa.descriptors.Dict()
+        for attr, df in net.pnl(c).items():
+            # Results of the network are not kept
+            if len(df.columns) == 0 or attrs.status.get(attr, "Input").startswith("Output"):
+                pnl[attr] = pd.DataFrame(index=net.snapshots, columns=[], dtype=np.dtype(float))
+                continue
+            if deep:
+                values = df.values.copy()
+            else:
+                values = df.values.view()
+                values.flags.writeable = False
+            pnl[attr] = pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+        setattr(clone, list_name + "_t", pnl)
+
+    return clone
+
+
+def get_folder_key(folder: str) -> float:
+    """Return the last modification time of the files of a folder, so that modified folders are imported again."""
+    return max([entry.stat().st_mtime for entry in scandir(folder)], default=0.)
+
+
+@traced
+def load_base_network(base_net_dir: str) -> pypsa.Network:
+    """
+    Import a network from a csv folder, only once per process.
+
+    Networks are kept in memory and imported again only if the files of the folder are modified.
+    The returned network must not be modified: use get_base_network_clone to get a network to optimize.
+
+    Parameters
+    ----------
+    base_net_dir: str
+        Folder of the network (see pypsa.Network.export_to_csv_folder).
+
+    Returns
+    -------
+    pypsa.Network
+        Network of the folder.
+    """
+
+    folder = abspath(base_net_dir)
+    key = get_folder_key(folder)
+    if folder not in _base_networks or _base_networks[folder][0] != key:
+        logger.info(f"Importing base network from {folder}.")
+        net = pypsa.Network()
+        net.import_from_csv_folder(folder)
+        _base_networks[folder] = (key, net)
+    return _base_networks[folder][1]
+
+
+def get_base_network_clone(base_net_dir: str) -> pypsa.Network:
+    """Return a clone (see clone_network) of the network of a csv folder, imported only once (see load_base_network)."""
+    return clone_network(load_base_network(base_net_dir))
@@ -1,18 +1,66 @@
 from typing import List
 
+import pandas as pd
+
 import pypsa
 
 from iepy.technologies import get_costs, get_config_values, get_tech_info
 
+from network.instrumentation import traced
+
 import logging
 logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
+def get_store_links(network: pypsa.Network) -> pd.DataFrame:
+    """
+    Return the discharge and charge links of each store added in place of a storage unit.
+
+    The mapping is recorded by replace_su_closed_loop. For networks where it was not recorded (e.g. networks
+    imported from files), it is rebuilt from the topology: the discharge link of a store starts at the bus
+    of the store and its charge link ends at that bus.
+
+    Parameters
+    ----------
+    network: pypsa.Network
+        PyPSA network
+
+    Returns
+    -------
+    pd.DataFrame
+        'discharge' and 'charge' links indexed by store bus.
+    """
+
+    if hasattr(network, "store_links"):
+        return network.store_links
+
+    store_buses = network.stores.bus
+    links = network.links
+    discharge_links = links[links.bus0.isin(store_buses)]
+    discharge_links = pd.Series(discharge_links.index, index=discharge_links.bus0.values, name="discharge")
+    charge_links = links[links.bus1.isin(store_buses)]
+    charge_links = pd.Series(charge_links.index, index=charge_links.bus1.values, name="charge")
+    return pd.concat([discharge_links.groupby(level=0).first(), charge_links.groupby(level=0).first()],
+                     axis=1).dropna()
+
+
 def replace_su_closed_loop(network: pypsa.Network, su_to_replace: str):
-    # TODO: comment
+    """
+    Replace a storage unit by a store connected to the bus of the storage unit by a discharge and a charge link.
+
+    The links of the store are recorded in network.store_links (see get_store_links).
+
+    Parameters
+    ----------
+    network: pypsa.Network
+        PyPSA network
+    su_to_replace: str
+        ID of the storage unit to replace.
+    """
 
     su = network.storage_units.loc[su_to_replace]
+    store_links = get_store_links(network)
 
     su_short_name = su_to_replace.split(' ')[-1]
     bus_name = f"{su['bus']} {su_short_name}"
@@ -66,7 +114,12 @@ def replace_su_closed_loop(network: pypsa.Network, su_to_replace: str):
 
     network.remove("StorageUnit", su_to_replace)
 
+    network.store_links = pd.concat([store_links,
+                                     pd.DataFrame({"discharge": [link_1_name], "charge": [link_2_name]},
+                                                  index=[bus_name])])
+
 
+@traced
 def add_batteries(network: pypsa.Network, battery_type: str, buses_ids: List[str] = None,
                   fixed_duration: bool = False) -> pypsa.Network:
     """
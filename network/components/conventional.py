@@ -2,11 +2,14 @@ import pypsa
 
 from iepy.technologies import get_costs, get_tech_info
 
+from network.instrumentation import traced
+
 import logging
 logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
+@traced
 def add_generators(network: pypsa.Network, tech: str) -> pypsa.Network:
     """
     Add conventional generators to a Network instance.
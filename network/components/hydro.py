@@ -1,14 +1,21 @@
 import logging
 
+import pandas as pd
+
 import pypsa
 
-from iepy.generation.hydro import *
+from iepy.generation.hydro import get_phs_capacities, get_ror_capacities, get_ror_inflows, \
+    get_sto_capacities, get_sto_inflows, phs_inputs_nuts_to_ehighway, ror_inputs_nuts_to_ehighway, \
+    sto_inputs_nuts_to_ehighway
 from iepy.technologies import get_costs, get_tech_info
+from network.instrumentation import traced
+from network.time_series_store import stored_time_series, get_snapshots_key
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger()
 
 
+@traced
 def add_phs_plants(net: pypsa.Network, topology_type: str = "countries",
                    extendable: bool = False, cyclic_sof: bool = True) -> pypsa.Network:
     """
@@ -92,6 +99,7 @@ def add_phs_plants(net: pypsa.Network, topology_type: str = "countries",
     return net
 
 
+@traced
 def add_ror_plants(net: pypsa.Network, topology_type: str = "countries",
                    extendable: bool = False) -> pypsa.Network:
     """
@@ -128,7 +136,8 @@ def add_ror_plants(net: pypsa.Network, topology_type: str = "countries",
     # Load capacities and inflows
     aggr_level = "countries" if topology_type == "countries" else "NUTS3"
     pow_cap = get_ror_capacities(aggr_level)
-    inflows = get_ror_inflows(aggr_level, net.snapshots)
+    inflows = stored_time_series("ror_inflows", (aggr_level, ) + get_snapshots_key(net.snapshots),
+                                 get_ror_inflows, aggr_level, net.snapshots)
 
     if topology_type == 'countries':
         # Extract only countries for which data is available
@@ -170,6 +179,7 @@ def add_ror_plants(net: pypsa.Network, topology_type: str = "countries",
     return net
 
 
+@traced
 def add_sto_plants(net: pypsa.Network, topology_type: str = "countries",
                    extendable: bool = False, cyclic_sof: bool = True) -> pypsa.Network:
     """
@@ -208,7 +218,8 @@ def add_sto_plants(net: pypsa.Network, topology_type: str = "countries",
     # Load capacities and inflows
     aggr_level = "countries" if topology_type == "countries" else "NUTS3"
     pow_cap, en_cap = get_sto_capacities(aggr_level)
-    inflows = get_sto_inflows(aggr_level, net.snapshots)
+    inflows = stored_time_series("sto_inflows", (aggr_level, ) + get_snapshots_key(net.snapshots),
+                                 get_sto_inflows, aggr_level, net.snapshots)
 
     if topology_type == 'countries':
         # Extract only countries for which data is available
@@ -256,3 +267,44 @@ def add_sto_plants(net: pypsa.Network, topology_type: str = "countries",
              y=buses_onshore.loc[bus_pow_cap.index.values].y)
 
     return net
+
+
+def get_hydro_inflows_per_bus(net: pypsa.Network, snapshots: pd.DatetimeIndex) \
+        -> (pd.DataFrame, pd.DataFrame):
+    """
+    Compute the inflows of the hydro plants added to a one-node-per-country topology at other time stamps.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A Network instance with plants added by add_ror_plants and add_sto_plants with the 'countries' topology.
+    snapshots: pd.DatetimeIndex
+        Time stamps at which inflows are computed (e.g. the snapshots of another weather year).
+
+    Returns
+    -------
+    ror_p_max_pu: pd.DataFrame
+        Availability of run-of-river generators (snapshots x generators).
+    sto_inflow: pd.DataFrame
+        Inflows of reservoir storage units (snapshots x storage units).
+    """
+
+    assert hasattr(net.buses, "country"), "Error: Buses must contain a 'country' attribute."
+
+    ror = net.generators[net.generators.type == 'ror']
+    ror_p_max_pu = pd.DataFrame(index=snapshots)
+    if len(ror) != 0:
+        inflows = stored_time_series("ror_inflows", ("countries", ) + get_snapshots_key(snapshots),
+                                     get_ror_inflows, "countries", snapshots)
+        ror_p_max_pu = pd.DataFrame(inflows[net.buses.country[ror.bus]].values, index=snapshots,
+                                    columns=ror.index).round(3)
+
+    sto = net.storage_units[net.storage_units.type == 'sto']
+    sto_inflow = pd.DataFrame(index=snapshots)
+    if len(sto) != 0:
+        inflows = stored_time_series("sto_inflows", ("countries", ) + get_snapshots_key(snapshots),
+                                     get_sto_inflows, "countries", snapshots)
+        sto_inflow = pd.DataFrame(inflows[net.buses.country[sto.bus]].values, index=snapshots,
+                                  columns=sto.index).round(3)
+
+    return ror_p_max_pu, sto_inflow
@@ -6,11 +6,14 @@ import pandas as pd
 
 from iepy import data_path
 
+from network.instrumentation import traced
+
 import logging
 logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger()
 
 
+@traced
 def add_load_shedding(net: pypsa.Network, load_df: pd.DataFrame) -> pypsa.Network:
     """
     Adding dummy-generators for load shedding.
@@ -5,12 +5,15 @@ import pypsa
 from iepy.generation import get_powerplants, match_powerplants_to_regions
 from iepy.technologies import get_costs, get_tech_info
 
+from network.instrumentation import traced
+
 from warnings import warn
 import logging
 logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger()
 
 
+@traced
 def add_generators(net: pypsa.Network, countries: List[str],
                    use_ex_cap: bool = True, extendable: bool = False) -> pypsa.Network:
     """
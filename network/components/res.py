@@ -1,4 +1,5 @@
 from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
@@ -13,12 +14,15 @@ from iepy.generation.vres.potentials.glaes import get_capacity_potential_for_sha
 from iepy.generation.vres.profiles import compute_capacity_factors, get_cap_factor_for_countries
 from iepy.technologies import get_costs, get_config_values, get_config_dict
 
+from network.instrumentation import traced
+from network.time_series_store import stored_time_series, get_snapshots_key
 
 import logging
 logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
 logger = logging.getLogger()
 
 
+@traced
 def add_generators_using_siting(net: pypsa.Network, technologies: List[str],
                                 region: str, siting_params: Dict[str, Any],
                                 use_ex_cap: bool = True, limit_max_cap: bool = True,
@@ -127,12 +131,13 @@ def add_generators_using_siting(net: pypsa.Network, technologies: List[str],
     return net
 
 
-def add_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
+def get_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
                                  region: str, spatial_resolution: float,
                                  use_ex_cap: bool = True, limit_max_cap: bool = True,
-                                 min_cap_pot: List[float] = None) -> pypsa.Network:
+                                 min_cap_pot: List[float] = None) -> (pd.DataFrame, pd.DataFrame):
     """
-    Create VRES generators in every grid cells obtained from dividing a certain number of regions.
+    Compute VRES generators in every grid cells obtained from dividing a certain number of regions,
+    without adding them to the network.
 
     Parameters
     ----------
@@ -151,16 +156,12 @@ def add_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
     min_cap_pot: List[float] (default: None)
         List of thresholds per technology. Points with capacity potential under this threshold will be removed.
 
-
     Returns
     -------
-    net: pypsa.Network
-        Updated network
-
-    Notes
-    -----
-    net.buses must have a 'region_onshore' if adding onshore technologies and a 'region_offshore' attribute
-    if adding offshore technologies.
+    generators: pd.DataFrame
+        Static attributes of the generators.
+    p_max_pu: pd.DataFrame
+        Capacity factors of the generators (snapshots x generators).
     """
 
     from resite.resite import Resite
@@ -169,6 +170,7 @@ def add_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
     resite = Resite([region], technologies, [net.snapshots[0], net.snapshots[-1]], spatial_resolution)
     resite.build_data(use_ex_cap, min_cap_pot)
 
+    generators, p_max_pu = [], []
     for tech in technologies:
 
         points = resite.tech_points_dict[tech]
@@ -180,35 +182,214 @@ def add_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
         buses = buses.dropna(subset=[region_type])
         associated_buses = match_points_to_regions(points, buses[region_type]).dropna()
         points = list(associated_buses.index)
+        gens_index = pd.Index([f"Gen {tech} {x}-{y}" for x, y in points])
 
-        p_nom_max = 'inf'
+        p_nom_max = float('inf')
         if limit_max_cap:
             p_nom_max = resite.data_dict["cap_potential_ds"][tech][points].values
         p_nom = resite.data_dict["existing_cap_ds"][tech][points].values
-        p_max_pu = resite.data_dict["cap_factor_df"][tech][points].values
 
         capital_cost, marginal_cost = get_costs(tech, len(net.snapshots))
 
-        net.madd("Generator",
-                 pd.Index([f"Gen {tech} {x}-{y}" for x, y in points]),
-                 bus=associated_buses.values,
-                 p_nom_extendable=True,
-                 p_nom_max=p_nom_max,
-                 p_nom=p_nom,
-                 p_nom_min=p_nom,
-                 p_min_pu=0.,
-                 p_max_pu=p_max_pu,
-                 type=tech,
-                 x=[x for x, _ in points],
-                 y=[y for _, y in points],
-                 marginal_cost=marginal_cost,
-                 capital_cost=capital_cost)
+        generators += [pd.DataFrame({"bus": associated_buses.values,
+                                     "p_nom_extendable": True,
+                                     "p_nom_max": p_nom_max,
+                                     "p_nom": p_nom,
+                                     "p_nom_min": p_nom,
+                                     "p_min_pu": 0.,
+                                     "type": tech,
+                                     "x": [x for x, _ in points],
+                                     "y": [y for _, y in points],
+                                     "marginal_cost": marginal_cost,
+                                     "capital_cost": capital_cost}, index=gens_index)]
+        p_max_pu += [pd.DataFrame(resite.data_dict["cap_factor_df"][tech][points].values,
+                                  index=net.snapshots, columns=gens_index)]
+
+    return pd.concat(generators), pd.concat(p_max_pu, axis=1)
+
+
+@traced
+def add_generators_in_grid_cells(net: pypsa.Network, technologies: List[str],
+                                 region: str, spatial_resolution: float,
+                                 use_ex_cap: bool = True, limit_max_cap: bool = True,
+                                 min_cap_pot: List[float] = None) -> pypsa.Network:
+    """
+    Create VRES generators in every grid cells obtained from dividing a certain number of regions.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    technologies: List[str]
+        Which technologies to add.
+    region: str
+        Region code defined in 'data_path'/geographics/region_definition.csv over which the network is defined.
+    spatial_resolution: float
+        Spatial resolution at which to define grid cells.
+    use_ex_cap: bool (default: True)
+        Whether to take into account existing capacity.
+    limit_max_cap: bool (default: True)
+        Whether to limit capacity expansion at each grid cell to a certain capacity potential.
+    min_cap_pot: List[float] (default: None)
+        List of thresholds per technology. Points with capacity potential under this threshold will be removed.
+
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+
+    Notes
+    -----
+    net.buses must have a 'region_onshore' if adding onshore technologies and a 'region_offshore' attribute
+    if adding offshore technologies.
+    """
+
+    generators, p_max_pu = get_generators_in_grid_cells(net, technologies, region, spatial_resolution,
+                                                        use_ex_cap, limit_max_cap, min_cap_pot)
+    net.import_components_from_dataframe(generators, "Generator")
+    net.import_series_from_dataframe(p_max_pu, "Generator", "p_max_pu")
 
     return net
 
 
+def compute_res_cap_factors_per_bus(tech: str, buses: pd.DataFrame, onshore: bool, one_bus_per_country: bool,
+                                    snapshots: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Compute capacity factors of a VRES technology at a series of buses.
+
+    Parameters
+    ----------
+    tech: str
+        Name of the VRES technology.
+    buses: pd.DataFrame
+        Buses at which the technology is added, associated to an onshore or offshore region.
+    onshore: bool
+        Whether the technology is onshore.
+    one_bus_per_country: bool
+        Whether the topology has one bus per country.
+    snapshots: pd.DatetimeIndex
+        Time stamps at which capacity factors are computed.
+
+    Returns
+    -------
+    cap_factor_df: pd.DataFrame
+        Capacity factor time series at each bus.
+    """
+
+    def compute():
+        if one_bus_per_country:
+            # For country-based topologies, use aggregated series obtained from Renewables.ninja
+            countries = list(buses["country"].unique())
+            cap_factor_countries_df = get_cap_factor_for_countries(tech, countries, snapshots, False)
+            cap_factor_df = pd.DataFrame(index=snapshots, columns=buses.index)
+            cap_factor_df[:] = cap_factor_countries_df[buses.country]
+        else:
+            # For region-based topology, compute capacity factors at (rounded) buses position
+            region_type = "onshore_region" if onshore else 'offshore_region'
+            spatial_res = 0.5
+            points = [(round(shape.centroid.x/spatial_res) * spatial_res,
+                       round(shape.centroid.y/spatial_res) * spatial_res)
+                      for shape in buses[region_type].values]
+            cap_factor_df = compute_capacity_factors({tech: points}, spatial_res, snapshots)[tech]
+            cap_factor_df.columns = buses.index
+        return cap_factor_df
+
+    # Capacity factors are shared with the other processes of the node through the time series store (if any)
+    key = (tech, tuple(buses.index), onshore, one_bus_per_country) + get_snapshots_key(snapshots)
+    return stored_time_series("cap_factors", key, compute)
+
+
+def compute_res_data_per_bus(tech: str, buses: pd.DataFrame, tech_config: Dict[str, Any],
+                             one_bus_per_country: bool, snapshots: pd.DatetimeIndex,
+                             use_ex_cap: bool = True) -> (pd.Series, pd.DataFrame, pd.Series):
+    """
+    Compute capacity potentials, capacity factors and legacy capacities of a VRES technology at a series of buses.
+
+    Parameters
+    ----------
+    tech: str
+        Name of the VRES technology.
+    buses: pd.DataFrame
+        Buses at which the technology is added, associated to an onshore or offshore region.
+    tech_config: Dict[str, Any]
+        Configuration of the technology, containing 'filters', 'power_density' and 'onshore' values.
+    one_bus_per_country: bool
+        Whether the topology has one bus per country.
+    snapshots: pd.DatetimeIndex
+        Time stamps at which capacity factors are computed.
+    use_ex_cap: bool (default: True)
+        Whether to take into account existing capacity.
+
+    Returns
+    -------
+    cap_pot_ds: pd.Series
+        Capacity potential at each bus.
+    cap_factor_df: pd.DataFrame
+        Capacity factor time series at each bus.
+    legacy_cap_ds: pd.Series
+        Legacy capacity at each bus.
+
+    """
+
+    # Get the shapes of regions associated to each bus
+    region_type = "onshore_region" if tech_config["onshore"] else 'offshore_region'
+    buses_regions_shapes_ds = buses[region_type]
+    countries = list(buses["country"].unique())
+
+    # Compute capacity potential at each bus
+    # TODO: WARNING: first part of if-else to be removed
+    enspreso = False
+    if enspreso:
+        logger.warning("Capacity potentials computed using ENSPRESO data.")
+        if one_bus_per_country:
+            cap_pot_country_ds = get_capacity_potential_for_countries(tech, countries)
+            cap_pot_ds = pd.Series(index=buses.index)
+            cap_pot_ds[:] = cap_pot_country_ds.loc[buses.country]
+        else:  # topology_type == "regions"
+            cap_pot_ds = get_capacity_potential_for_regions({tech: buses_regions_shapes_ds.values})[tech]
+            cap_pot_ds.index = buses.index
+    else:
+        # Using GLAES
+        filters = tech_config["filters"]
+        power_density = tech_config["power_density"]
+        cap_pot_ds = pd.Series(index=buses.index)
+        cap_pot_ds[:] = get_capacity_potential_for_shapes(buses_regions_shapes_ds.values, filters, power_density)
+
+    # Get one capacity factor time series per bus
+    cap_factor_df = compute_res_cap_factors_per_bus(tech, buses, tech_config["onshore"], one_bus_per_country, snapshots)
+
+    # Compute legacy capacity (not available for wind_floating)
+    legacy_cap_ds = pd.Series(0., index=buses.index)
+    if use_ex_cap and tech != "wind_floating":
+        if one_bus_per_country and len(countries) != 0:
+            legacy_cap_countries = get_legacy_capacity_in_countries(tech, countries)
+            legacy_cap_ds[:] = legacy_cap_countries.loc[buses.country]
+        else:
+            legacy_cap_ds = get_legacy_capacity_in_regions(tech, buses_regions_shapes_ds, countries)
+
+    # Update capacity potentials if legacy capacity is bigger
+    legacy_bigger = cap_pot_ds < legacy_cap_ds
+    cap_pot_ds[legacy_bigger] = legacy_cap_ds[legacy_bigger]
+
+    return cap_pot_ds, cap_factor_df, legacy_cap_ds
+
+
+def is_one_bus_per_country(buses: pd.DataFrame) -> bool:
+    """Return whether each bus is associated to a different country."""
+    if not hasattr(buses, 'country'):
+        return False
+    # Check every bus has a value for this attribute
+    complete = len(buses["country"].dropna()) == len(buses)
+    # Check the values are unique
+    unique = len(buses["country"].unique()) == len(buses)
+    return complete & unique
+
+
+@traced
 def add_generators_per_bus(net: pypsa.Network, technologies: List[str],
-                               use_ex_cap: bool = True, bus_ids: List[str] = None) -> pypsa.Network:
+                           use_ex_cap: bool = True, bus_ids: List[str] = None,
+                           max_workers: int = 1) -> pypsa.Network:
     """
     Add VRES generators to each bus of a PyPSA Network, each bus being associated to a geographical region.
 
@@ -222,6 +403,9 @@ def add_generators_per_bus(net: pypsa.Network, technologies: List[str],
         Whether to take into account existing capacity.
     bus_ids: List[str]
         Subset of buses to which the generators must be added.
+    max_workers: int (default: 1)
+        Maximum number of processes used to compute the data of the different technologies.
+        If equal to 1, technologies are processed one after the other in the current process.
 
     Returns
     -------
@@ -249,97 +433,95 @@ def add_generators_per_bus(net: pypsa.Network, technologies: List[str],
     assert all([len(bus[["onshore_region", "offshore_region"]].dropna()) != 0 for idx, bus in all_buses.iterrows()]), \
         "Error: Each bus must be associated to an 'onshore_region' and/or 'offshore_region' attribute."
 
-    one_bus_per_country = False
-    if hasattr(all_buses, 'country'):
-        # Check every bus has a value for this attribute
-        complete = len(all_buses["country"].dropna()) == len(all_buses)
-        # Check the values are unique
-        unique = len(all_buses["country"].unique()) == len(all_buses)
-        one_bus_per_country = complete & unique
+    one_bus_per_country = is_one_bus_per_country(all_buses)
 
     tech_config_dict = get_config_dict(technologies, ["filters", "power_density", "onshore"])
+
+    # Get buses which are associated to an onshore/offshore region for each technology
+    tech_buses = {}
     for tech in technologies:
+        region_type = "onshore_region" if tech_config_dict[tech]["onshore"] else 'offshore_region'
+        tech_buses[tech] = all_buses.dropna(subset=[region_type], axis=0)
+
+    # Compute data of each technology, possibly in parallel
+    args = [(tech, tech_buses[tech], tech_config_dict[tech], one_bus_per_country, net.snapshots, use_ex_cap)
+            for tech in technologies]
+    if max_workers == 1:
+        tech_data = [compute_res_data_per_bus(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            tech_data = list(executor.map(compute_res_data_per_bus, *zip(*args)))
+
+    # Merge data of all technologies
+    gens_index, gens_attrs, p_max_pu_dfs = [], [], []
+    for tech, (cap_pot_ds, cap_factor_df, legacy_cap_ds) in zip(technologies, tech_data):
+        buses = tech_buses[tech]
+        tech_gens_index = buses.index + f" Gen {tech}"
+        capital_cost, marginal_cost = get_costs(tech, len(net.snapshots))
+        gens_index += [tech_gens_index]
+        gens_attrs += [pd.DataFrame({"bus": buses.index,
+                                     "p_nom": legacy_cap_ds.reindex(buses.index).values,
+                                     "p_nom_max": cap_pot_ds.reindex(buses.index).values,
+                                     "type": tech,
+                                     "x": buses.x.values,
+                                     "y": buses.y.values,
+                                     "marginal_cost": marginal_cost,
+                                     "capital_cost": capital_cost}, index=tech_gens_index)]
+        p_max_pu_dfs += [pd.DataFrame(cap_factor_df.reindex(columns=buses.index).values,
+                                      index=net.snapshots, columns=tech_gens_index)]
+
+    if len(gens_attrs) == 0:
+        return net
+    gens = pd.concat(gens_attrs)
+
+    # Adding to the network
+    net.madd("Generator",
+             gens.index,
+             bus=gens.bus.values,
+             p_nom_extendable=True,
+             p_nom=gens.p_nom.values,
+             p_nom_min=gens.p_nom.values,
+             p_nom_max=gens.p_nom_max.values,
+             p_min_pu=0.,
+             p_max_pu=pd.concat(p_max_pu_dfs, axis=1).astype(float),
+             type=gens.type.values,
+             x=gens.x.values,
+             y=gens.y.values,
+             marginal_cost=gens.marginal_cost.values,
+             capital_cost=gens.capital_cost.values)
 
-        # Detect if technology is onshore(/offshore) based
-        onshore_tech = tech_config_dict[tech]["onshore"]
-
-        # Get buses which are associated to an onshore/offshore region
-        region_type = "onshore_region" if onshore_tech else 'offshore_region'
-        buses = all_buses.dropna(subset=[region_type], axis=0)
-        countries = list(buses["country"].unique())
-
-        # Get the shapes of regions associated to each bus
-        buses_regions_shapes_ds = buses[region_type]
-
-        # Compute capacity potential at each bus
-        # TODO: WARNING: first part of if-else to be removed
-        enspreso = False
-        if enspreso:
-            logger.warning("Capacity potentials computed using ENSPRESO data.")
-            if one_bus_per_country:
-                cap_pot_country_ds = get_capacity_potential_for_countries(tech, countries)
-                cap_pot_ds = pd.Series(index=buses.index)
-                cap_pot_ds[:] = cap_pot_country_ds.loc[buses.country]
-            else:  # topology_type == "regions"
-                cap_pot_ds = get_capacity_potential_for_regions({tech: buses_regions_shapes_ds.values})[tech]
-                cap_pot_ds.index = buses.index
-        else:
-            # Using GLAES
-            filters = tech_config_dict[tech]["filters"]
-            power_density = tech_config_dict[tech]["power_density"]
-            cap_pot_ds = pd.Series(index=buses.index)
-            cap_pot_ds[:] = get_capacity_potential_for_shapes(buses_regions_shapes_ds.values, filters, power_density)
+    return net
 
-        # Get one capacity factor time series per bus
-        if one_bus_per_country:
-            # For country-based topologies, use aggregated series obtained from Renewables.ninja
-            cap_factor_countries_df = get_cap_factor_for_countries(tech, countries, net.snapshots, False)
-            cap_factor_df = pd.DataFrame(index=net.snapshots, columns=buses.index)
-            cap_factor_df[:] = cap_factor_countries_df[buses.country]
-        else:
-            # For region-based topology, compute capacity factors at (rounded) buses position
-            spatial_res = 0.5
-            points = [(round(shape.centroid.x/spatial_res) * spatial_res,
-                       round(shape.centroid.y/spatial_res) * spatial_res)
-                      for shape in buses_regions_shapes_ds.values]
-            cap_factor_df = compute_capacity_factors({tech: points}, spatial_res, net.snapshots)[tech]
-            cap_factor_df.columns = buses.index
+def get_cap_factors_per_bus(net: pypsa.Network, snapshots: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Compute the capacity factors of the generators added by add_generators_per_bus at other time stamps.
 
-        # Compute legacy capacity (not available for wind_floating)
-        legacy_cap_ds = pd.Series(0., index=buses.index)
-        if use_ex_cap and tech != "wind_floating":
-            if one_bus_per_country and len(countries) != 0:
-                legacy_cap_countries = get_legacy_capacity_in_countries(tech, countries)
-                legacy_cap_ds[:] = legacy_cap_countries.loc[buses.country]
-            else:
-                legacy_cap_ds = get_legacy_capacity_in_regions(tech, buses_regions_shapes_ds, countries)
-
-        # Update capacity potentials if legacy capacity is bigger
-        for bus in buses.index:
-            if cap_pot_ds.loc[bus] < legacy_cap_ds.loc[bus]:
-                cap_pot_ds.loc[bus] = legacy_cap_ds.loc[bus]
-
-        # Get costs
-        capital_cost, marginal_cost = get_costs(tech, len(net.snapshots))
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with generators added by add_generators_per_bus.
+    snapshots: pd.DatetimeIndex
+        Time stamps at which capacity factors are computed (e.g. the snapshots of another weather year).
 
-        # Adding to the network
-        net.madd("Generator",
-                 buses.index,
-                 suffix=f" Gen {tech}",
-                 bus=buses.index,
-                 p_nom_extendable=True,
-                 p_nom=legacy_cap_ds,
-                 p_nom_min=legacy_cap_ds,
-                 p_nom_max=cap_pot_ds,
-                 p_min_pu=0.,
-                 p_max_pu=cap_factor_df,
-                 type=tech,
-                 x=buses.x.values,
-                 y=buses.y.values,
-                 marginal_cost=marginal_cost,
-                 capital_cost=capital_cost)
+    Returns
+    -------
+    pd.DataFrame
+        Capacity factors of the generators (snapshots x generators).
+    """
 
-    return net
+    gens = net.generators[net.generators.index == net.generators.bus + " Gen " + net.generators.type]
+    all_buses = net.buses[net.buses['country'].notna()]
+    one_bus_per_country = is_one_bus_per_country(all_buses)
+
+    cap_factor_dfs = []
+    for tech, tech_gens in gens.groupby("type"):
+        onshore = get_config_values(tech, ['onshore'])
+        cap_factor_df = compute_res_cap_factors_per_bus(tech, all_buses.loc[tech_gens.bus], onshore,
+                                                        one_bus_per_country, snapshots)
+        cap_factor_dfs += [pd.DataFrame(cap_factor_df.values, index=snapshots, columns=tech_gens.index)]
+
+    return pd.concat(cap_factor_dfs, axis=1).astype(float) if len(cap_factor_dfs) \
+        else pd.DataFrame(index=snapshots)
 
 # def add_generators_using_siting(net: pypsa.Network, topology_type: str, technologies: List[str],
 #                                 region: str, siting_params: Dict[str, Any],
@@ -0,0 +1,7 @@
+from network.globals.array.co2 import add_co2_budget_per_country, add_co2_budget_global
+from network.globals.array.dispatchable import dispatchable_capacity_lower_bound, add_planning_reserve_constraint
+from network.globals.array.imports import add_import_limit_constraint
+from network.globals.array.mga import min_links_capacity
+from network.globals.array.snsp import add_snsp_constraint_tyndp
+from network.globals.array.store import store_links_constraint
+from network.globals.array.curtailment import add_curtailment_penalty_term, add_curtailment_constraints
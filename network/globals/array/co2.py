@@ -0,0 +1,80 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.linopt import get_var, define_constraints
+
+from iepy.technologies import get_fuel_info, get_tech_info
+from iepy.indicators.emissions import get_reference_emission_levels_for_region, get_co2_emission_level_for_country
+from network.globals.array.expressions import LinearExpression
+from network.instrumentation import traced
+
+
+def get_emissions_expression(net: pypsa.Network) -> LinearExpression:
+    """Return the expression of the CO2 emissions of each emitting generator, summed over (weighted) time."""
+
+    # Drop generators without an associated carrier (i.e., technologies not emitting)
+    gens = net.generators[net.generators.carrier.astype(bool)]
+    emissions = pd.Series(index=gens.index, dtype=float)
+    for tech in gens.type.unique():
+        fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
+        fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
+        emissions[gens.type == tech] = fuel_emissions_el.values[0] / efficiency
+
+    weightings = net.snapshot_weightings[net.snapshots]
+    coefficients = pd.DataFrame(np.outer(weightings, emissions), index=net.snapshots, columns=gens.index)
+    return LinearExpression.from_variables(get_var(net, 'Generator', 'p')[gens.index], coefficients).sum(0)
+
+
+@traced
+def add_co2_budget_global(net: pypsa.Network, region: str, co2_reduction_share: float, co2_reduction_refyear: int):
+    """
+    Add global CO2 budget.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    region: str
+        Region over which the network is defined.
+    co2_reduction_share: float
+        Percentage of reduction of emission.
+    co2_reduction_refyear: int
+        Reference year from which the reduction in emission is computed.
+
+    """
+
+    co2_reference_kt = get_reference_emission_levels_for_region(region, co2_reduction_refyear)
+    co2_budget = co2_reference_kt * (1 - co2_reduction_share) * net.snapshot_weightings[net.snapshots].sum() / 8760.
+
+    lhs = get_emissions_expression(net).sum(0)
+    define_constraints(net, lhs.to_strings(), '<=', co2_budget, 'generation_emissions_global')
+
+
+@traced
+def add_co2_budget_per_country(net: pypsa.Network, co2_reduction_share: Dict[str, float], co2_reduction_refyear: int):
+    """
+    Add CO2 budget per country, with one constraint for all buses with a load.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    co2_reduction_share: Dict[str, float]
+        Percentage of reduction of emission for each bus.
+    co2_reduction_refyear: int
+        Reference year from which the reduction in emission is computed.
+
+    """
+
+    buses = pd.Index(net.loads.bus.unique())
+    emissions_reference = pd.Series([get_co2_emission_level_for_country(bus, co2_reduction_refyear) for bus in buses],
+                                    index=buses)
+    nb_hours = net.snapshot_weightings[net.snapshots].sum()
+    co2_budget = (1 - pd.Series(co2_reduction_share)[buses]) * emissions_reference * nb_hours / 8760.
+
+    lhs = get_emissions_expression(net)
+    lhs = lhs.groupby_sum(net.generators.bus, buses)
+    define_constraints(net, lhs.to_strings(), '<=', co2_budget, 'Bus', 'generation_emissions')
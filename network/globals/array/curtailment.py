@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+from pypsa.linopt import get_var, define_constraints, write_objective
+
+from network.globals.array.expressions import LinearExpression, padding
+from network.globals.nomopyomo.curtailment import get_curtailable_generators
+from network.instrumentation import traced
+
+
+@traced
+def add_curtailment_penalty_term(net: pypsa.Network, snapshots: pd.DatetimeIndex, curtailment_cost: float):
+    """
+    Add curtailment penalties to the objective function.
+
+    Curtailment is modelled as the linear expression p_max_pu * p_nom - p, weighted by the snapshot weightings,
+    whose constant part (coming from non-extendable generators) is dropped.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    curtailment_cost: float
+        Cost of curtailing in M€/MWh # TODO: to be checked
+
+    """
+
+    gens = get_curtailable_generators(net)
+    if len(gens) == 0:
+        return
+
+    weightings = net.snapshot_weightings[snapshots]
+    gens_p_max_pu = get_switchable_as_dense(net, 'Generator', 'p_max_pu', snapshots)[gens]
+    gens_p_nom = get_var(net, 'Generator', 'p_nom')
+    ext_gens = gens.intersection(gens_p_nom.index)
+
+    capacity_terms = LinearExpression.from_variables(gens_p_nom[ext_gens],
+                                                     curtailment_cost * gens_p_max_pu.mul(weightings, axis=0).sum())
+    generation_coefficients = pd.DataFrame(-curtailment_cost, index=snapshots, columns=gens).mul(weightings, axis=0)
+    generation_terms = LinearExpression.from_variables(get_var(net, 'Generator', 'p').loc[snapshots, gens],
+                                                       generation_coefficients)
+    write_objective(net, capacity_terms.to_strings())
+    write_objective(net, generation_terms.to_strings())
+
+
+@traced
+def add_curtailment_constraints(net: pypsa.Network, snapshots: pd.DatetimeIndex, allowed_curtailment_share: float):
+    """
+    Add extra constrains limiting curtailment of each generator, at each time step, as a share of p_max_pu*p_nom.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    allowed_curtailment_share: float
+        Maximum allowed share of generation that can be curtailed.
+
+    """
+
+    gens = get_curtailable_generators(net)
+    if len(gens) == 0:
+        return
+
+    gens_p_max_pu = get_switchable_as_dense(net, 'Generator', 'p_max_pu', snapshots)[gens]
+    gens_p_nom = get_var(net, 'Generator', 'p_nom').reindex(gens, fill_value=padding)
+    extendable = gens_p_nom != padding
+
+    # -p <= -(1 - share) * p_max_pu * p_nom, with p_nom moved to the left-hand side for extendable generators
+    p_nom_labels = pd.DataFrame(np.broadcast_to(gens_p_nom.values, gens_p_max_pu.shape), index=snapshots, columns=gens)
+    lhs = LinearExpression.from_variables(get_var(net, 'Generator', 'p').loc[snapshots, gens], -1.) \
+        + LinearExpression.from_variables(p_nom_labels, (1. - allowed_curtailment_share) * gens_p_max_pu)
+    rhs = -(1. - allowed_curtailment_share) * gens_p_max_pu * net.generators.p_nom[gens].where(~extendable, 0.)
+
+    define_constraints(net, lhs.to_strings(), '<=', rhs, 'Generator', 'curtailment')
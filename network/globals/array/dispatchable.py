@@ -0,0 +1,107 @@
+from typing import Dict
+
+import pandas as pd
+
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+from pypsa.linopt import get_var, define_constraints
+
+from network.globals.array.expressions import LinearExpression
+from network.instrumentation import traced
+
+# TODO: extend for different topologies, if necessary
+dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
+res_technologies = ['wind_onshore', 'wind_offshore', 'pv_utility', 'pv_residential']
+
+
+def get_dispatchable_capacity(net: pypsa.Network, buses: pd.Index) -> (LinearExpression, pd.Series):
+    """
+    Return the dispatchable capacity at each bus.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    buses: pd.Index
+        Buses at which the capacity is computed.
+
+    Returns
+    -------
+    LinearExpression
+        Sum of the capacity variables of extendable dispatchable generators and storage units at each bus.
+    pd.Series
+        Sum of the minimum capacities of non-extendable dispatchable generators and storage units at each bus.
+    """
+
+    lhs = None
+    legacy = pd.Series(0., index=buses)
+    for c, df in [('Generator', net.generators), ('StorageUnit', net.storage_units)]:
+        df = df[df.type.isin(dispatchable_technologies)]
+        p_nom = get_var(net, c, 'p_nom')
+        p_nom = p_nom[p_nom.index.intersection(df.index)]
+        expr = LinearExpression.from_variables(p_nom).groupby_sum(df.bus, buses)
+        lhs = expr if lhs is None else lhs + expr
+        legacy += df.p_nom_min[~df.p_nom_extendable].groupby(df.bus).sum().reindex(buses, fill_value=0.)
+
+    return lhs, legacy
+
+
+def get_peak_load(net: pypsa.Network) -> pd.Series:
+    """Return the peak load of each bus with a load."""
+    return get_switchable_as_dense(net, 'Load', 'p_set').groupby(net.loads.bus, axis=1).sum().max()
+
+
+@traced
+def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
+    """
+    Constraint that ensures a minimum dispatchable installed capacity.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+
+    thresholds: Dict
+        Dict containing scalar thresholds for disp_capacity/peak_load for each bus
+    """
+
+    load_peak = get_peak_load(net)
+    buses = load_peak.index.intersection(pd.Index(thresholds.keys()))
+    if len(buses) == 0:
+        return
+
+    lhs, legacy = get_dispatchable_capacity(net, buses)
+    rhs = (load_peak[buses] * pd.Series(thresholds)[buses] - legacy).clip(lower=0.)
+
+    define_constraints(net, lhs.to_strings(), '>=', rhs, 'Bus', 'disp_capacity_lower_bound')
+
+
+@traced
+def add_planning_reserve_constraint(net: pypsa.Network, prm: float):
+    """
+    Constraint that ensures a minimum firm capacity, including the capacity credit of RES generators.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    prm: float
+        Planning reserve margin.
+    """
+
+    load_peak = get_peak_load(net)
+    buses = load_peak.index
+    lhs, legacy = get_dispatchable_capacity(net, buses)
+
+    gens_p_nom = get_var(net, 'Generator', 'p_nom')
+    res_gens = net.generators.loc[gens_p_nom.index]
+    res_gens = res_gens[res_gens.type.str.contains('|'.join(res_technologies))]
+    # Capacity credits are indexed by generator names without their bus
+    capacity_credits = pd.Series(net.cc_ds.loc[[' '.join(gen.split(' ')[1:]) for gen in res_gens.index]].values,
+                                 index=res_gens.index)
+    res_capacity = LinearExpression.from_variables(gens_p_nom[res_gens.index], capacity_credits)
+    lhs += res_capacity.groupby_sum(res_gens.bus, buses)
+
+    rhs = load_peak * (1 + prm) - legacy
+
+    define_constraints(net, lhs.to_strings(), '>=', rhs, 'Bus', 'planning_reserve_margin')
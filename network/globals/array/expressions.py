@@ -0,0 +1,140 @@
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from pypsa.linopt import linexpr
+
+# Label of the terms used to pad expressions which do not all have the same number of terms
+padding = -1
+
+
+class LinearExpression:
+    """
+    Linear expressions stored as arrays of coefficients and variable labels.
+
+    The arrays have one axis per coordinate (e.g. snapshots and components) and a last axis holding the terms
+    of each expression. Expressions with fewer terms than the others are padded with terms whose label is -1.
+    Expressions are only converted to the strings written by pypsa.linopt when they are added to the model.
+
+    Parameters
+    ----------
+    coeffs: np.ndarray
+        Coefficient of each term.
+    labels: np.ndarray
+        Label of the variable of each term (as returned by pypsa.linopt.get_var).
+    coords: List[pd.Index]
+        Labels of each axis of the arrays except the last one.
+    """
+
+    def __init__(self, coeffs: np.ndarray, labels: np.ndarray, coords: List[pd.Index]):
+        assert coeffs.shape == labels.shape, "Error: Coefficients and labels must have the same shape."
+        assert coeffs.ndim == len(coords) + 1, \
+            "Error: Labels must be given for each axis of the expressions except the terms axis."
+        self.coeffs = coeffs
+        self.labels = labels
+        self.coords = list(coords)
+
+    @classmethod
+    def from_variables(cls, labels: Union[pd.Series, pd.DataFrame],
+                       coeffs: Union[float, pd.Series, pd.DataFrame] = 1.) -> 'LinearExpression':
+        """
+        Create expressions made of one term for each variable.
+
+        Parameters
+        ----------
+        labels: Union[pd.Series, pd.DataFrame]
+            Variable labels (as returned by pypsa.linopt.get_var). Labels equal to -1 are ignored.
+        coeffs: Union[float, pd.Series, pd.DataFrame] (default: 1.)
+            Coefficient of each variable. For a frame of variables, a series of coefficients is aligned on its columns.
+
+        Returns
+        -------
+        LinearExpression
+            Expressions with the same coordinates as the variables.
+        """
+        if isinstance(labels, pd.DataFrame):
+            coords = [labels.index, labels.columns]
+            if isinstance(coeffs, pd.DataFrame):
+                coeffs = coeffs.reindex(index=labels.index, columns=labels.columns).values
+            elif isinstance(coeffs, pd.Series):
+                coeffs = coeffs.reindex(labels.columns).values[np.newaxis, :]
+        else:
+            coords = [labels.index]
+            if isinstance(coeffs, pd.Series):
+                coeffs = coeffs.reindex(labels.index).values
+        coeffs = np.broadcast_to(np.asarray(coeffs, dtype=float), labels.shape)
+        return cls(coeffs[..., np.newaxis].copy(), labels.values.astype(int)[..., np.newaxis], coords)
+
+    def __add__(self, other: 'LinearExpression') -> 'LinearExpression':
+        assert len(self.coords) == len(other.coords) \
+            and all(a.equals(b) for a, b in zip(self.coords, other.coords)), \
+            "Error: Only expressions with the same coordinates can be added."
+        return LinearExpression(np.concatenate([self.coeffs, other.coeffs], axis=-1),
+                                np.concatenate([self.labels, other.labels], axis=-1), self.coords)
+
+    def sum(self, axis: int = 0) -> 'LinearExpression':
+        """Sum the expressions along an axis, whose expressions become terms of the resulting expressions."""
+        shape = self.labels.shape[:axis] + self.labels.shape[axis+1:-1] \
+            + (self.labels.shape[axis] * self.labels.shape[-1], )
+        return LinearExpression(np.moveaxis(self.coeffs, axis, -2).reshape(shape),
+                                np.moveaxis(self.labels, axis, -2).reshape(shape),
+                                self.coords[:axis] + self.coords[axis+1:])
+
+    def groupby_sum(self, keys: pd.Series, groups: pd.Index = None, axis: int = 0) -> 'LinearExpression':
+        """
+        Sum the expressions of each group of elements along an axis.
+
+        Parameters
+        ----------
+        keys: pd.Series
+            Group of each element of the axis, indexed by the labels of the axis.
+        groups: pd.Index (default: None)
+            Groups kept in the resulting expressions, in this order. Elements of other groups are dropped
+            and groups without elements give empty expressions. If None, all groups, sorted.
+        axis: int (default: 0)
+            Axis along which elements are grouped.
+
+        Returns
+        -------
+        LinearExpression
+            Expressions whose axis is replaced by the groups.
+        """
+        keys = keys.reindex(self.coords[axis])
+        groups = pd.Index(keys.dropna().unique()).sort_values() if groups is None else groups
+        codes = groups.get_indexer(keys.values)
+        kept = codes != -1
+        codes = codes[kept]
+
+        # Position of each element in its group, to lay out the elements of each group side by side
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(groups))
+        positions = np.arange(len(codes)) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = counts.max() if len(codes) else 0
+
+        coeffs = np.moveaxis(self.coeffs, axis, 0)[kept][order]
+        labels = np.moveaxis(self.labels, axis, 0)[kept][order]
+        grouped_coeffs = np.zeros((len(groups), width) + coeffs.shape[1:])
+        grouped_labels = np.full((len(groups), width) + labels.shape[1:], padding)
+        grouped_coeffs[codes[order], positions] = coeffs
+        grouped_labels[codes[order], positions] = labels
+
+        coords = [groups, pd.RangeIndex(width)] + self.coords[:axis] + self.coords[axis+1:]
+        expr = LinearExpression(grouped_coeffs, grouped_labels, coords).sum(1)
+        return LinearExpression(np.moveaxis(expr.coeffs, 0, axis), np.moveaxis(expr.labels, 0, axis),
+                                self.coords[:axis] + [groups] + self.coords[axis+1:])
+
+    def to_strings(self) -> Union[str, pd.Series, pd.DataFrame]:
+        """Convert the expressions to the strings of pypsa.linopt, with the same coordinates."""
+        shape = self.labels.shape[:-1]
+        rows = np.broadcast_to(np.arange(int(np.prod(shape))).reshape(shape + (1, )), self.labels.shape).ravel()
+        labels = self.labels.ravel()
+        written = labels != padding
+        terms = linexpr((self.coeffs.ravel()[written], labels[written]), as_pandas=False)
+        exprs = pd.Series(terms, dtype=object).groupby(rows[written]).sum() \
+            .reindex(np.arange(int(np.prod(shape))), fill_value='').values.reshape(shape)
+        if len(shape) == 0:
+            return exprs.item()
+        if len(shape) == 1:
+            return pd.Series(exprs, index=self.coords[0])
+        return pd.DataFrame(exprs, index=self.coords[0], columns=self.coords[1])
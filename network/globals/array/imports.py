@@ -0,0 +1,52 @@
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+from pypsa.linopt import get_var, define_constraints
+
+from network.globals.array.expressions import LinearExpression
+from network.topology import get_incidence_matrix
+from network.instrumentation import traced
+
+
+@traced
+def add_import_limit_constraint(net: pypsa.Network, import_share: Union[float, Dict[str, float]]):
+    """
+    Add per-bus constraint on import budgets.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    import_share: Union[float, Dict[str, float]]
+        Maximum share of load that can be satisfied via imports, either for all buses with a load
+        or for each bus (buses which are not in the dictionary are not constrained).
+
+    """
+
+    links_p = get_var(net, 'Link', 'p')
+    links = net.links.loc[links_p.columns]
+
+    # Import budget of each bus with a load (loads and flows are summed over time with the snapshot weightings)
+    weightings = net.snapshot_weightings[net.snapshots]
+    load = get_switchable_as_dense(net, 'Load', 'p_set').mul(weightings, axis=0).sum().groupby(net.loads.bus).sum()
+    if isinstance(import_share, dict):
+        shares = pd.Series(import_share).reindex(load.index).dropna()
+    else:
+        shares = pd.Series(import_share, index=load.index)
+    if len(shares) == 0:
+        return
+
+    # Flow of each link summed over time, with one row per non-zero entry of the incidence matrix
+    # signed positively at the end bus of the link and negatively at its start bus
+    coeffs = pd.DataFrame(np.outer(weightings, np.ones(len(links))), index=links_p.index, columns=links_p.columns)
+    flows = LinearExpression.from_variables(links_p, coeffs).sum(0)
+    incidence = get_incidence_matrix(net.buses.index, links)
+    entries = LinearExpression(flows.coeffs[incidence.col] * incidence.data[:, np.newaxis],
+                               flows.labels[incidence.col], [pd.RangeIndex(incidence.nnz)])
+    lhs = entries.groupby_sum(pd.Series(net.buses.index[incidence.row]), shares.index)
+
+    define_constraints(net, lhs.to_strings(), '<=', load[shares.index] * shares, 'Bus', 'import_limit')
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.linopt import get_var, define_constraints, write_objective
+
+from network.globals.array.expressions import LinearExpression
+from network.instrumentation import traced
+
+
+def add_mga_constraint(net: pypsa.Network, epsilon: float):
+    """Constrain the cost of the network to be at most (1 + epsilon) times its optimal cost."""
+
+    cost = None
+    exist_cap_cost = 0.
+    for c, df, opex_attr in [('Generator', net.generators, 'p'), ('StorageUnit', net.storage_units, 'p_dispatch'),
+                             ('Link', net.links, None)]:
+        # Capital cost
+        p_nom = get_var(net, c, 'p_nom')
+        exts = df.loc[p_nom.index]
+        exist_cap_cost += (exts.p_nom * exts.capital_cost).sum()
+        terms = [LinearExpression.from_variables(p_nom, exts.capital_cost).sum(0)]
+        # Marginal cost (weighted by the snapshot weightings as in the objective)
+        if opex_attr is not None:
+            p = get_var(net, c, opex_attr)
+            coeffs = pd.DataFrame(np.outer(net.snapshot_weightings[p.index], df.marginal_cost[p.columns]),
+                                  index=p.index, columns=p.columns)
+            terms += [LinearExpression.from_variables(p, coeffs).sum(0).sum(0)]
+        for term in terms:
+            cost = term if cost is None else cost + term
+
+    obj = net.objective * (1 + epsilon) + exist_cap_cost
+
+    define_constraints(net, cost.to_strings(), '<=', obj, 'mga', 'obl')
+
+
+def add_mga_objective(net: pypsa.Network):
+    """Minimize transmission capacity (in TWkm)."""
+    link_p_nom = get_var(net, 'Link', 'p_nom')[net.links_to_minimize]
+    link_capacity = LinearExpression.from_variables(link_p_nom, net.links.length[net.links_to_minimize]).sum(0)
+    write_objective(net, link_capacity.to_strings())
+
+
+@traced
+def min_links_capacity(net: pypsa.Network, epsilon: float):
+
+    add_mga_constraint(net, epsilon)
+    add_mga_objective(net)
@@ -0,0 +1,42 @@
+import pandas as pd
+
+import pypsa
+from pypsa.linopt import get_var, define_constraints
+
+from network.globals.array.expressions import LinearExpression
+from network.instrumentation import traced
+
+
+@traced
+def add_snsp_constraint_tyndp(net: pypsa.Network, snapshots: pd.DatetimeIndex, snsp_share: float):
+    """
+    Add system non-synchronous generation share constraint to the model.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    snsp_share: float
+        Share of system non-synchronous generation.
+
+    """
+    # TODO: DC to be included, however the constraint should then be imposed on a nodal basis
+    nonsync_gen_types = 'wind|pv'
+    nonsync_storage_types = ['Li-ion']
+
+    gens, sus = net.generators, net.storage_units
+    if len(gens) + len(sus) == 0:
+        return
+
+    gens_coef = pd.Series(-snsp_share, index=gens.index)
+    gens_coef[gens.type.str.contains(nonsync_gen_types)] += 1.
+    sus_coef = pd.Series(-snsp_share, index=sus.index)
+    sus_coef[sus.type.isin(nonsync_storage_types)] += 1.
+
+    lhs = LinearExpression.from_variables(get_var(net, 'Generator', 'p').loc[snapshots, gens.index], gens_coef).sum(1) \
+        + LinearExpression.from_variables(get_var(net, 'StorageUnit', 'p_dispatch').loc[snapshots, sus.index],
+                                          sus_coef).sum(1)
+
+    define_constraints(net, lhs.to_strings(), '<=', 0., 'snsp')
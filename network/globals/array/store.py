@@ -0,0 +1,39 @@
+import pandas as pd
+
+import pypsa
+from pypsa.linopt import get_var, define_constraints
+
+from network.components.battery import get_store_links
+from network.globals.array.expressions import LinearExpression
+from network.instrumentation import traced
+
+
+@traced
+def store_links_constraint(net: pypsa.Network, ctd_ratio: float):
+    """
+    Constraint that links the charging and discharging ratings of store units.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+        and containing a functionality configuration dictionary
+    ctd_ratio: float
+        Pre-defined charge-to-discharge ratio for such units.
+
+    """
+
+    links_p_nom = get_var(net, 'Link', 'p_nom')
+
+    store_links = get_store_links(net)
+    store_links = store_links[store_links.discharge.isin(links_p_nom.index)
+                              & store_links.charge.isin(links_p_nom.index)]
+    if len(store_links) == 0:
+        return
+
+    discharge_p_nom = pd.Series(links_p_nom[store_links.discharge].values, index=store_links.index)
+    charge_p_nom = pd.Series(links_p_nom[store_links.charge].values, index=store_links.index)
+    lhs = LinearExpression.from_variables(discharge_p_nom, ctd_ratio) \
+        + LinearExpression.from_variables(charge_p_nom, -1.)
+
+    define_constraints(net, lhs.to_strings(), '==', 0., 'Link', 'store_links_ratio')
@@ -1,3 +1,5 @@
+from typing import Dict, Any
+
 import pandas as pd
 
 import pypsa
@@ -5,10 +7,15 @@ import pypsa
 from iepy.technologies import get_config_values
 from iepy.geographics import get_subregions
 
+from network.instrumentation import traced
+
 import logging
 logger = logging.getLogger()
 
+backends = ['pyomo', 'nomopyomo', 'array']
+
 
+@traced
 def add_extra_functionalities(net: pypsa.Network, snapshots: pd.DatetimeIndex):
     """
     Wrapper for the inclusion of multiple extra_functionalities.
@@ -17,7 +24,9 @@ def add_extra_functionalities(net: pypsa.Network, snapshots: pd.DatetimeIndex):
     ----------
     net: pypsa.Network
         A PyPSA Network instance with buses associated to regions
-        and containing a functionality configuration dictionary
+        and containing a functionality configuration dictionary.
+        The backend building the functionalities is given by the optional 'backend' field of the configuration
+        (one of 'pyomo', 'nomopyomo' and 'array', by default 'pyomo' or 'nomopyomo' depending on the 'pyomo' field).
     snapshots: pd.DatetimeIndex
         Network snapshots.
 
@@ -32,27 +41,26 @@ def add_extra_functionalities(net: pypsa.Network, snapshots: pd.DatetimeIndex):
     conf_func = net.config["functionalities"]
 
     pyomo = net.config['pyomo']
-    if pyomo:
+    # Without pyomo, functionalities can be built with pandas strings ('nomopyomo') or with arrays ('array')
+    backend = net.config.get('backend', 'pyomo' if pyomo else 'nomopyomo')
+    assert backend in backends, f"Error: Backend {backend} is not one of {backends}."
+    assert (backend == 'pyomo') == pyomo, f"Error: Backend {backend} cannot be used with pyomo={pyomo}."
+    if backend == 'pyomo':
         import network.globals.pyomo as funcs
-    else:
+    elif backend == 'nomopyomo':
         import network.globals.nomopyomo as funcs
+    else:
+        import network.globals.array as funcs
 
-    # Some functionalities are currently only implemented in pyomo
     if 'snsp' in conf_func and conf_func["snsp"]["include"]:
-        if pyomo:
-            funcs.add_snsp_constraint_tyndp(net, snapshots, conf_func["snsp"]["share"])
-        else:
-            logger.warning('SNSP functionality is currently not implented in nomopyomo')
+        funcs.add_snsp_constraint_tyndp(net, snapshots, conf_func["snsp"]["share"])
 
-    if 'curtailement' in conf_func and conf_func["curtailment"]["include"]:
-        if pyomo:
-            strategy = conf_func["curtailment"]["strategy"][0]
-            if strategy == 'economic':
-                funcs.add_curtailment_penalty_term(net, snapshots, conf_func["curtailment"]["strategy"][1])
-            elif strategy == 'technical':
-                funcs.add_curtailment_constraints(net, snapshots, conf_func["curtailment"]["strategy"][1])
-        else:
-            logger.warning('Curtailement functionality is currently not implented in nomopyomo')
+    if 'curtailment' in conf_func and conf_func["curtailment"]["include"]:
+        strategy = conf_func["curtailment"]["strategy"][0]
+        if strategy == 'economic':
+            funcs.add_curtailment_penalty_term(net, snapshots, conf_func["curtailment"]["strategy"][1])
+        elif strategy == 'technical':
+            funcs.add_curtailment_constraints(net, snapshots, conf_func["curtailment"]["strategy"][1])
 
     if "co2_emissions" in conf_func and conf_func["co2_emissions"]["include"]:
         strategy = conf_func["co2_emissions"]["strategy"]
@@ -69,11 +77,19 @@ def add_extra_functionalities(net: pypsa.Network, snapshots: pd.DatetimeIndex):
             funcs.add_co2_budget_global(net, net.config["region"], mitigation_factor, ref_year)
 
     if 'import_limit' in conf_func and conf_func["import_limit"]["include"]:
-        funcs.add_import_limit_constraint(net, conf_func["import_limit"]["share"])
+        import_share = conf_func["import_limit"]["share"]
         if pyomo:
             # TODO: this is not very robust
             countries = get_subregions(net.config['region'])
-            funcs.add_import_limit_constraint(net, conf_func["import_limit"]["share"], countries)
+            funcs.add_import_limit_constraint(net, import_share, countries)
+        else:
+            # Shares can be given for each country in the main region
+            if isinstance(import_share, list):
+                countries = get_subregions(net.config['region'])
+                assert len(countries) == len(import_share), \
+                    "Error: an import share must be given for each country in the main region."
+                import_share = dict(zip(countries, import_share))
+            funcs.add_import_limit_constraint(net, import_share)
 
     if 'techs' in net.config and 'battery' in net.config["techs"] and\
             not net.config["techs"]["battery"]["fixed_duration"]:
@@ -98,3 +114,49 @@ def add_extra_functionalities(net: pypsa.Network, snapshots: pd.DatetimeIndex):
             funcs.min_links_capacity(net, epsilon)
         else:
             logger.warning('MGA functionality is currently not implented in nomopyomo')
+
+
+def get_functionality_parameters(net: pypsa.Network) -> Dict[str, Any]:
+    """
+    Return the values of the parameters of the functionalities of a network built with the 'pyomo' backend.
+
+    Parameters are the mutable pyomo Params added to the model by add_extra_functionalities, so that
+    a model built for a configuration can be updated to another one (see network.solvers.persistent).
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance containing a functionality configuration dictionary.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Value of each parameter (a dictionary indexed by country for parameters defined per country),
+        indexed by the name of the parameter in the pyomo model.
+    """
+
+    conf_func = net.config["functionalities"]
+
+    parameters = {}
+    if 'snsp' in conf_func and conf_func["snsp"]["include"]:
+        parameters["snsp_share"] = conf_func["snsp"]["share"]
+
+    if 'curtailment' in conf_func and conf_func["curtailment"]["include"]:
+        strategy, value = conf_func["curtailment"]["strategy"]
+        parameters["curtailment_cost" if strategy == 'economic' else "allowed_curtailment_share"] = value
+
+    if "co2_emissions" in conf_func and conf_func["co2_emissions"]["include"]:
+        mitigation_factor = conf_func["co2_emissions"]["mitigation_factor"]
+        if conf_func["co2_emissions"]["strategy"] == 'country':
+            countries = get_subregions(net.config['region'])
+            parameters["co2_reduction_share_per_country"] = dict(zip(countries, mitigation_factor))
+        else:
+            parameters["co2_reduction_share"] = mitigation_factor
+
+    if 'import_limit' in conf_func and conf_func["import_limit"]["include"]:
+        parameters["import_share"] = conf_func["import_limit"]["share"]
+
+    if 'prm' in conf_func and conf_func["prm"]["include"]:
+        parameters["prm"] = conf_func["prm"]["PRM"]
+
+    return parameters
@@ -2,5 +2,6 @@ from network.globals.nomopyomo.co2 import add_co2_budget_per_country, add_co2_bu
 from network.globals.nomopyomo.dispatchable import dispatchable_capacity_lower_bound, add_planning_reserve_constraint
 from network.globals.nomopyomo.imports import add_import_limit_constraint
 from network.globals.nomopyomo.mga import min_links_capacity
-# from snsp import add_snsp_constraint_tyndp
+from network.globals.nomopyomo.snsp import add_snsp_constraint_tyndp
 from network.globals.nomopyomo.store import store_links_constraint
+from network.globals.nomopyomo.curtailment import add_curtailment_penalty_term, add_curtailment_constraints
@@ -7,8 +7,10 @@ from pypsa.linopt import get_var, linexpr, define_constraints
 
 from iepy.technologies import get_fuel_info, get_tech_info
 from iepy.indicators.emissions import get_reference_emission_levels_for_region, get_co2_emission_level_for_country
+from network.instrumentation import traced
 
 
+@traced
 def add_co2_budget_global(net: pypsa.Network, region: str, co2_reduction_share: float, co2_reduction_refyear: int):
     """
     Add global CO2 budget.
@@ -27,7 +29,7 @@ def add_co2_budget_global(net: pypsa.Network, region: str, co2_reduction_share:
     """
 
     co2_reference_kt = get_reference_emission_levels_for_region(region, co2_reduction_refyear)
-    co2_budget = co2_reference_kt * (1 - co2_reduction_share) * len(net.snapshots) / 8760.
+    co2_budget = co2_reference_kt * (1 - co2_reduction_share) * net.snapshot_weightings[net.snapshots].sum() / 8760.
 
     gens = net.generators[net.generators.carrier.astype(bool)]
     gens_p = get_var(net, 'Generator', 'p')[gens.index]
@@ -42,10 +44,12 @@ def add_co2_budget_global(net: pypsa.Network, region: str, co2_reduction_share:
         gens_with_tech = gens[gens.index.str.contains(tech)]
         coefficients[gens_with_tech.index] = fuel_emissions_thermal.values[0]
 
+    coefficients = coefficients.mul(net.snapshot_weightings[net.snapshots], axis=0)
     lhs = linexpr((coefficients, gens_p)).sum().sum()
     define_constraints(net, lhs, '<=', co2_budget, 'generation_emissions_global')
 
 
+@traced
 def add_co2_budget_per_country(net: pypsa.Network, co2_reduction_share: Dict[str, float], co2_reduction_refyear: int):
     """
     Add CO2 budget per country.
@@ -64,7 +68,8 @@ def add_co2_budget_per_country(net: pypsa.Network, co2_reduction_share: Dict[str
     for bus in net.loads.bus:
 
         bus_emission_reference = get_co2_emission_level_for_country(bus, co2_reduction_refyear)
-        co2_budget = (1-co2_reduction_share[bus]) * bus_emission_reference * len(net.snapshots) / 8760.
+        nb_hours = net.snapshot_weightings[net.snapshots].sum()
+        co2_budget = (1-co2_reduction_share[bus]) * bus_emission_reference * nb_hours / 8760.
 
         # Drop rows (gens) without an associated carrier (i.e., technologies not emitting)
         gens = net.generators[(net.generators.carrier.astype(bool)) & (net.generators.bus == bus)]
@@ -79,5 +84,6 @@ def add_co2_budget_per_country(net: pypsa.Network, co2_reduction_share: Dict[str
             gens_with_tech = gens[gens.index.str.contains(tech)]
             coefficients[gens_with_tech.index] = fuel_emissions_thermal.values[0]
 
+        coefficients = coefficients.mul(net.snapshot_weightings[net.snapshots], axis=0)
         lhs = linexpr((coefficients, gens_p)).sum().sum()
         define_constraints(net, lhs, '<=', co2_budget, 'generation_emissions_global', bus)
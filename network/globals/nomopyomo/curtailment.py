@@ -0,0 +1,86 @@
+import pandas as pd
+
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+from pypsa.linopt import get_var, linexpr, define_constraints, write_objective
+from network.instrumentation import traced
+
+
+def get_curtailable_generators(net: pypsa.Network) -> pd.Index:
+    """Return the generators whose curtailment is penalized or limited (i.e. wind and pv generators)."""
+    return net.generators.index[net.generators.type.str.contains('wind|pv')]
+
+
+@traced
+def add_curtailment_penalty_term(net: pypsa.Network, snapshots: pd.DatetimeIndex, curtailment_cost: float):
+    """
+    Add curtailment penalties to the objective function.
+
+    Curtailment is not modelled with extra variables but as the linear expression p_max_pu * p_nom - p.
+    Its penalty thus amounts to one term per extendable generator (on p_nom) and one term per generator
+    and snapshot (on p), weighted by the snapshot weightings. The constant part of the penalty (coming from
+    non-extendable generators) is dropped.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    curtailment_cost: float
+        Cost of curtailing in M€/MWh # TODO: to be checked
+
+    """
+
+    gens = get_curtailable_generators(net)
+    if len(gens) == 0:
+        return
+
+    # Curtailment is weighted like generation costs
+    weightings = net.snapshot_weightings[snapshots]
+    gens_p_max_pu = get_switchable_as_dense(net, 'Generator', 'p_max_pu', snapshots)[gens]
+    gens_p_nom = get_var(net, 'Generator', 'p_nom')
+    ext_gens = gens.intersection(gens_p_nom.index)
+
+    capacity_coefficients = curtailment_cost * gens_p_max_pu[ext_gens].mul(weightings, axis=0).sum()
+    write_objective(net, linexpr((capacity_coefficients, gens_p_nom[ext_gens])))
+    generation_coefficients = pd.DataFrame(-curtailment_cost, index=snapshots, columns=gens).mul(weightings, axis=0)
+    write_objective(net, linexpr((generation_coefficients, get_var(net, 'Generator', 'p').loc[snapshots, gens])))
+
+
+@traced
+def add_curtailment_constraints(net: pypsa.Network, snapshots: pd.DatetimeIndex, allowed_curtailment_share: float):
+    """
+    Add extra constrains limiting curtailment of each generator, at each time step, as a share of p_max_pu*p_nom.
+
+    The constraint p_max_pu * p_nom - p <= allowed_curtailment_share * p_max_pu * p_nom is written for
+    all generators and snapshots at once, without extra variables.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    allowed_curtailment_share: float
+        Maximum allowed share of generation that can be curtailed.
+
+    """
+
+    gens = get_curtailable_generators(net)
+    if len(gens) == 0:
+        return
+
+    gens_p_max_pu = get_switchable_as_dense(net, 'Generator', 'p_max_pu', snapshots)[gens]
+    gens_p_nom = get_var(net, 'Generator', 'p_nom')
+    ext_gens = gens.intersection(gens_p_nom.index)
+    fixed_gens = gens.difference(ext_gens)
+
+    # -p <= -(1 - share) * p_max_pu * p_nom, with p_nom moved to the left-hand side for extendable generators
+    lhs = linexpr((-1., get_var(net, 'Generator', 'p').loc[snapshots, gens]))
+    lhs[ext_gens] += linexpr(((1. - allowed_curtailment_share) * gens_p_max_pu[ext_gens], gens_p_nom[ext_gens]))
+    rhs = pd.DataFrame(0., index=snapshots, columns=gens)
+    rhs[fixed_gens] = -(1. - allowed_curtailment_share) * gens_p_max_pu[fixed_gens] \
+        * net.generators.p_nom[fixed_gens]
+
+    define_constraints(net, lhs, '<=', rhs, 'Generator', 'curtailment')
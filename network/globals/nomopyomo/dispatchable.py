@@ -2,8 +2,10 @@ from typing import Dict
 
 import pypsa
 from pypsa.linopt import get_var, linexpr, define_constraints
+from network.instrumentation import traced
 
 
+@traced
 def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
     """
     Constraint that ensures a minimum dispatchable installed capacity.
@@ -50,6 +52,7 @@ def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
             define_constraints(net, lhs.sum(), '>=', rhs, 'disp_capacity_lower_bound', bus)
 
 
+@traced
 def add_planning_reserve_constraint(net: pypsa.Network, prm: float):
     """
     Constraint that ensures a minimum dispatchable installed capacity.
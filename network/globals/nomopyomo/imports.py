@@ -1,43 +1,55 @@
+from typing import Dict, Union
+
+import numpy as np
 import pandas as pd
 
 import pypsa
+from pypsa.descriptors import get_switchable_as_dense
 from pypsa.linopt import get_var, linexpr, define_constraints
+from network.topology import get_incidence_matrix
+from network.instrumentation import traced
 
 
-def add_import_limit_constraint(net: pypsa.Network, import_share: float):
+@traced
+def add_import_limit_constraint(net: pypsa.Network, import_share: Union[float, Dict[str, float]]):
     """
     Add per-bus constraint on import budgets.
 
+    The net imports of all buses are obtained in one pass from the signed bus x link incidence matrix.
+
     Parameters
     ----------
     net: pypsa.Network
         A PyPSA Network instance with buses associated to regions
-    import_share: float
-        Maximum share of load that can be satisfied via imports.
+    import_share: Union[float, Dict[str, float]]
+        Maximum share of load that can be satisfied via imports, either for all buses with a load
+        or for each bus (buses which are not in the dictionary are not constrained).
 
-    Notes
-    -----
-    Using a flat value across EU, could be updated to support different values for different countries
     """
 
     # Get links flow variables
     links_p = get_var(net, 'Link', 'p')
-
-    # For each bus, add an import constraint
-    for bus in net.loads.bus:
-        # Compute net imports
-        links_in = net.links[net.links.bus1 == bus].index
-        links_out = net.links[net.links.bus0 == bus].index
-        links_connected = list(links_in) + list(links_out)
-        # Coefficient allow to differentiate between imports and exports
-        coefficients = pd.Series(1, index=links_connected, dtype=int)
-        for link in links_connected:
-            if link in links_out:
-                coefficients.loc[link] *= -1
-        net_imports = linexpr((coefficients, links_p[links_connected])).sum().sum()
-
-        # Get load for country
-        load_idx = net.loads[net.loads.bus == bus].index
-        load = net.loads_t.p_set[load_idx].sum()
-
-        define_constraints(net, net_imports, '<=', load*import_share, 'import_limit', bus)
+    links = net.links.loc[links_p.columns]
+
+    # Import budget of each bus with a load (loads and flows are summed over time with the snapshot weightings)
+    weightings = net.snapshot_weightings[net.snapshots]
+    load = get_switchable_as_dense(net, 'Load', 'p_set').mul(weightings, axis=0).sum().groupby(net.loads.bus).sum()
+    if isinstance(import_share, dict):
+        shares = pd.Series(import_share).reindex(load.index).dropna()
+    else:
+        shares = pd.Series(import_share, index=load.index)
+
+    # Flow of each link summed over time, counted positively at its end bus and negatively at its start bus
+    incidence = get_incidence_matrix(net.buses.index, links)
+    coefficients = np.outer(weightings, np.ones(len(links)))
+    flows_in = linexpr((coefficients, links_p)).sum().values
+    flows_out = linexpr((-coefficients, links_p)).sum().values
+    terms = pd.Series(np.where(incidence.data > 0, flows_in[incidence.col], flows_out[incidence.col]),
+                      index=net.buses.index[incidence.row])
+    net_imports = terms.groupby(level=0).sum()
+
+    buses = shares.index.intersection(net_imports.index)
+    if len(buses) == 0:
+        return
+
+    define_constraints(net, net_imports[buses], '<=', load[buses] * shares[buses], 'Bus', 'import_limit')
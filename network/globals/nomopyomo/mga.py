@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
 import pypsa
 
 from pypsa.linopt import get_var, linexpr, define_constraints, write_objective
+from network.instrumentation import traced
 
 
 def add_mga_constraint(net: pypsa.Network, epsilon: float):
@@ -12,10 +14,11 @@ def add_mga_constraint(net: pypsa.Network, epsilon: float):
     gens = net.generators.loc[gen_p_nom.index]
     gen_capex_expr = linexpr((gens.capital_cost, gen_p_nom)).sum()
     gen_exist_cap_cost = (gens.p_nom * gens.capital_cost).sum()
-    # Marginal cost
+    # Marginal cost (weighted by the snapshot weightings as in the objective)
+    weightings = net.snapshot_weightings[net.snapshots]
     gen_p = get_var(net, 'Generator', 'p')
     gens = net.generators.loc[gen_p.columns]
-    gen_opex_expr = linexpr((gens.marginal_cost, gen_p)).sum().sum()
+    gen_opex_expr = linexpr((np.outer(weightings, gens.marginal_cost), gen_p)).sum().sum()
     gen_cost_expr = gen_capex_expr + gen_opex_expr
 
     # Add storage cost
@@ -27,7 +30,7 @@ def add_mga_constraint(net: pypsa.Network, epsilon: float):
     # Marginal cost
     su_p_dispatch = get_var(net, 'StorageUnit', 'p_dispatch')
     sus = net.storage_units.loc[su_p_dispatch.columns]
-    su_opex_expr = linexpr((sus.marginal_cost, su_p_dispatch)).sum().sum()
+    su_opex_expr = linexpr((np.outer(weightings, sus.marginal_cost), su_p_dispatch)).sum().sum()
     su_cost_expr = su_capex_expr + su_opex_expr
 
     # Add transmission cost
@@ -56,6 +59,7 @@ def add_mga_objective(net: pypsa.Network, sense='min'):
     write_objective(net, link_capacity_expr)
 
 
+@traced
 def min_links_capacity(net: pypsa.Network, epsilon: float):
 
     add_mga_constraint(net, epsilon)
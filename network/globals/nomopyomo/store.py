@@ -1,7 +1,12 @@
+import pandas as pd
+
 import pypsa
 from pypsa.linopt import get_var, linexpr, define_constraints
+from network.components.battery import get_store_links
+from network.instrumentation import traced
 
 
+@traced
 def store_links_constraint(net: pypsa.Network, ctd_ratio: float):
     """
     Constraint that links the charging and discharging ratings of store units.
@@ -18,13 +23,14 @@ def store_links_constraint(net: pypsa.Network, ctd_ratio: float):
 
     links_p_nom = get_var(net, 'Link', 'p_nom')
 
-    links_to_bus = links_p_nom[links_p_nom.index.str.contains('to AC')].index
-    links_from_bus = links_p_nom[links_p_nom.index.str.contains('AC to')].index
-
-    for pair in list(zip(links_to_bus, links_from_bus)):
+    store_links = get_store_links(net)
+    store_links = store_links[store_links.discharge.isin(links_p_nom.index)
+                              & store_links.charge.isin(links_p_nom.index)]
+    if len(store_links) == 0:
+        return
 
-        discharge_link = links_p_nom.loc[pair[0]]
-        charge_link = links_p_nom.loc[pair[1]]
-        lhs = linexpr((ctd_ratio, discharge_link), (-1., charge_link))
+    discharge_p_nom = pd.Series(links_p_nom[store_links.discharge].values, index=store_links.index)
+    charge_p_nom = pd.Series(links_p_nom[store_links.charge].values, index=store_links.index)
+    lhs = linexpr((ctd_ratio, discharge_p_nom), (-1., charge_p_nom))
 
-        define_constraints(net, lhs, '==', 0., 'store_links_constraint')
+    define_constraints(net, lhs, '==', 0., 'Link', 'store_links_ratio')
@@ -1,6 +1,13 @@
+"""
+Functionalities built on the pyomo model of PyPSA.
+
+Parameters of the functionalities (e.g. the SNSP share or the CO2 reduction share) are mutable pyomo Params of the
+model (see network.globals.functionalities.get_functionality_parameters), so that they can be updated without
+rebuilding the model (see network.solvers.persistent).
+"""
 from network.globals.pyomo.co2 import add_co2_budget_per_country, add_co2_budget_global
 from network.globals.pyomo.dispatchable import dispatchable_capacity_lower_bound, add_planning_reserve_constraint
 from network.globals.pyomo.imports import add_import_limit_constraint
 from network.globals.pyomo.snsp import add_snsp_constraint_tyndp
 from network.globals.pyomo.store import store_links_constraint
-from network.globals.pyomo.curtailment import add_curtailment_penalty_term, add_curtailment_constraints
\ No newline at end of file
+from network.globals.pyomo.curtailment import add_curtailment_penalty_term, add_curtailment_constraints
@@ -1,13 +1,31 @@
 from typing import Dict
 
-from pyomo.environ import Constraint, NonNegativeReals
+import numpy as np
+import pandas as pd
+
+from pyomo.environ import Constraint, Param
 import pypsa
 
 from iepy.technologies import get_fuel_info, get_tech_info
 from iepy.indicators.emissions import get_co2_emission_level_for_country, \
     get_reference_emission_levels_for_region
+from network.globals.pyomo.expressions import get_variables, linear_expression, define_constraints
+from network.instrumentation import traced
+
+
+def get_emissions_coefficients(net: pypsa.Network, gens: pd.DataFrame) -> np.ndarray:
+    """Return the CO2 emissions of one unit of generation of each generator at each (weighted) time step."""
+
+    emissions = pd.Series(index=gens.index, dtype=float)
+    for tech in gens.type.unique():
+        fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
+        fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
+        emissions[gens.type == tech] = fuel_emissions_el.values[0] / efficiency
 
+    return np.outer(net.snapshot_weightings[net.snapshots].values, emissions.values)
 
+
+@traced
 def add_co2_budget_per_country(net: pypsa.Network,
                                reduction_share_per_country: Dict[str, float],
                                refyear: int):
@@ -26,32 +44,25 @@ def add_co2_budget_per_country(net: pypsa.Network,
     """
 
     model = net.model
+    nb_hours = net.snapshot_weightings[net.snapshots].sum()
+    model.co2_reduction_share_per_country = Param(list(reduction_share_per_country.keys()),
+                                                  initialize=reduction_share_per_country, mutable=True)
 
-    def generation_emissions_per_bus_rule(model, bus):
+    lhs, rhs = {}, {}
+    for bus in reduction_share_per_country:
 
         bus_emission_reference = get_co2_emission_level_for_country(bus, refyear)
-        bus_emission_target = (1-reduction_share_per_country[bus]) * bus_emission_reference * len(net.snapshots) / 8760.
+        rhs[bus] = (1-model.co2_reduction_share_per_country[bus]) * bus_emission_reference * nb_hours / 8760.
 
         bus_gens = net.generators[(net.generators.carrier.astype(bool)) & (net.generators.bus == bus)]
+        coefficients = get_emissions_coefficients(net, bus_gens)
+        variables = get_variables(model.generator_p, bus_gens.index, net.snapshots)
+        lhs[bus] = linear_expression(coefficients.ravel(), variables.ravel())
 
-        generator_emissions_sum = 0.
-        for tech in bus_gens.type.unique():
-
-            fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
-            fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
-            fuel_emissions_thermal = fuel_emissions_el/efficiency
-
-            gens = bus_gens[bus_gens.type == tech]
-
-            for g in gens.index.values:
-                for s in net.snapshots:
-                    generator_emissions_sum += model.generator_p[g, s]*fuel_emissions_thermal.values[0]
-
-        return generator_emissions_sum <= bus_emission_target
-    model.generation_emissions_per_bus = Constraint(list(reduction_share_per_country.keys()),
-                                                    rule=generation_emissions_per_bus_rule)
+    define_constraints(model, "generation_emissions_per_bus", lhs, "<=", rhs)
 
 
+@traced
 def add_co2_budget_global(network: pypsa.Network, region: str, co2_reduction_share: float, co2_reduction_refyear: int):
     """
     Add global CO2 budget.
@@ -72,25 +83,14 @@ def add_co2_budget_global(network: pypsa.Network, region: str, co2_reduction_sha
     model = network.model
 
     co2_reference_kt = get_reference_emission_levels_for_region(region, co2_reduction_refyear)
-    co2_budget = co2_reference_kt * (1 - co2_reduction_share) * len(network.snapshots) / 8760.
+    model.co2_reduction_share = Param(initialize=co2_reduction_share, mutable=True)
+    co2_budget = co2_reference_kt * (1 - model.co2_reduction_share) \
+        * network.snapshot_weightings[network.snapshots].sum() / 8760.
 
     # Drop rows (gens) without an associated carrier (i.e., technologies not emitting)
     gens = network.generators[network.generators.carrier.astype(bool)]
+    coefficients = get_emissions_coefficients(network, gens)
+    variables = get_variables(model.generator_p, gens.index, network.snapshots)
 
-    def generation_emissions_rule(model):
-
-        generator_emissions_sum = 0.
-        for tech in gens.type.unique():
-
-            fuel, efficiency = get_tech_info(tech, ["fuel", "efficiency_ds"])
-            fuel_emissions_el = get_fuel_info(fuel, ['CO2'])
-            fuel_emissions_thermal = fuel_emissions_el/efficiency
-
-            gen = gens[gens.index.str.contains(tech)]
-
-            for g in gen.index.values:
-                for s in network.snapshots:
-                    generator_emissions_sum += model.generator_p[g, s]*fuel_emissions_thermal.values[0]
-
-        return generator_emissions_sum <= co2_budget
-    model.generation_emissions_global = Constraint(rule=generation_emissions_rule)
+    model.generation_emissions_global = \
+        Constraint(expr=(None, linear_expression(coefficients.ravel(), variables.ravel()), co2_budget))
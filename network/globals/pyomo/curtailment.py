@@ -1,9 +1,47 @@
+from typing import Tuple
+
+import numpy as np
 import pandas as pd
 
-from pyomo.environ import Constraint, Var, NonNegativeReals
+from pyomo.environ import Var, Param, NonNegativeReals
 import pypsa
+from network.globals.pyomo.expressions import get_variables, linear_expression, define_constraints
+from network.instrumentation import traced
+
+
+def define_curtailment_variables(network: pypsa.Network, snapshots: pd.DatetimeIndex) -> Tuple[pd.Index, np.ndarray]:
+    """
+    Add the curtailment of RES generators at each time step to the model.
+
+    Returns
+    -------
+    gens: pd.Index
+        RES generators.
+    gens_p_max_pu: np.ndarray
+        Per-unit availability of the RES generators (snapshots x generators).
+    """
+
+    techs = ['wind', 'pv']
+    gens = network.generators.index[network.generators.index.str.contains('|'.join(techs))]
+
+    model = network.model
+    gens_p_max_pu = network.generators_t.p_max_pu.loc[snapshots, gens].values
+
+    model.generator_c = Var(gens, snapshots, within=NonNegativeReals)
+
+    # generator_c - p_max_pu * generator_p_nom + generator_p == 0
+    c = get_variables(model.generator_c, gens, snapshots)
+    p_nom = get_variables(model.generator_p_nom, gens)
+    p = get_variables(model.generator_p, gens, snapshots)
+    p_max_pu = gens_p_max_pu.tolist()
+    lhs = {(gen, s): linear_expression((1., -p_max_pu[i][j], 1.), (c[i, j], p_nom[j], p[i, j]))
+           for j, gen in enumerate(gens) for i, s in enumerate(snapshots)}
+    define_constraints(model, "generation_curtailment", lhs, "==", 0.)
 
+    return gens, gens_p_max_pu
 
+
+@traced
 def add_curtailment_penalty_term(network: pypsa.Network, snapshots: pd.DatetimeIndex, curtailment_cost: float):
     """
     Add curtailment penalties to the objective function.
@@ -19,22 +57,18 @@ def add_curtailment_penalty_term(network: pypsa.Network, snapshots: pd.DatetimeI
 
     """
 
-    techs = ['wind', 'pv']
-    gens = network.generators.index[network.generators.index.str.contains('|'.join(techs))]
-
     model = network.model
-    gens_p_max_pu = network.generators_t.p_max_pu
-
-    model.generator_c = Var(gens, snapshots, within=NonNegativeReals)
+    define_curtailment_variables(network, snapshots)
 
-    def generation_curtailment_rule(model, gen, snapshot):
-        return model.generator_c[gen, snapshot] == \
-               model.generator_p_nom[gen] * gens_p_max_pu.loc[snapshot, gen] - model.generator_p[gen, snapshot]
-    model.generation_curtailment = Constraint(list(gens), list(snapshots), rule=generation_curtailment_rule)
-
-    model.objective.expr += curtailment_cost * sum(model.generator_c[gen, s] for gen in gens for s in snapshots)
+    model.curtailment_cost = Param(initialize=curtailment_cost, mutable=True)
+    # Curtailment is weighted like generation costs, the cost multiplying the whole sum so that
+    # the coefficients of the terms are plain numbers
+    weightings = network.snapshot_weightings.to_dict()
+    coefficients = [weightings[s] for _, s in model.generator_c.keys()]
+    model.objective.expr += model.curtailment_cost * linear_expression(coefficients, list(model.generator_c.values()))
 
 
+@traced
 def add_curtailment_constraints(network: pypsa.Network, snapshots: pd.DatetimeIndex, allowed_curtailment_share: float):
     """
     Add extra constrains limiting curtailment of each generator, at each time step, as a share of p_max_pu*p_nom.
@@ -51,19 +85,14 @@ def add_curtailment_constraints(network: pypsa.Network, snapshots: pd.DatetimeIn
     """
 
     model = network.model
-    gens_p_max_pu = network.generators_t.p_max_pu
-
-    techs = ['wind', 'pv']
-    gens = network.generators.index[network.generators.index.str.contains('|'.join(techs))]
-
-    model.generator_c = Var(gens, snapshots, within=NonNegativeReals)
+    gens, gens_p_max_pu = define_curtailment_variables(network, snapshots)
 
-    def generation_curtailment_rule(model, gen, snapshot):
-        return model.generator_c[gen, snapshot] == \
-               model.generator_p_nom[gen] * gens_p_max_pu.loc[snapshot, gen] - model.generator_p[gen, snapshot]
-    model.generation_curtailment = Constraint(list(gens), list(snapshots), rule=generation_curtailment_rule)
+    model.allowed_curtailment_share = Param(initialize=allowed_curtailment_share, mutable=True)
 
-    def curtailment_rule(model, gen, snapshot):
-        return model.generator_c[gen, snapshot] <= \
-               allowed_curtailment_share * gens_p_max_pu.loc[snapshot, gen] * model.generator_p_nom[gen]
-    model.limit_curtailment = Constraint(list(gens), list(snapshots), rule=curtailment_rule)
+    # generator_c - allowed_curtailment_share * p_max_pu * generator_p_nom <= 0
+    c = get_variables(model.generator_c, gens, snapshots)
+    p_nom = get_variables(model.generator_p_nom, gens)
+    lhs = {(gen, s): linear_expression((1., -model.allowed_curtailment_share * gens_p_max_pu[i, j]),
+                                       (c[i, j], p_nom[j]))
+           for j, gen in enumerate(gens) for i, s in enumerate(snapshots)}
+    define_constraints(model, "limit_curtailment", lhs, "<=", 0.)
@@ -1,60 +1,81 @@
-from typing import Dict
+from typing import Dict, List, Tuple
 
-from pyomo.environ import Constraint, NonNegativeReals
+import pandas as pd
+
+from pyomo.environ import Param
 import pypsa
+from network.globals.pyomo.expressions import get_variables, linear_expression, define_constraints
+from network.instrumentation import traced
 
+# TODO: extend for different topologies, if necessary
+dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
+res_technologies = ['wind_onshore', 'wind_offshore', 'pv_utility', 'pv_residential']
 
-def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
+
+def get_dispatchable_capacity(net: pypsa.Network, buses: pd.Index) -> Tuple[Dict[str, Tuple[List, List]], pd.Series]:
     """
-    Constraint that ensures a minimum dispatchable installed capacity.
+    Return the dispatchable capacity at each bus.
 
     Parameters
     ----------
     net: pypsa.Network
-        A PyPSA Network instance with buses associated to regions
-
-    thresholds: Dict
-        Dict containing scalar thresholds for disp_capacity/peak_load for each bus
+        A PyPSA Network instance.
+    buses: pd.Index
+        Buses at which the capacity is computed.
+
+    Returns
+    -------
+    Dict[str, Tuple[List, List]]
+        Coefficients and capacity variables of extendable dispatchable generators and storage units at each bus.
+    pd.Series
+        Sum of the minimum capacities of non-extendable dispatchable generators and storage units at each bus.
     """
-    # TODO: extend for different topologies, if necessary
+
     model = net.model
-    buses = net.loads.bus
-    dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
+    terms = {bus: ([], []) for bus in buses}
+    legacy = pd.Series(0., index=buses)
+    for var, df in [(model.generator_p_nom, net.generators), (model.storage_p_nom, net.storage_units)]:
+        df = df[df.type.isin(dispatchable_technologies) & df.bus.isin(buses)]
+        ext_df = df[df.p_nom_extendable]
+        for bus, variable in zip(ext_df.bus, get_variables(var, ext_df.index)):
+            terms[bus][0].append(1.)
+            terms[bus][1].append(variable)
+        legacy += df.p_nom_min[~df.p_nom_extendable].groupby(df.bus).sum().reindex(buses, fill_value=0.)
 
-    def dispatchable_capacity_constraint_rule(model, bus):
+    return terms, legacy
 
-        if bus in thresholds.keys():
 
-            lhs = 0
-            legacy_at_bus = 0
+def get_peak_load(net: pypsa.Network) -> pd.Series:
+    """Return the peak load of each bus with a load."""
+    return net.loads_t.p_set.groupby(net.loads.bus, axis=1).sum().max()
 
-            gens = net.generators[(net.generators.bus == bus) & (net.generators.type.isin(dispatchable_technologies))]
-            for gen in gens.index:
-                if gens.loc[gen].p_nom_extendable:
-                    lhs += model.generator_p_nom[gen]
-                else:
-                    legacy_at_bus += gens.loc[gen].p_nom_min
 
-            stos = net.storage_units[(net.storage_units.bus == bus) &
-                                     (net.storage_units.type.isin(dispatchable_technologies))]
-            for sto in stos.index:
-                if stos.loc[sto].p_nom_extendable:
-                    lhs += model.storage_unit_p_nom[gen]
-                else:
-                    legacy_at_bus += stos.loc[sto].p_nom_min
+@traced
+def dispatchable_capacity_lower_bound(net: pypsa.Network, thresholds: Dict):
+    """
+    Constraint that ensures a minimum dispatchable installed capacity.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
 
-            # Get load for country
-            load_idx = net.loads[net.loads.bus == bus].index
-            load_peak = net.loads_t.p_set[load_idx].max()
+    thresholds: Dict
+        Dict containing scalar thresholds for disp_capacity/peak_load for each bus
+    """
 
-            load_peak_threshold = load_peak * thresholds[bus]
-            rhs = max(0, load_peak_threshold.values[0] - legacy_at_bus)
+    model = net.model
+    load_peak = get_peak_load(net)
+    buses = load_peak.index.intersection(pd.Index(thresholds.keys()))
 
-            return lhs >= rhs
+    terms, legacy = get_dispatchable_capacity(net, buses)
+    rhs = (load_peak[buses] * pd.Series(thresholds)[buses] - legacy).clip(lower=0.)
 
-    model.dispatchable_capacity_constraint = Constraint(buses, rule=dispatchable_capacity_constraint_rule)
+    lhs = {bus: linear_expression(*terms[bus]) for bus in buses}
+    define_constraints(model, "dispatchable_capacity_constraint", lhs, ">=", rhs.to_dict())
 
 
+@traced
 def add_planning_reserve_constraint(net: pypsa.Network, prm: float):
     """
     Constraint that ensures a minimum dispatchable installed capacity.
@@ -67,43 +88,21 @@ def add_planning_reserve_constraint(net: pypsa.Network, prm: float):
         Planning reserve margin.
     """
     model = net.model
-    buses = net.loads.bus
-    cc_ds = net.cc_ds
-    dispatchable_technologies = ['ocgt', 'ccgt', 'ccgt_ccs', 'nuclear', 'sto']
-    res_technologies = ['wind_onshore', 'wind_offshore', 'pv_utility', 'pv_residential']
-
-    def planning_reserve_constraint_rule(model, bus):
-
-        lhs = 0
-        legacy_at_bus = 0
-
-        gens = net.generators[(net.generators.bus == bus) & (net.generators.type.isin(dispatchable_technologies))]
-        for gen in gens.index:
-            if gens.loc[gen].p_nom_extendable:
-                lhs += model.generator_p_nom[gen]
-            else:
-                legacy_at_bus += gens.loc[gen].p_nom_min
-
-        stos = net.storage_units[(net.storage_units.bus == bus) &
-                                 (net.storage_units.type.isin(dispatchable_technologies))]
-        for sto in stos.index:
-            if stos.loc[sto].p_nom_extendable:
-                lhs += model.storage_unit_p_nom[gen]
-            else:
-                legacy_at_bus += stos.loc[sto].p_nom_min
-
-        res_gens = net.generators[(net.generators.bus == bus) &
-                                  (net.generators.type.str.contains('|'.join(res_technologies)))]
-        for gen in res_gens.index:
-            lhs += model.generator_p_nom[gen] * cc_ds.loc[' '.join(gen.split(' ')[1:])]
-
-        # Get load for country
-        load_idx = net.loads[net.loads.bus == bus].index
-        load_peak = net.loads_t.p_set[load_idx].max()
-
-        load_corrected_with_margin = load_peak * (1 + prm)
-        rhs = load_corrected_with_margin.values[0] - legacy_at_bus
-
-        return lhs >= rhs
-
-    model.planning_reserve_margin = Constraint(buses, rule=planning_reserve_constraint_rule)
+    model.prm = Param(initialize=prm, mutable=True)
+
+    load_peak = get_peak_load(net)
+    buses = load_peak.index
+    terms, legacy = get_dispatchable_capacity(net, buses)
+
+    res_gens = net.generators[net.generators.p_nom_extendable & net.generators.bus.isin(buses)]
+    res_gens = res_gens[res_gens.type.str.contains('|'.join(res_technologies))]
+    # Capacity credits are indexed by generator names without their bus
+    capacity_credits = net.cc_ds.loc[[' '.join(gen.split(' ')[1:]) for gen in res_gens.index]].values
+    for bus, credit, variable in zip(res_gens.bus, capacity_credits,
+                                     get_variables(model.generator_p_nom, res_gens.index)):
+        terms[bus][0].append(credit)
+        terms[bus][1].append(variable)
+
+    lhs = {bus: linear_expression(*terms[bus]) for bus in buses}
+    rhs = {bus: load_peak[bus] * (1 + model.prm) - legacy[bus] for bus in buses}
+    define_constraints(model, "planning_reserve_margin", lhs, ">=", rhs)
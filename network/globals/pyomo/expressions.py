@@ -0,0 +1,83 @@
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pyomo.environ import Constraint
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+# Bounds of a constraint (lower bound, body, upper bound) for each sense, as accepted by pyomo rules
+senses = {"<=": lambda body, rhs: (None, body, rhs),
+          ">=": lambda body, rhs: (rhs, body, None),
+          "==": lambda body, rhs: (body, rhs)}
+
+
+def get_variables(var, components: pd.Index, snapshots: pd.Index = None) -> np.ndarray:
+    """
+    Return the variables of some components as an array.
+
+    Parameters
+    ----------
+    var: pyomo.environ.Var
+        Variable indexed by components (e.g. model.generator_p_nom) or by components and snapshots
+        (e.g. model.generator_p).
+    components: pd.Index
+        Components.
+    snapshots: pd.Index (default: None)
+        Snapshots, if the variable is indexed by snapshots.
+
+    Returns
+    -------
+    np.ndarray
+        Variables, of shape (components) or (snapshots x components).
+    """
+    # Iterating over lists is much faster than over pandas indexes
+    components = list(components)
+    if snapshots is None:
+        variables = np.empty(len(components), dtype=object)
+        variables[:] = [var[c] for c in components]
+        return variables
+    variables = np.empty((len(snapshots), len(components)), dtype=object)
+    for i, s in enumerate(snapshots):
+        variables[i, :] = [var[c, s] for c in components]
+    return variables
+
+
+def linear_expression(coefficients: Iterable, variables: Iterable, constant: Any = 0.) -> LinearExpression:
+    """
+    Build a linear expression in one call from its coefficients and variables.
+
+    Building the expression directly is much faster than summing its terms, as each addition
+    creates a new expression in pyomo. Coefficients and constant can depend on mutable parameters.
+    """
+    # Arrays of numbers are converted to python floats, which pyomo handles faster than numpy scalars
+    coefficients = coefficients.tolist() if isinstance(coefficients, np.ndarray) else list(coefficients)
+    return LinearExpression(constant=constant, linear_coefs=coefficients, linear_vars=list(variables))
+
+
+def define_constraints(model, name: str, lhs: Dict[Hashable, LinearExpression], sense: str, rhs: Any):
+    """
+    Add constraints 'lhs sense rhs' to a model.
+
+    Parameters
+    ----------
+    model: pyomo.environ.ConcreteModel
+        Pyomo model.
+    name: str
+        Name of the constraints in the model.
+    lhs: Dict[Hashable, LinearExpression]
+        Left-hand side of each constraint, indexed by the indices of the constraints.
+    sense: str
+        One of '<=', '>=' and '=='.
+    rhs: Any
+        Right-hand side of the constraints, a constant (or parameter expression) or a dictionary with the same
+        indices as lhs.
+    """
+
+    assert sense in senses, f"Error: Sense {sense} is not one of {list(senses)}."
+    constraints = {index: senses[sense](body, rhs[index] if isinstance(rhs, dict) else rhs)
+                   for index, body in lhs.items()}
+
+    def rule(_, *index: Tuple):
+        return constraints[index[0] if len(index) == 1 else index]
+    setattr(model, name, Constraint(list(constraints), rule=rule))
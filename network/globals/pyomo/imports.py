@@ -1,10 +1,15 @@
 from typing import List
 
-from pyomo.environ import Constraint, NonNegativeReals
+import numpy as np
+
+from pyomo.environ import Param
 import pypsa
 
-from iepy.load import get_load
+from pypsa.descriptors import get_switchable_as_dense
+from network.globals.pyomo.expressions import get_variables, linear_expression, define_constraints
+from network.instrumentation import traced
 
+@traced
 def add_import_limit_constraint(network: pypsa.Network, import_share: float, countries: List[str]):
     """
     Add per-bus constraint on import budgets.
@@ -27,21 +32,26 @@ def add_import_limit_constraint(network: pypsa.Network, import_share: float, cou
     model = network.model
     links = network.links
     snapshots = network.snapshots
+    model.import_share = Param(initialize=import_share, mutable=True)
 
-    def import_constraint_rule(model, bus):
+    # Loads and flows are summed over time with the snapshot weightings
+    weightings = network.snapshot_weightings[snapshots].values
+    load = get_switchable_as_dense(network, 'Load', 'p_set', snapshots).mul(weightings, axis=0).sum()
+    load = load.groupby(network.loads.bus).sum().reindex(countries, fill_value=0.)
 
-        load_at_bus = get_load(timestamps=snapshots, countries=[bus], missing_data='interpolate').sum()
-        import_budget = import_share * load_at_bus.values[0]
+    # Flow variables of all links are gathered once and selected for each bus by position
+    links_p = get_variables(model.link_p, links.index, snapshots)
+    bus0, bus1 = links.bus0.values, links.bus1.values
 
-        links_in = links[links.bus1 == bus].index
-        links_out = links[links.bus0 == bus].index
+    # TODO: based on the assumption that the bus is associated to a country
+    lhs, rhs = {}, {}
+    for bus in countries:
+        rhs[bus] = model.import_share * load[bus]
 
-        imports = 0.
-        if not links_in.empty:
-            imports += sum(model.link_p[e, s] for e in links_in for s in network.snapshots)
-        if not links_out.empty:
-            imports -= sum(model.link_p[e, s] for e in links_out for s in network.snapshots)
-        return imports <= import_budget
+        links_in = np.flatnonzero(bus1 == bus)
+        links_out = np.flatnonzero(bus0 == bus)
+        variables = np.hstack((links_p[:, links_in], links_p[:, links_out]))
+        coefficients = np.outer(weightings, np.concatenate((np.ones(len(links_in)), -np.ones(len(links_out)))))
+        lhs[bus] = linear_expression(coefficients.ravel(), variables.ravel())
 
-    # TODO: based on the assumption that the bus is associated to a country
-    model.import_constraint = Constraint(countries, rule=import_constraint_rule)
\ No newline at end of file
+    define_constraints(model, "import_constraint", lhs, "<=", rhs)
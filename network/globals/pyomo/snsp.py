@@ -1,9 +1,13 @@
+import numpy as np
 import pandas as pd
 
-from pyomo.environ import Constraint, NonNegativeReals
+from pyomo.environ import Param
 import pypsa
+from network.globals.pyomo.expressions import get_variables, linear_expression, define_constraints
+from network.instrumentation import traced
 
 
+@traced
 def add_snsp_constraint_tyndp(net: pypsa.Network, snapshots: pd.DatetimeIndex, snsp_share: float):
     """
     Add system non-synchronous generation share constraint to the model.
@@ -20,23 +24,18 @@ def add_snsp_constraint_tyndp(net: pypsa.Network, snapshots: pd.DatetimeIndex, s
     """
 
     model = net.model
+    model.snsp_share = Param(initialize=snsp_share, mutable=True)
     nonsync_gen_types = 'wind|pv'
-    nonsync_gen_ids = net.generators.index[net.generators.type.str.contains(nonsync_gen_types)]
-    nonsync_storage_ids = net.storage_units.index[net.storage_units.type == "Li-ion"]
-
-    # Impose for each time step the non-synchronous production be lower than a part of the total production
-    def snsp_rule(model, snapshot):
-
-        # Non-synchronous 'production'
-        nonsync_gen_p = sum(model.generator_p[idx, snapshot] for idx in nonsync_gen_ids)\
-            if len(nonsync_gen_ids) != 0 else 0
-        nonsync_storage_dispatch = sum(model.storage_p_dispatch[idx, snapshot] for idx in nonsync_storage_ids)\
-            if len(nonsync_storage_ids) != 0 else 0
-
-        # Synchronous production
-        full_gen_p = sum(model.generator_p[:, snapshot]) if len(net.generators) != 0 else 0
-        full_storage_dispatch = sum(model.storage_p_dispatch[:, snapshot]) if len(net.storage_units) != 0 else 0
-
-        return nonsync_gen_p + nonsync_storage_dispatch <= snsp_share * (full_gen_p + full_storage_dispatch)
-
-    model.snsp = Constraint(list(snapshots), rule=snsp_rule)
\ No newline at end of file
+    nonsync_gens = net.generators.type.str.contains(nonsync_gen_types).values
+    nonsync_storage = (net.storage_units.type == "Li-ion").values
+
+    # Impose for each time step the non-synchronous production be lower than a part of the total production,
+    # i.e. (1 - share) * non-synchronous production - share * synchronous production <= 0
+    nonsync_coefficient, sync_coefficient = 1 - model.snsp_share, -model.snsp_share
+    coefficients = [nonsync_coefficient if nonsync else sync_coefficient
+                    for nonsync in np.concatenate((nonsync_gens, nonsync_storage))]
+    variables = np.hstack((get_variables(model.generator_p, net.generators.index, snapshots),
+                           get_variables(model.storage_p_dispatch, net.storage_units.index, snapshots)))
+
+    lhs = {s: linear_expression(coefficients, variables[i]) for i, s in enumerate(snapshots)}
+    define_constraints(model, "snsp", lhs, "<=", 0.)
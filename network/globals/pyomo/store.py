@@ -1,18 +1,34 @@
-from pyomo.environ import Constraint, NonNegativeReals
+from pyomo.environ import Constraint
 import pypsa
+from network.components.battery import get_store_links
+from network.instrumentation import traced
 
 
+@traced
 def store_links_constraint(network: pypsa.Network, ctd_ratio: float):
+    """
+    Constraint that links the charging and discharging ratings of store units.
 
-    model = network.model
-    links = network.links
+    Parameters
+    ----------
+    network: pypsa.Network
+        A PyPSA Network instance with buses associated to regions
+        and containing a functionality configuration dictionary
+    ctd_ratio: float
+        Pre-defined charge-to-discharge ratio for such units.
+
+    """
 
-    links_to_bus = links[links.index.str.contains('to AC')].index
-    links_from_bus = links[links.index.str.contains('AC to')].index
+    model = network.model
 
-    def store_links_ratio_rule(model, discharge_link, charge_link):
+    store_links = get_store_links(network)
+    ext_links = network.links.index[network.links.p_nom_extendable]
+    store_links = store_links[store_links.discharge.isin(ext_links) & store_links.charge.isin(ext_links)]
+    discharge_links = store_links.discharge.to_dict()
+    charge_links = store_links.charge.to_dict()
 
-        return model.link_p_nom[discharge_link]*ctd_ratio == model.link_p_nom[charge_link]
+    def store_links_ratio_rule(model, store_bus):
 
-    model.store_links_ratio = Constraint(list(zip(links_to_bus, links_from_bus)), rule=store_links_ratio_rule)
+        return model.link_p_nom[discharge_links[store_bus]]*ctd_ratio == model.link_p_nom[charge_links[store_bus]]
 
+    model.store_links_ratio = Constraint(list(store_links.index), rule=store_links_ratio_rule)
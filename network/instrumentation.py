@@ -0,0 +1,175 @@
+from typing import Dict, Any, Callable
+from contextlib import contextmanager
+from functools import wraps
+from os import makedirs
+from os.path import join
+import resource
+import time
+import json
+
+import pandas as pd
+
+import pypsa
+
+import logging
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Tracer currently recording stages (None if tracing is not active)
+_tracer = None
+
+
+class Tracer:
+    """
+    Record timing and resource usage of the different stages of a run.
+
+    Each record contains the wall time and CPU time (in seconds) spent in the stage, the increase of the
+    peak resident set size of the process (in MB), the number of components added to the network
+    per component type and the number of constraints added to the optimization model.
+
+    If a memory budget (in GB) is given, a MemoryError is raised at the end of the first stage
+    after which the peak resident set size exceeds the budget.
+    """
+
+    def __init__(self, output_dir: str = None, memory_budget: float = None):
+        self.output_dir = output_dir
+        self.memory_budget = memory_budget
+        self.records = []
+        self.depth = 0
+        self.start_time = time.perf_counter()
+
+    def save(self, fn: str = "trace.json"):
+        """Save records in a JSON file in the output directory."""
+        makedirs(self.output_dir, exist_ok=True)
+        json.dump(self.records, open(join(self.output_dir, fn), 'w'), indent=2)
+
+    def summary(self) -> pd.DataFrame:
+        """Return total time and resources spent per stage, sorted by decreasing wall time."""
+        if len(self.records) == 0:
+            return pd.DataFrame()
+        records = pd.DataFrame(self.records)
+        records["components_added"] = records["components_added"].apply(lambda d: sum(d.values()))
+        summary = records.groupby("name").agg(calls=("wall_time", "count"),
+                                              wall_time=("wall_time", "sum"),
+                                              cpu_time=("cpu_time", "sum"),
+                                              peak_rss_delta_mb=("peak_rss_delta_mb", "max"),
+                                              components_added=("components_added", "sum"),
+                                              constraints_added=("constraints_added", "sum"))
+        return summary.sort_values("wall_time", ascending=False).round(3)
+
+
+def start_tracing(output_dir: str = None, memory_budget: float = None) -> Tracer:
+    """
+    Start recording the stages of a run.
+
+    Parameters
+    ----------
+    output_dir: str (default: None)
+        Directory where the trace is saved when calling stop_tracing.
+    memory_budget: float (default: None)
+        Maximum peak resident set size (in GB) of the process, checked at the end of each stage.
+
+    Returns
+    -------
+    Tracer
+        Active tracer.
+    """
+    global _tracer
+    _tracer = Tracer(output_dir, memory_budget)
+    return _tracer
+
+
+def stop_tracing() -> Tracer:
+    """Stop recording, save the trace in the output directory (if any) and log a summary table."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    if tracer.output_dir is not None:
+        tracer.save()
+    logger.info(f"Run stages summary:\n{tracer.summary().to_string()}")
+    return tracer
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is given in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1e-3
+
+
+def _count_components(net: pypsa.Network) -> Dict[str, int]:
+    return {c.name: len(c.df) for c in net.iterate_components()}
+
+
+def _count_constraints(net: pypsa.Network) -> int:
+    # Without pyomo, pypsa keeps a counter of the defined constraints
+    if hasattr(net, '_cCounter'):
+        return int(net._cCounter)
+    if hasattr(net, 'model'):
+        from pyomo.environ import Constraint
+        return sum(len(c) for c in net.model.component_objects(Constraint, active=True))
+    return 0
+
+
+@contextmanager
+def trace_stage(name: str, net: pypsa.Network = None):
+    """
+    Record the time and resources spent in a stage of a run.
+
+    Does nothing if tracing has not been started with start_tracing.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage.
+    net: pypsa.Network (default: None)
+        Network modified during the stage, used to count the components and constraints added.
+    """
+
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+
+    record: Dict[str, Any] = {"name": name, "depth": tracer.depth,
+                              "start": round(time.perf_counter() - tracer.start_time, 6)}
+    components_before = _count_components(net) if net is not None else {}
+    constraints_before = _count_constraints(net) if net is not None else 0
+    rss_before = _peak_rss_mb()
+    wall_before, cpu_before = time.perf_counter(), time.process_time()
+    tracer.depth += 1
+    try:
+        yield
+    finally:
+        tracer.depth -= 1
+        record["wall_time"] = round(time.perf_counter() - wall_before, 6)
+        record["cpu_time"] = round(time.process_time() - cpu_before, 6)
+        record["peak_rss_delta_mb"] = round(_peak_rss_mb() - rss_before, 3)
+        components_after = _count_components(net) if net is not None else {}
+        record["components_added"] = {c: n - components_before.get(c, 0) for c, n in components_after.items()
+                                      if n != components_before.get(c, 0)}
+        record["constraints_added"] = (_count_constraints(net) - constraints_before) if net is not None else 0
+        tracer.records.append(record)
+
+    if tracer.memory_budget is not None and _peak_rss_mb() * 1e-3 > tracer.memory_budget:
+        if tracer.output_dir is not None:
+            tracer.save()
+        raise MemoryError(f"Peak memory usage ({_peak_rss_mb() * 1e-3:.2f} GB) exceeds the budget "
+                          f"({tracer.memory_budget} GB) after stage {name}.\n"
+                          f"Run stages summary:\n{tracer.summary().to_string()}")
+
+
+def traced(func: Callable) -> Callable:
+    """Decorator recording the stage corresponding to a function taking a network as first argument."""
+
+    name = f"{func.__module__}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _tracer is None:
+            return func(*args, **kwargs)
+        net = args[0] if len(args) != 0 else kwargs.get("net", kwargs.get("network"))
+        net = net if isinstance(net, pypsa.Network) else None
+        with trace_stage(name, net):
+            return func(*args, **kwargs)
+
+    return wrapper
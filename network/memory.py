@@ -0,0 +1,307 @@
+from typing import Dict, List, Any
+import resource
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+from network.components.battery import get_store_links
+from network.instrumentation import traced
+from network.resampling import aggregate_time_steps
+
+import logging
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Rough memory footprint (in bytes) of one variable and one constraint for each modelling mode.
+# Pyomo objects are much heavier than the strings written by pypsa.linopt.
+# These values can be recalibrated using the peak RSS recorded by network.instrumentation.
+bytes_per_variable = {"pyomo": 1000, "nomopyomo": 150}
+bytes_per_constraint = {"pyomo": 2500, "nomopyomo": 300}
+
+# Cheaper settings which can be enabled when the estimated memory exceeds the budget
+accepted_fallbacks = ["float32", "site_clustering", "time_aggregation"]
+
+
+def get_peak_rss_gb() -> float:
+    """Return the peak resident set size of the current process (in GB)."""
+    # ru_maxrss is given in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1e-6
+
+
+def get_rss_gb() -> float:
+    """Return the current resident set size of the current process (in GB), or its peak if it is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() * 1e-9
+    except (OSError, IndexError, ValueError):
+        return get_peak_rss_gb()
+
+
+def get_time_series_memory_gb(net: pypsa.Network) -> float:
+    """Return the memory used by the time series of a network (in GB), without their shared snapshot indexes."""
+    return sum(df.memory_usage(index=False, deep=False).sum()
+               for c in net.iterate_components() for df in c.pnl.values()) * 1e-9
+
+
+def count_model_size(net: pypsa.Network, conf_func: Dict[str, Any] = None, nb_snapshots: int = None,
+                     pyomo: bool = True) -> pd.Series:
+    """
+    Estimate the number of variables and constraints of the optimization model of a network.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    conf_func: Dict[str, Any] (default: None)
+        Functionalities configuration (as in the 'functionalities' field of the projects configurations).
+    nb_snapshots: int (default: None)
+        Number of time steps of the model. If None, the number of snapshots of the network.
+    pyomo: bool (default: True)
+        Whether the model is built with pyomo.
+
+    Returns
+    -------
+    pd.Series
+        Number of 'variables' and 'constraints'.
+    """
+
+    nb_snapshots = len(net.snapshots) if nb_snapshots is None else nb_snapshots
+    gens, sus, stores, links, lines = net.generators, net.storage_units, net.stores, net.links, net.lines
+    nb_spill = len(net.storage_units_t.inflow.columns)
+
+    # Dispatch variables and constraints at each time step
+    nb_vars = nb_snapshots * (len(gens) + 3 * len(sus) + nb_spill + 2 * len(stores) + len(links) + len(lines))
+    nb_cons = nb_snapshots * (2 * len(gens) + 4 * len(sus) + 3 * len(stores) + 2 * len(links) + 2 * len(lines)
+                              + len(net.buses) + max(0, len(lines) - len(net.buses) + 1))
+    # Capacity variables
+    nb_vars += sum(c.p_nom_extendable.sum() for c in [gens, sus, links]) \
+        + stores.e_nom_extendable.sum() + lines.s_nom_extendable.sum()
+
+    conf_func = {} if conf_func is None else conf_func
+
+    def included(func):
+        return func in conf_func and conf_func[func]["include"]
+
+    nb_res_gens = len(net.generators_t.p_max_pu.columns)
+    nb_load_buses = len(net.loads.bus.unique())
+    if included("snsp"):
+        nb_cons += nb_snapshots
+    if included("curtailment"):
+        technical = conf_func["curtailment"]["strategy"][0] == 'technical'
+        if pyomo:
+            # Curtailment variables and their defining constraints
+            nb_vars += nb_res_gens * nb_snapshots
+            nb_cons += nb_res_gens * nb_snapshots * (2 if technical else 1)
+        elif technical:
+            nb_cons += nb_res_gens * nb_snapshots
+    if included("co2_emissions"):
+        nb_cons += nb_load_buses if conf_func["co2_emissions"]["strategy"] == 'country' else 1
+    for func in ["import_limit", "disp_cap", "prm"]:
+        if included(func):
+            nb_cons += nb_load_buses
+    nb_cons += len(get_store_links(net))
+
+    return pd.Series({"variables": int(nb_vars), "constraints": int(nb_cons)})
+
+
+def estimate_memory(net: pypsa.Network, conf_func: Dict[str, Any] = None, pyomo: bool = True,
+                    nb_snapshots: int = None, baseline: float = None) -> pd.Series:
+    """
+    Estimate the memory (in GB) needed to build the optimization model of a network.
+
+    The estimate is the memory currently used by the process, split between the time series of the network
+    and the rest ('baseline'), plus the memory of the model. Reducing the time series (e.g. converting them
+    to single precision or aggregating time steps) thus lowers the estimate.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    conf_func: Dict[str, Any] (default: None)
+        Functionalities configuration.
+    pyomo: bool (default: True)
+        Whether the model is built with pyomo.
+    nb_snapshots: int (default: None)
+        Number of time steps of the model. If None, the number of snapshots of the network.
+    baseline: float (default: None)
+        Memory used by the process apart from the time series of the network. If None, computed from the current
+        memory of the process. Freed memory is not always given back to the system right away, so the baseline
+        of a first estimate should be used when estimating the memory of a modified network.
+
+    Returns
+    -------
+    pd.Series
+        Memory used by the process apart from the time series of the network ('baseline'), memory of the time series
+        of the network ('time_series'), estimated memory of the 'variables' and 'constraints' of the model
+        and estimated 'total'.
+    """
+
+    mode = "pyomo" if pyomo else "nomopyomo"
+    size = count_model_size(net, conf_func, nb_snapshots, pyomo)
+    time_series = get_time_series_memory_gb(net)
+    if baseline is None:
+        baseline = max(get_rss_gb() - time_series, 0.)
+    estimate = pd.Series({"baseline": baseline,
+                          "time_series": time_series,
+                          "variables": size["variables"] * bytes_per_variable[mode] * 1e-9,
+                          "constraints": size["constraints"] * bytes_per_constraint[mode] * 1e-9})
+    estimate["total"] = estimate.sum()
+    return estimate
+
+
+def convert_time_series_to_float32(net: pypsa.Network) -> pypsa.Network:
+    """Convert the time series of a network to single precision floats."""
+    for c in net.iterate_components():
+        for attr, df in c.pnl.items():
+            if len(df.columns) != 0:
+                c.pnl[attr] = df.astype(np.float32)
+    return net
+
+
+def cluster_res_generators(net: pypsa.Network) -> pypsa.Network:
+    """
+    Merge generators with time-varying availability which have the same type and bus into one generator.
+
+    The availability of the merged generator is the average of the availabilities weighted by
+    the maximum capacities (or by the existing capacities if the maximum capacities are infinite).
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    gens = net.generators.loc[net.generators_t.p_max_pu.columns]
+    gens = gens[gens.groupby(["bus", "type"]).bus.transform("size") > 1]
+    if len(gens) == 0:
+        return net
+
+    weights = gens.p_nom_max.where(np.isfinite(gens.p_nom_max), gens.p_nom).replace(0., 1.)
+    keys = gens.bus + " Gen " + gens.type
+    grouped = gens.groupby(keys)
+
+    def weighted_mean(attr):
+        return (gens[attr] * weights).groupby(keys).sum() / weights.groupby(keys).sum()
+
+    p_max_pu = (net.generators_t.p_max_pu[gens.index] * weights).T.groupby(keys).sum().T \
+        / weights.groupby(keys).sum()
+
+    logger.info(f"Clustering {len(gens)} generators into {len(p_max_pu.columns)} generators.")
+
+    first = grouped.first()
+    position = {attr: weighted_mean(attr) for attr in ["x", "y"] if attr in gens}
+    net.mremove("Generator", gens.index)
+    net.madd("Generator", first.index, bus=first.bus, type=first.type, carrier=first.carrier,
+             p_nom=grouped.p_nom.sum(), p_nom_min=grouped.p_nom_min.sum(), p_nom_max=grouped.p_nom_max.sum(),
+             p_nom_extendable=grouped.p_nom_extendable.any(),
+             capital_cost=weighted_mean("capital_cost"), marginal_cost=weighted_mean("marginal_cost"),
+             p_max_pu=p_max_pu[first.index], **position)
+
+    return net
+
+
+def aggregate_snapshots(net: pypsa.Network, factor: int) -> pypsa.Network:
+    """
+    Aggregate groups of consecutive time steps into one time step.
+
+    Time series are averaged over each group and the snapshot weightings are summed,
+    so that the energy over the whole time horizon is preserved.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    factor: int
+        Number of consecutive time steps aggregated together.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    if factor <= 1:
+        return net
+
+    groups = np.arange(len(net.snapshots)) // factor
+    return aggregate_time_steps(net, groups, net.snapshots[::factor])
+
+
+@traced
+def apply_memory_budget(net: pypsa.Network, budget: float, conf_func: Dict[str, Any] = None,
+                        pyomo: bool = True, fallbacks: List[str] = None,
+                        max_time_aggregation: int = 24) -> pypsa.Network:
+    """
+    Check that the optimization model of a network fits in a memory budget, enabling cheaper settings if not.
+
+    Fallbacks are applied in the given order until the estimated memory fits the budget.
+    If it still does not fit, a MemoryError is raised with a report of the estimate,
+    so that the run stops before building the model instead of running out of memory while solving.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    budget: float
+        Maximum memory (in GB) that the process can use.
+    conf_func: Dict[str, Any] (default: None)
+        Functionalities configuration.
+    pyomo: bool (default: True)
+        Whether the model is built with pyomo.
+    fallbacks: List[str] (default: None)
+        Cheaper settings that can be enabled, among 'float32' (single precision time series),
+        'site_clustering' (merge RES generators of the same type at each bus) and
+        'time_aggregation' (average consecutive time steps).
+    max_time_aggregation: int (default: 24)
+        Maximum number of time steps that can be aggregated together.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    fallbacks = [] if fallbacks is None else fallbacks
+    for fallback in fallbacks:
+        assert fallback in accepted_fallbacks, \
+            f"Error: Fallback {fallback} is not one of {accepted_fallbacks}"
+
+    estimate = estimate_memory(net, conf_func, pyomo)
+    baseline = estimate["baseline"]
+    applied = []
+    for fallback in fallbacks:
+        if estimate["total"] <= budget:
+            break
+        if fallback == "float32":
+            net = convert_time_series_to_float32(net)
+        elif fallback == "site_clustering":
+            net = cluster_res_generators(net)
+        elif fallback == "time_aggregation":
+            # Smallest aggregation factor for which the model fits the budget,
+            # the time series being reduced by the same factor
+            nb_snapshots = len(net.snapshots)
+
+            def aggregated_total(f):
+                aggregated = estimate_memory(net, conf_func, pyomo, int(np.ceil(nb_snapshots / f)), baseline)
+                return aggregated["total"] - aggregated["time_series"] * (1 - 1 / f)
+            factor = next((f for f in range(2, max_time_aggregation + 1) if aggregated_total(f) <= budget),
+                          max_time_aggregation)
+            net = aggregate_snapshots(net, factor)
+            fallback = f"{fallback} (x{factor})"
+        applied += [fallback]
+        estimate = estimate_memory(net, conf_func, pyomo, baseline=baseline)
+
+    report = f"Memory estimate (GB) for a budget of {budget} GB " \
+             f"(fallbacks applied: {applied if applied else 'none'}):\n{estimate.round(3).to_string()}"
+    if estimate["total"] > budget:
+        raise MemoryError(report)
+    logger.info(report)
+
+    return net
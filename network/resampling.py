@@ -0,0 +1,164 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+from network.instrumentation import traced
+
+import logging
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Time series of PyPSA (loads, availabilities, inflows, ...) are powers or per-unit values over a time step,
+# whose energy is given by the snapshot weightings. They are therefore averaged over aggregated time steps.
+accepted_aggregations = ["mean", "sum"]
+
+
+def get_time_step_groups(snapshots: pd.DatetimeIndex, freq: str) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Group snapshots into time steps of a given frequency.
+
+    Time steps start at the first snapshot, as the time stamps of pd.date_range(snapshots[0], snapshots[-1], freq).
+
+    Parameters
+    ----------
+    snapshots: pd.DatetimeIndex
+        Sorted snapshots.
+    freq: str
+        Pandas frequency of the time steps (e.g. '3H').
+
+    Returns
+    -------
+    groups: np.ndarray
+        Index of the time step of each snapshot.
+    new_snapshots: pd.DatetimeIndex
+        Start of each time step.
+    """
+    starts = pd.date_range(snapshots[0], snapshots[-1], freq=freq)
+    # Time steps without snapshots (e.g. if snapshots are not contiguous) are dropped
+    kept, groups = np.unique(starts.searchsorted(snapshots, side='right') - 1, return_inverse=True)
+    return groups, starts[kept]
+
+
+def resample_time_series(df: pd.DataFrame, freq: str, how: str = "mean") -> pd.DataFrame:
+    """Aggregate a time series (e.g. the availability of generators which are not in a network) to a frequency."""
+    assert how in accepted_aggregations, f"Error: Aggregation {how} is not one of {accepted_aggregations}"
+    groups, new_snapshots = get_time_step_groups(df.index, freq)
+    df = df.groupby(groups).agg(how)
+    df.index = new_snapshots
+    return df
+
+
+def resample_time_series_to_snapshots(df: pd.DataFrame, snapshots: pd.DatetimeIndex, weightings: pd.Series,
+                                      how: str = "mean") -> pd.DataFrame:
+    """
+    Aggregate a time series over the time steps of a network.
+
+    Each time step starts at its snapshot and lasts its weighting (in hours). A time series which is not part of
+    a network (e.g. the availability of generators added later) is thus averaged over the time steps of the network
+    even if they were aggregated after the time series was computed.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Time series, given at a finer time resolution than the snapshots.
+    snapshots: pd.DatetimeIndex
+        Sorted snapshots of the network.
+    weightings: pd.Series
+        Snapshot weightings of the network.
+    how: str (default: 'mean')
+        Aggregation ('mean' or 'sum') of the time series.
+
+    Returns
+    -------
+    pd.DataFrame
+        Time series indexed by the snapshots.
+    """
+    assert how in accepted_aggregations, f"Error: Aggregation {how} is not one of {accepted_aggregations}"
+    steps = snapshots.searchsorted(df.index, side='right') - 1
+    ends = snapshots + pd.to_timedelta(weightings[snapshots].values, unit='h')
+    in_steps = (steps >= 0) & (df.index < ends[steps.clip(min=0)])
+    df = df[in_steps].groupby(steps[in_steps]).agg(how)
+    assert len(df) == len(snapshots), "Error: The time series must be given over all time steps of the snapshots."
+    df.index = snapshots
+    return df
+
+
+def aggregate_time_steps(net: pypsa.Network, groups: np.ndarray, new_snapshots: pd.DatetimeIndex,
+                         aggregations: Dict[str, str] = None) -> pypsa.Network:
+    """
+    Aggregate groups of time steps of a network into one time step.
+
+    Snapshot weightings are summed over each group, so that the energy over the whole time horizon is preserved.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    groups: np.ndarray
+        Index of the new time step of each snapshot.
+    new_snapshots: pd.DatetimeIndex
+        New snapshots.
+    aggregations: Dict[str, str] (default: None)
+        Aggregation ('mean' or 'sum') of the time series of some attributes. Other time series are averaged.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    aggregations = {} if aggregations is None else aggregations
+    for how in aggregations.values():
+        assert how in accepted_aggregations, f"Error: Aggregation {how} is not one of {accepted_aggregations}"
+
+    weightings = net.snapshot_weightings.groupby(groups).sum()
+    weightings.index = new_snapshots
+
+    aggregated_pnl = {}
+    for c in net.iterate_components():
+        for attr, df in c.pnl.items():
+            if len(df.columns) != 0:
+                df = df.groupby(groups).agg(aggregations.get(attr, "mean"))
+                df.index = new_snapshots
+                aggregated_pnl[(c.list_name, attr)] = df
+
+    logger.info(f"Aggregating {len(net.snapshots)} time steps into {len(new_snapshots)} time steps.")
+
+    net.set_snapshots(new_snapshots)
+    net.snapshot_weightings = weightings
+    for (list_name, attr), df in aggregated_pnl.items():
+        getattr(net, list_name + "_t")[attr] = df
+
+    return net
+
+
+@traced
+def resample_network(net: pypsa.Network, freq: str, aggregations: Dict[str, str] = None) -> pypsa.Network:
+    """
+    Aggregate the time series of a network to a lower time resolution.
+
+    Networks are built at hourly resolution, so that loads, availabilities and inflows are averaged over
+    each time step instead of being sampled at its first hour. The snapshot weightings give the number of
+    hours of each time step, so that energies and operational costs are the ones of the hourly network.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    freq: str
+        Pandas frequency of the new time steps (e.g. '3H').
+    aggregations: Dict[str, str] (default: None)
+        Aggregation ('mean' or 'sum') of the time series of some attributes. Other time series are averaged.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+    groups, new_snapshots = get_time_step_groups(net.snapshots, freq)
+    if len(new_snapshots) == len(net.snapshots):
+        return net
+    return aggregate_time_steps(net, groups, new_snapshots, aggregations)
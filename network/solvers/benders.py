@@ -0,0 +1,331 @@
+from typing import Callable, Dict, List, Tuple, Any
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.linopt import get_var, linexpr, define_constraints
+from pyomo.environ import ConcreteModel, Var, Objective, ConstraintList, NonNegativeReals, SolverFactory, value
+
+from network.instrumentation import traced
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Investment variables of the master problem given as (component, attribute, name of the pyomo variable).
+# Variables are named as in the pyomo model built by pypsa, so that pyomo functionalities
+# only involving capacities (e.g. dispatchable capacity, PRM) can be added to the master problem.
+investment_variables = [('Generator', 'p_nom', 'generator_p_nom'),
+                        ('StorageUnit', 'p_nom', 'storage_p_nom'),
+                        ('Link', 'p_nom', 'link_p_nom'),
+                        ('Store', 'e_nom', 'store_e_nom')]
+
+
+def get_time_blocks(snapshots: pd.DatetimeIndex, nb_blocks: int = None, freq: str = None) -> List[pd.DatetimeIndex]:
+    """
+    Split snapshots into consecutive time blocks.
+
+    Parameters
+    ----------
+    snapshots: pd.DatetimeIndex
+        Network snapshots.
+    nb_blocks: int (default: None)
+        Number of blocks of (almost) equal length.
+    freq: str (default: None)
+        Pandas period frequency defining the blocks (e.g. 'Y' for one block per (weather) year or 'M' for one
+        block per month). Used instead of nb_blocks if given.
+
+    Returns
+    -------
+    List[pd.DatetimeIndex]
+        Snapshots of each block.
+    """
+    assert nb_blocks is not None or freq is not None, "Error: Either a number of blocks or a frequency must be given."
+    if freq is not None:
+        periods = snapshots.to_period(freq)
+        return [snapshots[periods == period] for period in periods.unique()]
+    assert 0 < nb_blocks <= len(snapshots), f"Error: The number of blocks must be between 1 and {len(snapshots)}."
+    return [snapshots[indices] for indices in np.array_split(np.arange(len(snapshots)), nb_blocks)]
+
+
+def get_extendable_components(net: pypsa.Network) -> Dict[str, pd.Index]:
+    """Return the extendable components of each type with an investment variable."""
+    return {c: net.df(c).index[net.df(c)[f"{attr}_extendable"]] for c, attr, _ in investment_variables}
+
+
+def build_operation_problem(net: pypsa.Network, snapshots: pd.DatetimeIndex) -> pypsa.Network:
+    """
+    Return a copy of a network restricted to a time block, whose objective only contains operational costs.
+
+    Investment variables are kept but their capital costs are set to zero, so that their values can be
+    fixed to the ones of the master problem by constraints whose duals give the Benders cuts.
+    Storage units and stores with a cyclic state of charge are cyclic over each block.
+    """
+    block_net = net.copy(snapshots=snapshots)
+    # Keep the extra attributes (configuration, capacity credits, etc.) used by the functionalities
+    for name, attribute in vars(net).items():
+        if name not in vars(block_net):
+            setattr(block_net, name, attribute)
+    for c, _, _ in investment_variables:
+        block_net.df(c)["capital_cost"] = 0.
+    return block_net
+
+
+def build_feasibility_problem(net: pypsa.Network) -> pypsa.Network:
+    """
+    Return a copy of an operation problem whose objective is the lack or excess of power at each bus.
+
+    Operational costs are removed and two slack generators are added at each bus, one supplying and one
+    absorbing power at a cost of one per MWh. The problem is feasible whatever the capacities are, and its
+    optimal value is zero if and only if the operation problem is feasible.
+    """
+    feasibility_net = net.copy()
+    for name, attribute in vars(net).items():
+        if name not in vars(feasibility_net):
+            setattr(feasibility_net, name, attribute)
+    for c in ['Generator', 'StorageUnit', 'Link', 'Store']:
+        feasibility_net.df(c)["marginal_cost"] = 0.
+        feasibility_net.pnl(c)["marginal_cost"] = feasibility_net.pnl(c)["marginal_cost"].iloc[:, :0]
+
+    # Slacks can cover the whole load of the network
+    slack_capacity = net.loads_t.p_set.abs().sum(axis=1).max() + net.loads.p_set.abs().sum() + 1.
+    buses = net.buses.index
+    feasibility_net.madd("Generator", buses + " benders_slack_supply", bus=buses, p_nom=slack_capacity,
+                         marginal_cost=1.)
+    feasibility_net.madd("Generator", buses + " benders_slack_absorption", bus=buses, p_nom=slack_capacity,
+                         p_min_pu=-1., p_max_pu=0., marginal_cost=-1.)
+    return feasibility_net
+
+
+def solve_operation_problem(net: pypsa.Network, feasibility_net: pypsa.Network, capacities: Dict[str, pd.Series],
+                            solver_name: str, solver_options: Dict[str, Any] = None,
+                            extra_functionality: Callable = None, feasibility_tolerance: float = 1e-6) \
+        -> Tuple[bool, float, Dict[str, pd.Series], Dict[Tuple[str, str], pd.DataFrame]]:
+    """
+    Solve the operation of a time block for given capacities.
+
+    If the operation is infeasible for these capacities, the feasibility problem of the block is solved instead,
+    giving the infeasibility (lack or excess of power) of the block and its derivatives with respect to the
+    capacities, from which a feasibility cut is built.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        Network restricted to the time block (see build_operation_problem).
+    feasibility_net: pypsa.Network
+        Feasibility problem of the time block (see build_feasibility_problem).
+    capacities: Dict[str, pd.Series]
+        Capacity of each extendable component of each type, given by the master problem.
+    solver_name: str
+        Name of the solver.
+    solver_options: Dict[str, Any] (default: None)
+        Options of the solver.
+    extra_functionality: Callable (default: None)
+        Function adding operational constraints, called as in pypsa lopf.
+    feasibility_tolerance: float (default: 1e-6)
+        Infeasibility (in MWh) under which an infeasible operation is not explained by a lack of capacity.
+
+    Returns
+    -------
+    bool
+        Whether the operation of the block is feasible.
+    float
+        Operational cost of the block, or its infeasibility if the operation is infeasible.
+    Dict[str, pd.Series]
+        Derivative of the operational cost (or of the infeasibility) with respect to the capacity of each
+        extendable component of each type.
+    Dict[Tuple[str, str], pd.DataFrame]
+        Time series results of the block, None if the operation is infeasible.
+    """
+
+    def fix_capacities(n: pypsa.Network, snapshots: pd.DatetimeIndex):
+        if extra_functionality is not None:
+            extra_functionality(n, snapshots)
+        for c, attr, _ in investment_variables:
+            if len(capacities[c]) != 0:
+                lhs = linexpr((1., get_var(n, c, attr)[capacities[c].index]))
+                define_constraints(n, lhs, '==', capacities[c], c, 'benders_fix')
+
+    def get_gradients(n: pypsa.Network) -> Dict[str, pd.Series]:
+        # pypsa stores the opposite of the duals of equality constraints
+        return {c: -n.df(c)["benders_fix"][capacities[c].index] if len(capacities[c]) != 0
+                else pd.Series(dtype=float) for c, _, _ in investment_variables}
+
+    keep_shadowprices = ['Bus'] + [c for c, _, _ in investment_variables]
+    status, condition = net.lopf(solver_name=solver_name, solver_options=solver_options,
+                                 extra_functionality=fix_capacities, pyomo=False, keep_shadowprices=keep_shadowprices)
+    if status == 'ok':
+        results = {(c.list_name, attr): df for c in net.iterate_components() for attr, df in c.pnl.items()
+                   if len(df.columns) != 0 and df.index.equals(net.snapshots)}
+        return True, net.objective, get_gradients(net), results
+
+    status, _ = feasibility_net.lopf(solver_name=solver_name, solver_options=solver_options,
+                                     extra_functionality=fix_capacities, pyomo=False,
+                                     keep_shadowprices=keep_shadowprices)
+    assert status == 'ok' and feasibility_net.objective > feasibility_tolerance, \
+        f"Error: The operation of block starting at {net.snapshots[0]} could not be solved ({condition})."
+    return False, feasibility_net.objective, get_gradients(feasibility_net), None
+
+
+def build_master_problem(net: pypsa.Network, nb_blocks: int, master_functionality: Callable = None) \
+        -> ConcreteModel:
+    """
+    Build the master problem, minimizing investment costs plus an estimate of the operational cost of each block.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    nb_blocks: int
+        Number of time blocks.
+    master_functionality: Callable (default: None)
+        Function adding constraints on capacities, called as master_functionality(net, snapshots)
+        with net.model set to the master problem.
+
+    Returns
+    -------
+    ConcreteModel
+        Master problem, whose cuts are stored in its 'cuts' constraint list.
+    """
+
+    model = ConcreteModel()
+    capex = 0.
+    for c, attr, var_name in investment_variables:
+        df = net.df(c).loc[get_extendable_components(net)[c]]
+        upper = df[f"{attr}_max"].astype(object).where(np.isfinite(df[f"{attr}_max"]), None)
+        bounds = {i: (df.at[i, f"{attr}_min"], upper[i]) for i in df.index}
+        variable = Var(list(df.index), domain=NonNegativeReals, bounds=lambda m, i: bounds[i])
+        setattr(model, var_name, variable)
+        capex += sum(df.at[i, "capital_cost"] * variable[i] for i in df.index)
+    # Operational costs are assumed non-negative, which bounds the master problem before the first cuts
+    model.operation_cost = Var(range(nb_blocks), domain=NonNegativeReals)
+    model.objective = Objective(expr=capex + sum(model.operation_cost[b] for b in range(nb_blocks)))
+    model.cuts = ConstraintList()
+
+    if master_functionality is not None:
+        net.model = model
+        master_functionality(net, net.snapshots)
+
+    return model
+
+
+@traced
+def benders_lopf(net: pypsa.Network, solver_name: str, solver_options: Dict[str, Any] = None,
+                 nb_blocks: int = None, freq: str = None, extra_functionality: Callable = None,
+                 master_functionality: Callable = None, gap_tolerance: float = 1e-3, max_iterations: int = 50,
+                 nb_processes: int = 1) -> pd.DataFrame:
+    """
+    Optimize the capacities and dispatch of a network with a Benders decomposition over time blocks.
+
+    A master problem holds the investment variables (capacities of extendable generators, storage units, links
+    and stores). The operation of each time block is solved separately (possibly in parallel) for the capacities
+    of the master problem, and the duals of the capacities give a cut added to the master problem. If these
+    capacities can not supply the load of a block, a feasibility cut, built from the minimal lack of power
+    of the block, excludes them from the master problem instead.
+    The loop stops when the gap between the lower bound (master problem) and the upper bound
+    (best investment plus operational cost) is below the tolerance.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance, without extendable lines.
+    solver_name: str
+        Name of the solver, used for both the master problem and the operation problems.
+    solver_options: Dict[str, Any] (default: None)
+        Options of the solver.
+    nb_blocks: int (default: None)
+        Number of time blocks.
+    freq: str (default: None)
+        Frequency of the time blocks, used instead of nb_blocks if given (e.g. 'Y' for weather years).
+    extra_functionality: Callable (default: None)
+        Function adding operational constraints to each operation problem, as in pypsa lopf without pyomo.
+        Constraints scaled with the number of snapshots (e.g. CO2 budgets) are applied to each block separately.
+    master_functionality: Callable (default: None)
+        Function adding constraints only involving capacities (e.g. dispatchable capacity or PRM pyomo
+        functionalities) to the master problem, called with net.model set to the master problem.
+    gap_tolerance: float (default: 1e-3)
+        Relative gap between the bounds under which the loop stops.
+    max_iterations: int (default: 50)
+        Maximum number of iterations.
+    nb_processes: int (default: 1)
+        Number of processes solving operation problems at the same time.
+
+    Returns
+    -------
+    pd.DataFrame
+        Lower bound, upper bound and gap at each iteration. The optimal capacities and the time series results
+        of the best iteration are stored in the network, and its total cost in net.objective.
+    """
+
+    assert not net.lines.s_nom_extendable.any(), "Error: Extendable lines are not supported by the decomposition."
+
+    blocks = get_time_blocks(net.snapshots, nb_blocks, freq)
+    block_nets = [build_operation_problem(net, block) for block in blocks]
+    feasibility_nets = [build_feasibility_problem(block_net) for block_net in block_nets]
+    extendable = get_extendable_components(net)
+    capital_costs = {c: net.df(c).capital_cost[extendable[c]] for c, _, _ in investment_variables}
+
+    master = build_master_problem(net, len(blocks), master_functionality)
+    solver = SolverFactory(solver_name)
+    if solver_options is not None:
+        solver.options.update(solver_options)
+
+    logger.info(f"Solving {len(blocks)} time blocks with {nb_processes} processes.")
+    history = []
+    upper_bound, best = np.inf, None
+    executor = ProcessPoolExecutor(max_workers=nb_processes) if nb_processes > 1 else None
+    try:
+        for iteration in range(max_iterations):
+
+            solver.solve(master)
+            lower_bound = value(master.objective)
+            capacities = {c: pd.Series([value(getattr(master, var_name)[i]) for i in extendable[c]],
+                                       index=extendable[c], dtype=float)
+                          for c, _, var_name in investment_variables}
+
+            args = [(block_net, feasibility_net, capacities, solver_name, solver_options, extra_functionality)
+                    for block_net, feasibility_net in zip(block_nets, feasibility_nets)]
+            solutions = list(executor.map(solve_operation_problem, *zip(*args))) if executor is not None \
+                else [solve_operation_problem(*block_args) for block_args in args]
+
+            # The upper bound is only updated if the operation of all blocks is feasible
+            if all(feasible for feasible, _, _, _ in solutions):
+                investment_cost = sum((capital_costs[c] * capacities[c]).sum() for c in capacities)
+                cost = investment_cost + sum(operation_cost for _, operation_cost, _, _ in solutions)
+                if cost < upper_bound:
+                    upper_bound, best = cost, (capacities, [results for _, _, _, results in solutions])
+
+            for b, (feasible, cost_or_infeasibility, gradients, _) in enumerate(solutions):
+                cut = cost_or_infeasibility + sum(gradients[c][i] * (getattr(master, var_name)[i] - capacities[c][i])
+                                                  for c, _, var_name in investment_variables for i in extendable[c])
+                # Optimality cut, or feasibility cut forcing the infeasibility of the block to zero
+                master.cuts.add(master.operation_cost[b] >= cut if feasible else cut <= 0.)
+
+            gap = (upper_bound - lower_bound) / max(abs(upper_bound), 1e-9) if np.isfinite(upper_bound) else np.inf
+            history += [{"iteration": iteration, "lower_bound": lower_bound, "upper_bound": upper_bound, "gap": gap}]
+            logger.info(f"Iteration {iteration}: lower bound {lower_bound:.6g}, upper bound {upper_bound:.6g}, "
+                        f"gap {gap:.3%}.")
+            if gap <= gap_tolerance:
+                break
+        else:
+            logger.warning(f"Decomposition stopped after {max_iterations} iterations with a gap of {gap:.3%}.")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    assert best is not None, f"Error: No capacities allowing a feasible operation of all blocks were found " \
+                             f"in {max_iterations} iterations."
+
+    # Save the best solution in the network
+    capacities, solutions = best
+    for c, attr, _ in investment_variables:
+        net.df(c)[f"{attr}_opt"] = net.df(c)[attr]
+        net.df(c).loc[extendable[c], f"{attr}_opt"] = capacities[c]
+    for list_name, attr in set().union(*[results.keys() for results in solutions]):
+        block_results = [results.get((list_name, attr)) for results in solutions]
+        getattr(net, list_name + "_t")[attr] = pd.concat(block_results).reindex(net.snapshots)
+    net.objective = upper_bound
+
+    return pd.DataFrame(history).set_index("iteration")
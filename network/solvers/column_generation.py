@@ -0,0 +1,125 @@
+from typing import Dict, Any
+
+import pandas as pd
+
+import pypsa
+
+from network.resampling import resample_time_series_to_snapshots
+from network.solvers.pricing import get_capacity_reduced_costs
+from network.solvers.pruning import solve
+from network.instrumentation import traced, trace_stage
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def get_initial_candidates(candidates: pd.DataFrame, p_max_pu: pd.DataFrame, nb_per_bus: int = 1) -> pd.Index:
+    """
+    Return the candidates with the highest mean capacity factors of each type at each bus,
+    and the candidates with existing capacity.
+
+    Parameters
+    ----------
+    candidates: pd.DataFrame
+        Candidate generators with 'bus', 'type' and 'p_nom_min' attributes.
+    p_max_pu: pd.DataFrame
+        Availability of the candidates (time steps x generators), at the time resolution of the network or a finer one.
+    nb_per_bus: int (default: 1)
+        Number of candidates of each type at each bus.
+
+    Returns
+    -------
+    pd.Index
+        Initial candidates.
+    """
+    mean_cap_factors = p_max_pu[candidates.index].mean()
+    ranks = mean_cap_factors.groupby([candidates.type, candidates.bus]).rank(ascending=False, method="first")
+    return candidates.index[(ranks <= nb_per_bus) | (candidates.p_nom_min > 0)]
+
+
+def add_candidates(net: pypsa.Network, candidates: pd.DataFrame, p_max_pu: pd.DataFrame):
+    """Add candidate generators and their availability to a network."""
+    net.import_components_from_dataframe(candidates, "Generator")
+    net.import_series_from_dataframe(p_max_pu[candidates.index], "Generator", "p_max_pu")
+
+
+@traced
+def column_generation_lopf(net: pypsa.Network, candidates: pd.DataFrame, candidates_p_max_pu: pd.DataFrame,
+                           solver_name: str, solver_options: Dict[str, Any], nb_initial_per_bus: int = 1,
+                           max_columns_per_iteration: int = None, reduced_cost_tolerance: float = 0.,
+                           max_iterations: int = 20, **lopf_kwargs) -> pd.DataFrame:
+    """
+    Solve a network with RES candidate generators which are only added to the model when they are attractive.
+
+    The network is first solved with the candidates with the best capacity factors of each type at each bus
+    (and the candidates with existing capacity). After each solve, the remaining candidates are priced at the
+    marginal prices of the buses and the ones with a negative reduced cost are added to the network, which is solved
+    again. The loop stops when no remaining candidate would decrease the cost of the network.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance, without the candidates.
+    candidates: pd.DataFrame
+        Static attributes of the candidate generators (e.g. as returned by get_generators_in_grid_cells).
+    candidates_p_max_pu: pd.DataFrame
+        Availability of the candidates (time steps x generators), at the time resolution of the network or a finer one.
+    solver_name: str
+        Name of the solver.
+    solver_options: Dict[str, Any]
+        Options of the solver.
+    nb_initial_per_bus: int (default: 1)
+        Number of candidates of each type at each bus in the first solve.
+    max_columns_per_iteration: int (default: None)
+        Maximum number of candidates, with the lowest reduced costs, added at each iteration. If None, all attractive
+        candidates are added.
+    reduced_cost_tolerance: float (default: 0.)
+        Candidates are added if their reduced cost is lower than minus this tolerance.
+    max_iterations: int (default: 20)
+        Maximum number of solves.
+    lopf_kwargs:
+        Other arguments of lopf (e.g. extra_functionality, pyomo).
+
+    Returns
+    -------
+    pd.DataFrame
+        Objective, number of candidates in the network and number of candidates added after each solve.
+        Candidates which were never added are not part of the network.
+    """
+
+    assert max_iterations > 0, "Error: The number of iterations must be strictly positive."
+    # Availabilities are averaged over the time steps of the network, which may have been aggregated
+    # after the availabilities were computed (e.g. by network.memory.apply_memory_budget)
+    candidates_p_max_pu = resample_time_series_to_snapshots(candidates_p_max_pu, net.snapshots,
+                                                            net.snapshot_weightings)
+
+    added = get_initial_candidates(candidates, candidates_p_max_pu, nb_initial_per_bus)
+    add_candidates(net, candidates.loc[added], candidates_p_max_pu)
+    remaining = candidates.index.difference(added)
+
+    history = []
+    for iteration in range(max_iterations):
+        logger.info(f"Iteration {iteration}: solving with {len(candidates) - len(remaining)} "
+                    f"of {len(candidates)} RES candidates.")
+        with trace_stage("column_generation.lopf", net):
+            solve(net, solver_name, solver_options, **lopf_kwargs)
+
+        reduced_costs = get_capacity_reduced_costs(net, candidates.loc[remaining], candidates_p_max_pu)
+        improving = reduced_costs[reduced_costs < -reduced_cost_tolerance].sort_values()
+        if max_columns_per_iteration is not None:
+            improving = improving.iloc[:max_columns_per_iteration]
+        last = len(improving) == 0 or iteration == max_iterations - 1
+        history += [{"iteration": iteration, "objective": net.objective,
+                     "columns": len(candidates) - len(remaining), "added": 0 if last else len(improving)}]
+        if last:
+            break
+
+        add_candidates(net, candidates.loc[improving.index], candidates_p_max_pu)
+        remaining = remaining.difference(improving.index)
+
+    if len(improving) != 0:
+        logger.warning(f"Column generation stopped after {max_iterations} iterations "
+                       f"with {len(improving)} attractive candidates left.")
+
+    return pd.DataFrame(history).set_index("iteration")
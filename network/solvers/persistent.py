@@ -0,0 +1,201 @@
+from typing import Any, Callable, Dict, List
+from os import makedirs
+import yaml
+
+import pandas as pd
+
+from pyomo.environ import Constraint, Param
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+import pypsa
+from pypsa.opf import network_lopf_build_model, network_lopf_prepare_solver, network_lopf_solve
+
+from network.globals.functionalities import get_functionality_parameters
+from network.instrumentation import traced, trace_stage
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def get_parameter_dependencies(model, constraint_names: List[str]) -> Dict[str, List]:
+    """
+    Return the constraints and objective depending on each mutable parameter of a pyomo model.
+
+    Parameters
+    ----------
+    model: pyomo.environ.ConcreteModel
+        Pyomo model.
+    constraint_names: List[str]
+        Names of the constraints of the model which can depend on mutable parameters.
+
+    Returns
+    -------
+    Dict[str, List]
+        Constraint data (and objective) depending on each parameter, indexed by the name of the parameter.
+    """
+
+    dependencies = {}
+    datas = [data for name in constraint_names for data in getattr(model, name).values()] + [model.objective]
+    for data in datas:
+        for param in identify_mutable_parameters(data.expr):
+            dependencies.setdefault(param.parent_component().name, []).append(data)
+    return dependencies
+
+
+@traced
+def build_persistent_lopf(net: pypsa.Network, solver_name: str, solver_io: str = None,
+                          snapshots: pd.DatetimeIndex = None, extra_functionality: Callable = None,
+                          formulation: str = "angles", skip_pre: bool = False):
+    """
+    Build the pyomo model of a network and load it in a persistent solver.
+
+    The model is kept in the solver, so that it can be solved several times (see solve_persistent_lopf) without
+    writing and reading an LP file for each solve. Parameters of the functionalities are mutable pyomo Params
+    which can be updated between solves without rebuilding the model.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    solver_name: str
+        Name of a pyomo persistent solver (e.g. 'gurobi_persistent' or 'cplex_persistent').
+    solver_io: str (default: None)
+        Solver Input-Output option.
+    snapshots: pd.DatetimeIndex (default: None)
+        Snapshots to optimise, by default all snapshots of the network.
+    extra_functionality: Callable (default: None)
+        Function adding constraints to the model, as in pypsa.Network.lopf.
+    formulation: str (default: 'angles')
+        Formulation of the linear power flow equations.
+    skip_pre: bool (default: False)
+        Whether to skip the preliminary steps of pypsa.Network.lopf.
+    """
+
+    snapshots = net.snapshots if snapshots is None else snapshots
+    model = network_lopf_build_model(net, snapshots, skip_pre=skip_pre, formulation=formulation)
+
+    # Only the constraints added by the functionalities depend on mutable parameters
+    constraint_names = set(model.component_map(Constraint))
+    if extra_functionality is not None:
+        extra_functionality(net, snapshots)
+    constraint_names = [name for name in model.component_map(Constraint) if name not in constraint_names]
+
+    opt = network_lopf_prepare_solver(net, solver_name, solver_io)
+    assert isinstance(opt, PersistentSolver), \
+        f"Error: Solver {solver_name} is not a persistent solver (e.g. 'gurobi_persistent')."
+
+    net.persistent_lopf = {"snapshots": snapshots, "formulation": formulation,
+                           "dependencies": get_parameter_dependencies(model, constraint_names)}
+
+
+def update_parameters(net: pypsa.Network, parameters: Dict[str, Any]):
+    """
+    Update mutable parameters of a model built with build_persistent_lopf.
+
+    The constraints depending on parameters whose value changed are replaced in the solver, the other ones being kept.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance whose model was built with build_persistent_lopf.
+    parameters: Dict[str, Any]
+        New value of each parameter (a dictionary indexed by the indices of the parameter for indexed parameters),
+        indexed by the name of the parameter in the model
+        (see network.globals.functionalities.get_functionality_parameters).
+    """
+
+    model, opt = net.model, net.opt
+    dependencies = net.persistent_lopf["dependencies"]
+
+    updated = []
+    for name, value in parameters.items():
+        param = getattr(model, name, None)
+        assert isinstance(param, Param) and param.mutable, f"Error: {name} is not a mutable parameter of the model."
+        # Constraints of unchanged parameters are kept in the solver
+        unchanged = all(param[i].value == v for i, v in value.items()) if param.is_indexed() \
+            else param.value == value
+        if unchanged:
+            continue
+        if param.is_indexed():
+            param.store_values(value)
+        else:
+            param.set_value(value)
+        updated += dependencies.get(name, [])
+
+    # Constraints and objective depending on several parameters are only replaced once
+    updated = list({id(data): data for data in updated}.values())
+    logger.info(f"Updating {len(updated)} constraints and objectives in the solver.")
+    for data in updated:
+        if data is model.objective:
+            opt.set_objective(data)
+        else:
+            opt.remove_constraint(data)
+            opt.add_constraint(data)
+
+
+@traced
+def solve_persistent_lopf(net: pypsa.Network, solver_options: Dict[str, Any] = None, solver_logfile: str = None,
+                          parameters: Dict[str, Any] = None, extra_postprocessing: Callable = None):
+    """
+    Solve a model built with build_persistent_lopf and extract the results in the network.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance whose model was built with build_persistent_lopf.
+    solver_options: Dict[str, Any] (default: None)
+        Options of the solver.
+    solver_logfile: str (default: None)
+        Log file of the solver.
+    parameters: Dict[str, Any] (default: None)
+        Parameters updated before solving (see update_parameters).
+    extra_postprocessing: Callable (default: None)
+        Function extracting further results, as in pypsa.Network.lopf.
+
+    Returns
+    -------
+    Tuple[str, str]
+        Status and termination condition of the solver.
+    """
+
+    if parameters is not None:
+        update_parameters(net, parameters)
+
+    # The model is kept after the solve so that it can be solved again
+    return network_lopf_solve(net, net.persistent_lopf["snapshots"], net.persistent_lopf["formulation"],
+                              {} if solver_options is None else solver_options, solver_logfile,
+                              free_memory=set(), extra_postprocessing=extra_postprocessing)
+
+
+def sweep_persistent_lopf(net: pypsa.Network, sweep: List[Dict[str, Dict[str, Any]]], output_dir: str,
+                          solver_options: Dict[str, Any] = None):
+    """
+    Solve a model built with build_persistent_lopf again for successive changes of the functionalities.
+
+    The changes are applied to the functionalities configuration of the network (net.config['functionalities']),
+    from which the parameters of the model are updated. The configuration and results of each solve are exported
+    to a 'sweep_{i}' folder of the output directory.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance whose model was built with build_persistent_lopf.
+    sweep: List[Dict[str, Dict[str, Any]]]
+        Changes of the configuration of each solve, indexed by functionality,
+        e.g. [{'co2_emissions': {'mitigation_factor': 0.95}}].
+    output_dir: str
+        Directory in which results are exported.
+    solver_options: Dict[str, Any] (default: None)
+        Options of the solver.
+    """
+
+    for i, changes in enumerate(sweep):
+        for functionality, values in changes.items():
+            net.config["functionalities"][functionality].update(values)
+        sweep_dir = f"{output_dir}sweep_{i}/"
+        makedirs(sweep_dir, exist_ok=True)
+        with trace_stage(f"lopf_sweep_{i}", net):
+            solve_persistent_lopf(net, solver_options, f"{sweep_dir}solver.log", get_functionality_parameters(net))
+        yaml.dump(net.config["functionalities"], open(f"{sweep_dir}functionalities.yaml", 'w'))
+        net.export_to_csv_folder(sweep_dir)
@@ -0,0 +1,217 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+
+from network.instrumentation import traced
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Attributes which must be equal for generators to be interchangeable in the optimization model
+# (the type and carrier are used by the functionalities and the CO2 constraints)
+interchangeable_attributes = ["bus", "type", "carrier", "p_nom_extendable"]
+
+
+def get_profile_keys(net: pypsa.Network) -> pd.Series:
+    """
+    Return a key per generator which is the same for generators with identical p_min_pu, p_max_pu and
+    marginal_cost series.
+    """
+    return pd.concat([pd.util.hash_pandas_object(get_switchable_as_dense(net, 'Generator', attr).T,
+                                                 index=False).astype(str)
+                      for attr in ['p_min_pu', 'p_max_pu', 'marginal_cost']], axis=1).agg("-".join, axis=1)
+
+
+def get_input_time_series(net: pypsa.Network, gens: pd.Index) -> Dict[str, pd.DataFrame]:
+    """Return a copy of the input time series (e.g. p_max_pu, marginal_cost) of generators, indexed by attribute."""
+    attrs = net.components["Generator"]["attrs"]
+    return {attr: df[df.columns.intersection(gens)].copy() for attr, df in net.generators_t.items()
+            if attrs.status.get(attr, "Input").startswith("Input") and df.columns.isin(gens).any()}
+
+
+def set_input_time_series(net: pypsa.Network, time_series: Dict[str, pd.DataFrame]):
+    """Set back input time series returned by get_input_time_series (e.g. after the generators were removed)."""
+    for attr, df in time_series.items():
+        current = net.generators_t[attr]
+        net.generators_t[attr] = pd.concat([current.drop(columns=df.columns, errors="ignore"), df], axis=1)
+
+
+def get_dead_generators(net: pypsa.Network, tolerance: float) -> pd.Index:
+    """Return the generators which cannot produce: null capacity or null availability."""
+    gens = net.generators
+    p_max_pu = get_switchable_as_dense(net, 'Generator', 'p_max_pu')
+    no_capacity = np.where(gens.p_nom_extendable, gens.p_nom_max, gens.p_nom) <= tolerance
+    no_availability = (p_max_pu.max() <= tolerance) & (~gens.p_nom_extendable | (gens.p_nom_min <= tolerance))
+    return gens.index[no_capacity | no_availability]
+
+
+def get_dominated_generators(gens: pd.DataFrame, tolerance: float) -> pd.Series:
+    """
+    Return the extendable generators which have a cheaper interchangeable alternative without capacity limit.
+
+    Parameters
+    ----------
+    gens: pd.DataFrame
+        Generators with a 'profile' column (see get_profile_keys).
+    tolerance: float
+        Minimum capacity under which a generator is considered without minimum capacity.
+
+    Returns
+    -------
+    pd.Series
+        Cheapest alternative of each dominated generator.
+    """
+
+    gens = gens[gens.p_nom_extendable]
+    dominated = {}
+    for _, group in gens.groupby(interchangeable_attributes + ["profile"]):
+        alternatives = group[np.isinf(group.p_nom_max)]
+        if len(group) < 2 or len(alternatives) == 0:
+            continue
+        cheapest = alternatives.sort_values(["capital_cost", "marginal_cost"]).iloc[0]
+        not_more_expensive = (group.capital_cost >= cheapest.capital_cost) \
+            & (group.marginal_cost >= cheapest.marginal_cost)
+        strictly = (group.capital_cost > cheapest.capital_cost) | (group.marginal_cost > cheapest.marginal_cost)
+        for gen in group.index[not_more_expensive & strictly & (group.p_nom_min <= tolerance)]:
+            dominated[gen] = cheapest.name
+
+    return pd.Series(dominated, dtype=object)
+
+
+@traced
+def reduce_generators(net: pypsa.Network, tolerance: float = 1e-3) \
+        -> Tuple[pypsa.Network, pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Remove generators which cannot be part of an optimal solution before solving.
+
+    Three reductions are applied, in this order:
+     - 'dead' generators, whose maximum capacity or availability is null, are removed;
+     - generators of the same type and carrier at the same bus with identical costs and availabilities
+       are 'merged' into one 'representative' generator whose capacity bounds are the sums of theirs;
+     - extendable generators without minimum capacity which have a cheaper interchangeable alternative without
+       capacity limit are removed as 'dominated'.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    tolerance: float (default: 1e-3)
+        Capacity (in MW) and availability under which a generator is considered null.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    report: pd.DataFrame
+        Original attributes of each removed or modified generator, with the 'reason' of the change and the
+        generator it is 'replaced_by' (for merged and dominated generators). Used to map the solution back
+        onto the original generators with restore_generators.
+    time_series: Dict[str, pd.DataFrame]
+        Original input time series (e.g. p_max_pu, marginal_cost) of the generators of the report, indexed by
+        attribute. Also used by restore_generators.
+    """
+
+    gens = net.generators.copy()
+    gens["profile"] = get_profile_keys(net)
+    reason = pd.Series(index=gens.index, dtype=object)
+    replaced_by = pd.Series(index=gens.index, dtype=object)
+
+    reason[get_dead_generators(net, tolerance)] = "dead"
+
+    # Merge interchangeable generators with identical costs
+    alive = gens[reason.isna()]
+    keys = alive[interchangeable_attributes + ["profile", "capital_cost", "marginal_cost"]].astype(str)
+    merged = pd.Series(alive.index, index=alive.index).groupby(list(keys.T.values)).transform("first")
+    merged = merged[merged != merged.index]
+    reason[merged.index] = "merged"
+    reason[merged.unique()] = "representative"
+    replaced_by[merged.index] = merged
+
+    dominated = get_dominated_generators(gens[reason.isna() | (reason == "representative")], tolerance)
+    reason[dominated.index] = "dominated"
+    replaced_by[dominated.index] = dominated
+
+    report = net.generators[reason.notna()].copy()
+    report["reason"] = reason
+    report["replaced_by"] = replaced_by
+    time_series = get_input_time_series(net, report.index)
+
+    # Representative generators get the total capacities of the generators merged into them
+    members = pd.concat([merged, pd.Series(merged.unique(), index=merged.unique(), dtype=object)])
+    for attr in ["p_nom", "p_nom_min", "p_nom_max"]:
+        net.generators.loc[members.unique(), attr] = net.generators.loc[members.index, attr].groupby(members).sum()
+    net.mremove("Generator", report.index[report.reason != "representative"])
+
+    logger.info(f"Presolve removed {len(report) - (report.reason == 'representative').sum()} generators "
+                f"({report.reason.value_counts().to_dict()}).")
+
+    return net, report, time_series
+
+
+def restore_generators(net: pypsa.Network, report: pd.DataFrame, time_series: Dict[str, pd.DataFrame]) \
+        -> pypsa.Network:
+    """
+    Add back the generators removed by reduce_generators and map the solution of a network onto them.
+
+    The optimal capacity of a representative generator is split between the generators merged into it,
+    each of them getting its minimum capacity plus a share of the remaining capacity proportional to its capacity
+    range (or equal shares if some ranges are infinite). Their generation is split in proportion to their capacity.
+    Dead and dominated generators get their minimum (or fixed) capacity and no generation. All generators get
+    back their original static attributes and input time series.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance reduced with reduce_generators, and solved.
+    report: pd.DataFrame
+        Report returned by reduce_generators.
+    time_series: Dict[str, pd.DataFrame]
+        Time series returned by reduce_generators.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    solved = "p_nom_opt" in net.generators and len(net.generators_t.p.columns) != 0
+    merged = report[report.reason.isin(["merged", "representative"])]
+    groups = merged.replaced_by.fillna(pd.Series(merged.index, index=merged.index))
+
+    # Split the solution of each representative between the generators merged into it
+    p_nom_opt = pd.Series(np.where(report.p_nom_extendable, report.p_nom_min, report.p_nom), index=report.index)
+    shares = pd.Series(0., index=report.index)
+    for representative, group in merged.groupby(groups):
+        total = net.generators.p_nom_opt[representative] if solved else group.p_nom.sum()
+        ranges = group.p_nom_max - group.p_nom_min if group.p_nom_extendable.all() else group.p_nom
+        weights = ranges / ranges.sum() if np.isfinite(ranges).all() and ranges.sum() > 0 \
+            else pd.Series(1. / len(group), index=group.index)
+        if group.p_nom_extendable.all():
+            p_nom_opt[group.index] = group.p_nom_min + (total - group.p_nom_min.sum()) * weights
+        shares[group.index] = p_nom_opt[group.index] / total if total > 0 else weights
+
+    # Restore the original attributes of representatives and add back the removed generators
+    static = report.drop(columns=["reason", "replaced_by"])
+    representatives = report.index[report.reason == "representative"]
+    net.generators.loc[representatives, static.columns] = static.loc[representatives]
+    removed = report.index[report.reason != "representative"]
+    net.import_components_from_dataframe(static.loc[removed], "Generator")
+
+    # mremove dropped the time series of the removed generators
+    set_input_time_series(net, time_series)
+
+    if solved:
+        net.generators.loc[report.index, "p_nom_opt"] = p_nom_opt
+        p = net.generators_t.p
+        generation = pd.DataFrame(0., index=p.index, columns=removed)
+        merged_removed = merged.index[merged.reason == "merged"]
+        generation[merged_removed] = p[groups[merged_removed].values].values * shares[merged_removed].values
+        p[representatives] = p[representatives] * shares[representatives]
+        net.generators_t.p = pd.concat([p, generation], axis=1)
+
+    return net
@@ -0,0 +1,31 @@
+import pandas as pd
+
+import pypsa
+
+
+def get_capacity_reduced_costs(net: pypsa.Network, gens: pd.DataFrame, p_max_pu: pd.DataFrame) -> pd.Series:
+    """
+    Return the reduced cost of one MW of capacity of generators at the marginal prices of a solved network.
+
+    The reduced cost is the capital cost of the generator minus the revenue it would get by producing
+    whenever the price at its bus exceeds its marginal cost. Generators with a negative reduced cost would
+    decrease the total cost of the network if they were built.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A solved PyPSA Network instance (with marginal prices at its buses).
+    gens: pd.DataFrame
+        Generators (not necessarily in the network) with 'bus', 'capital_cost' and 'marginal_cost' attributes.
+    p_max_pu: pd.DataFrame
+        Availability of the generators (snapshots x generators).
+
+    Returns
+    -------
+    pd.Series
+        Reduced cost of each generator.
+    """
+    prices = net.buses_t.marginal_price[gens.bus].set_axis(gens.index, axis=1)
+    margins = prices.sub(gens.marginal_cost, axis=1).clip(lower=0.)
+    revenues = (margins * p_max_pu[gens.index]).mul(net.snapshot_weightings[net.snapshots], axis=0).sum()
+    return gens.capital_cost - revenues
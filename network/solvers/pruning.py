@@ -0,0 +1,120 @@
+from typing import Dict, Any
+
+import pandas as pd
+
+import pypsa
+
+from network.solvers.pricing import get_capacity_reduced_costs
+from network.solvers.presolve import get_input_time_series, set_input_time_series
+from network.instrumentation import traced, trace_stage
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def solve(net: pypsa.Network, solver_name: str, solver_options: Dict[str, Any], **lopf_kwargs):
+    """Run lopf and raise an error if the network could not be solved."""
+    status, condition = net.lopf(solver_name=solver_name, solver_options=solver_options, **lopf_kwargs)
+    assert status == 'ok', f"Error: The network could not be solved ({condition})."
+
+
+def get_prunable_generators(net: pypsa.Network, tolerance: float = 1e-3, reduced_cost_tolerance: float = 0.) \
+        -> pd.Index:
+    """
+    Return the RES generators of a solved network which are not built and would not decrease its cost if they were.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A solved PyPSA Network instance.
+    tolerance: float (default: 1e-3)
+        Capacity (in MW) under which a generator is considered not built.
+    reduced_cost_tolerance: float (default: 0.)
+        Reduced cost above which a generator is considered not attractive.
+
+    Returns
+    -------
+    pd.Index
+        Generators which can be removed.
+    """
+    gens = net.generators.loc[net.generators_t.p_max_pu.columns]
+    gens = gens[gens.p_nom_extendable & (gens.p_nom_opt <= tolerance) & (gens.p_nom_min <= tolerance)]
+    reduced_costs = get_capacity_reduced_costs(net, gens, net.generators_t.p_max_pu)
+    return gens.index[reduced_costs > reduced_cost_tolerance]
+
+
+@traced
+def pruned_lopf(net: pypsa.Network, solver_name: str, solver_options: Dict[str, Any],
+                loose_solver_options: Dict[str, Any] = None, tolerance: float = 1e-3,
+                reduced_cost_tolerance: float = 0., max_verifications: int = 0, **lopf_kwargs) -> pd.Index:
+    """
+    Solve a network in several passes, removing RES generators which are not needed before the accurate solve.
+
+    The network is first solved with loose solver options (e.g. loose barrier tolerances and no crossover).
+    RES generators which are not built and have a positive reduced cost at the resulting prices are removed,
+    and the reduced network is solved with the accurate solver options. The removed generators are then
+    priced at the accurate prices: if some of them have become attractive, they are added back and the network
+    is solved again, at most max_verifications times. Removed generators are finally added back without
+    capacity nor generation, so that the network has the same components as before.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    solver_name: str
+        Name of the solver.
+    solver_options: Dict[str, Any]
+        Options of the solver for the accurate solve.
+    loose_solver_options: Dict[str, Any] (default: None)
+        Options overriding solver_options for the first solve.
+    tolerance: float (default: 1e-3)
+        Capacity (in MW) under which a generator is considered not built.
+    reduced_cost_tolerance: float (default: 0.)
+        Reduced cost above which a generator is considered not attractive.
+    max_verifications: int (default: 0)
+        Maximum number of times removed generators are priced and the network solved again.
+    lopf_kwargs:
+        Other arguments of lopf (e.g. extra_functionality, pyomo).
+
+    Returns
+    -------
+    pd.Index
+        Generators removed for the accurate solve.
+    """
+
+    loose_solver_options = {**solver_options, **({} if loose_solver_options is None else loose_solver_options)}
+    with trace_stage("pruning.loose_lopf", net):
+        solve(net, solver_name, loose_solver_options, **lopf_kwargs)
+
+    pruned = get_prunable_generators(net, tolerance, reduced_cost_tolerance)
+    pruned_static = net.generators.loc[pruned].copy()
+    # mremove drops all the time series of the removed generators
+    pruned_time_series = get_input_time_series(net, pruned)
+    pruned_p_max_pu = pruned_time_series["p_max_pu"]
+    logger.info(f"Removing {len(pruned)} of {len(net.generators_t.p_max_pu.columns)} RES generators.")
+    net.mremove("Generator", pruned)
+
+    for verification in range(max_verifications + 1):
+        with trace_stage("pruning.lopf", net):
+            solve(net, solver_name, solver_options, **lopf_kwargs)
+        if verification == max_verifications or len(pruned) == 0:
+            break
+        reduced_costs = get_capacity_reduced_costs(net, pruned_static.loc[pruned], pruned_p_max_pu)
+        attractive = reduced_costs.index[reduced_costs <= reduced_cost_tolerance]
+        if len(attractive) == 0:
+            break
+        logger.info(f"Adding back {len(attractive)} attractive RES generators.")
+        net.import_components_from_dataframe(pruned_static.loc[attractive], "Generator")
+        set_input_time_series(net, {attr: df[df.columns.intersection(attractive)]
+                                    for attr, df in pruned_time_series.items()})
+        pruned = pruned.difference(attractive)
+
+    # Add back the removed generators, not built
+    net.import_components_from_dataframe(pruned_static.loc[pruned], "Generator")
+    set_input_time_series(net, {attr: df[df.columns.intersection(pruned)] for attr, df in pruned_time_series.items()})
+    net.generators.loc[pruned, "p_nom_opt"] = net.generators.loc[pruned, "p_nom_min"]
+    net.generators_t.p = pd.concat([net.generators_t.p, pd.DataFrame(0., index=net.snapshots, columns=pruned)],
+                                   axis=1)
+
+    return pruned
@@ -0,0 +1,91 @@
+from typing import Any, Callable, Tuple
+from os import environ, getpid, makedirs, replace
+from os.path import isfile, join
+from hashlib import sha1
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Environment variable giving the directory of the store, set by the process starting the workers
+store_dir_variable = "REPLAN_TIME_SERIES_STORE"
+
+
+def get_store_dir() -> str:
+    """Return the directory of the time series store of the current process, or None if there is none."""
+    return environ.get(store_dir_variable, None)
+
+
+def get_store_fn(store_dir: str, name: str, key: Tuple) -> str:
+    """Return the path (without extension) of the files of some time series in a store."""
+    return join(store_dir, f"{name}_{sha1(repr(key).encode()).hexdigest()}")
+
+
+def write_time_series(fn: str, df: pd.DataFrame):
+    """
+    Save time series as a numpy array and its labels.
+
+    Files are written to temporary files first so that concurrent processes never read partially written files.
+    The array is written last, its presence meaning that the time series are complete.
+    """
+    tmp_suffix = f".{getpid()}.tmp"
+    pickle.dump((df.index, df.columns), open(f"{fn}.labels.p{tmp_suffix}", 'wb'))
+    replace(f"{fn}.labels.p{tmp_suffix}", f"{fn}.labels.p")
+    with open(f"{fn}.npy{tmp_suffix}", 'wb') as f:
+        np.save(f, df.values.astype(float))
+    replace(f"{fn}.npy{tmp_suffix}", f"{fn}.npy")
+
+
+def read_time_series(fn: str) -> pd.DataFrame:
+    """Return time series saved with write_time_series, whose values are a read-only memory-mapped array."""
+    index, columns = pickle.load(open(f"{fn}.labels.p", 'rb'))
+    return pd.DataFrame(np.load(f"{fn}.npy", mmap_mode='r'), index=index, columns=columns, copy=False)
+
+
+def stored_time_series(name: str, key: Tuple, compute: Callable[..., pd.DataFrame],
+                       *args: Any, **kwargs: Any) -> pd.DataFrame:
+    """
+    Return time series from the store shared by the processes of a node, computing them if they are not stored yet.
+
+    Time series are saved as memory-mapped files, so that the processes reading them share the same
+    physical memory (the page cache of the node) instead of each loading its own copy of the data.
+    If no store is set for the current process (see store_dir_variable), time series are always computed.
+
+    Parameters
+    ----------
+    name: str
+        Name of the time series.
+    key: Tuple
+        Inputs identifying the time series (must have a deterministic string representation).
+    compute: Callable[..., pd.DataFrame]
+        Function computing the time series (e.g. reading iepy data).
+    args, kwargs:
+        Arguments of compute.
+
+    Returns
+    -------
+    pd.DataFrame
+        Time series. Their values are read-only if they come from the store.
+    """
+
+    store_dir = get_store_dir()
+    if store_dir is None:
+        return compute(*args, **kwargs)
+
+    fn = get_store_fn(store_dir, name, key)
+    if not isfile(f"{fn}.npy"):
+        makedirs(store_dir, exist_ok=True)
+        write_time_series(fn, compute(*args, **kwargs))
+    else:
+        logger.info(f"Reading {name} time series from {fn}.")
+
+    return read_time_series(fn)
+
+
+def get_snapshots_key(snapshots: pd.DatetimeIndex) -> Tuple:
+    """Return a key identifying snapshots (see stored_time_series)."""
+    return str(snapshots[0]), str(snapshots[-1]), len(snapshots)
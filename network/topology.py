@@ -0,0 +1,107 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import pypsa
+
+from network.instrumentation import traced
+
+import logging
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@traced
+def remove_empty_buses(net: pypsa.Network, buses_ids: List[str] = None,
+                       remove_branches: bool = True) -> pypsa.Network:
+    """
+    Remove buses to which no generator, load or storage is attached.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    buses_ids: List[str] (default: None)
+        Subset of buses which can be removed. If None, all buses are considered.
+    remove_branches: bool (default: True)
+        Whether to also remove the lines and links connected to the empty buses.
+        If False, only empty buses which are not connected to any branch are removed.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+
+    Notes
+    -----
+    Each component type is removed in one go (i.e. one call to mremove per component type).
+    """
+
+    buses = net.buses.index if buses_ids is None else pd.Index(buses_ids)
+
+    # Buses to which at least one one-port component (generator, load, storage, ...) is attached
+    used_buses = set()
+    for c in net.iterate_components(net.one_port_components):
+        used_buses.update(c.df.bus.unique())
+    empty_buses = buses[~buses.isin(used_buses)]
+
+    # Branches connected to at least one of the empty buses
+    branches_to_remove = {}
+    for c in net.iterate_components(net.branch_components):
+        connected = c.df.bus0.isin(empty_buses) | c.df.bus1.isin(empty_buses)
+        if connected.any():
+            branches_to_remove[c.name] = c.df.index[connected]
+
+    if not remove_branches:
+        connected_buses = set()
+        for c_name, branches in branches_to_remove.items():
+            df = net.df(c_name).loc[branches]
+            connected_buses.update(df.bus0)
+            connected_buses.update(df.bus1)
+        empty_buses = empty_buses[~empty_buses.isin(connected_buses)]
+        branches_to_remove = {}
+
+    logger.info(f"Removing {len(empty_buses)} empty buses and "
+                f"{sum(len(b) for b in branches_to_remove.values())} connected branches.")
+
+    for c_name, branches in branches_to_remove.items():
+        net.mremove(c_name, branches)
+    net.mremove("Bus", empty_buses)
+
+    return net
+
+
+def get_incidence_matrix(buses: pd.Index, branches: pd.DataFrame) -> sparse.coo_matrix:
+    """
+    Return the signed bus x branch incidence matrix of a set of branches.
+
+    The entry of a branch is +1 at its end bus ('bus1') and -1 at its start bus ('bus0'), so that
+    multiplying the matrix by the flows of the branches gives the net imports of each bus.
+
+    Parameters
+    ----------
+    buses: pd.Index
+        Buses (rows of the matrix).
+    branches: pd.DataFrame
+        Branches (columns of the matrix) with 'bus0' and 'bus1' attributes.
+        Branch ends which are not in buses are ignored.
+
+    Returns
+    -------
+    sparse.coo_matrix
+        Incidence matrix of shape (len(buses), len(branches)).
+    """
+
+    bus_ids = pd.Series(np.arange(len(buses)), index=buses)
+    branch_ids = np.arange(len(branches))
+    rows, cols, data = [], [], []
+    for attr, sign in [("bus1", 1), ("bus0", -1)]:
+        connected = branches[attr].isin(buses).values
+        rows += [bus_ids[branches[attr][connected]].values]
+        cols += [branch_ids[connected]]
+        data += [np.full(connected.sum(), sign)]
+
+    return sparse.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(len(buses), len(branches)))
@@ -0,0 +1,213 @@
+from typing import Callable, Dict, Iterator, List, Tuple
+from os import makedirs
+
+import pandas as pd
+
+import pypsa
+
+from network.clones import get_network_shell
+from network.instrumentation import traced
+from network.time_series_store import stored_time_series, get_snapshots_key
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Function returning the weather-dependent time series of a network at other time stamps,
+# indexed by (component list name, attribute)
+TimeSeriesGetter = Callable[[pypsa.Network, pd.DatetimeIndex], Dict[Tuple[str, str], pd.DataFrame]]
+
+
+def move_snapshots_to_year(snapshots: pd.DatetimeIndex, year: int) -> pd.Series:
+    """
+    Move snapshots to another year.
+
+    The first snapshot is moved to the given year and the following ones by the same number of years.
+    February 29th is dropped if it does not exist in the new year.
+
+    Parameters
+    ----------
+    snapshots: pd.DatetimeIndex
+        Snapshots of the base network.
+    year: int
+        Year of the first new snapshot.
+
+    Returns
+    -------
+    pd.Series
+        New snapshot of each base snapshot which exists in the new year, indexed by the base snapshots.
+    """
+    offset = year - snapshots[0].year
+    new_years = snapshots.year + offset
+    leap = (new_years % 4 == 0) & ((new_years % 100 != 0) | (new_years % 400 == 0))
+    kept = ~((snapshots.month == 2) & (snapshots.day == 29)) | leap
+    moved = [ts.replace(year=ts.year + offset) for ts in snapshots[kept]]
+    return pd.Series(pd.DatetimeIndex(moved), index=snapshots[kept])
+
+
+def get_weather_time_series(net: pypsa.Network, snapshots: pd.DatetimeIndex) \
+        -> Dict[Tuple[str, str], pd.DataFrame]:
+    """
+    Compute the weather-dependent time series of a network built on a one-node-per-country topology.
+
+    Loads are recomputed for loads named 'Load <bus>' (as in the projects), the availability of generators
+    added by network.components.res.add_generators_per_bus and of run-of-river generators, and the inflows
+    of reservoirs.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance with buses associated to countries.
+    snapshots: pd.DatetimeIndex
+        Time stamps at which time series are computed.
+
+    Returns
+    -------
+    Dict[Tuple[str, str], pd.DataFrame]
+        Time series, indexed by (component list name, attribute).
+    """
+
+    from iepy.load import get_load
+    from network.components.res import get_cap_factors_per_bus
+    from network.components.hydro import get_hydro_inflows_per_bus
+
+    loads = net.loads[net.loads.index == "Load " + net.loads.bus]
+    load_countries = net.buses.country[loads.bus]
+    countries = list(load_countries.unique())
+    load = stored_time_series("load", (tuple(countries), ) + get_snapshots_key(snapshots), get_load,
+                              timestamps=snapshots, countries=countries, missing_data='interpolate')
+
+    ror_p_max_pu, sto_inflow = get_hydro_inflows_per_bus(net, snapshots)
+    p_max_pu = pd.concat([get_cap_factors_per_bus(net, snapshots), ror_p_max_pu], axis=1)
+    missing = net.generators_t.p_max_pu.columns.difference(p_max_pu.columns)
+    if len(missing) != 0:
+        logger.warning(f"Availability of {len(missing)} generators is not recomputed and is the one of the base year.")
+
+    return {("loads", "p_set"): pd.DataFrame(load[load_countries].values, index=snapshots, columns=loads.index),
+            ("generators", "p_max_pu"): p_max_pu,
+            ("storage_units", "inflow"): sto_inflow}
+
+
+def get_weather_year_network(net: pypsa.Network, snapshots: pd.Series,
+                             time_series: Dict[Tuple[str, str], pd.DataFrame],
+                             deep: bool = False) -> pypsa.Network:
+    """
+    Return a network with the static data of a base network and the time series of another weather year.
+
+    Static data (components and their attributes) is shared with the base network without copying it,
+    unless deep is True. Results of lopf are written to new columns, but attributes of the returned network
+    must not be modified in place (e.g. with .loc) without a deep copy, as it would modify the base network.
+    Time series which are not given are taken from the base network.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        Base network.
+    snapshots: pd.Series
+        New snapshot of each base snapshot (see move_snapshots_to_year).
+    time_series: Dict[Tuple[str, str], pd.DataFrame]
+        Time series of the new year, indexed by (component list name, attribute). Columns which are not given
+        are taken from the base network.
+    deep: bool (default: False)
+        Whether to copy the static data and time series of the base network.
+
+    Returns
+    -------
+    pypsa.Network
+        Network of the new year.
+    """
+
+    year_net = get_network_shell(net)
+    for c in net.all_components:
+        setattr(year_net, net.components[c]["list_name"], net.df(c).copy(deep=deep))
+
+    new_snapshots = pd.DatetimeIndex(snapshots.values)
+    year_net.set_snapshots(new_snapshots)
+    year_net.snapshot_weightings = pd.Series(net.snapshot_weightings[snapshots.index].values, index=new_snapshots)
+    positions = net.snapshots.get_indexer(snapshots.index)
+    all_positions = len(positions) == len(net.snapshots)
+    for c in net.iterate_components():
+        pnl = getattr(year_net, c.list_name + "_t")
+        for attr, df in c.pnl.items():
+            # Results of the base network are not kept
+            if len(df.columns) == 0 or c.attrs.at[attr, "status"].startswith("Output"):
+                continue
+            # Base time series are shared without copy when all snapshots exist in the new year
+            values = df.values if all_positions and not deep else df.values[positions]
+            df = pd.DataFrame(values, index=new_snapshots, columns=df.columns)
+            if (c.list_name, attr) in time_series:
+                new_df = time_series[(c.list_name, attr)].reindex(new_snapshots)
+                df = pd.concat([df.drop(columns=new_df.columns.intersection(df.columns)), new_df], axis=1)
+                df = df.reindex(columns=c.pnl[attr].columns)
+            pnl[attr] = df
+
+    return year_net
+
+
+def build_weather_year_networks(net: pypsa.Network, years: List[int],
+                                time_series_getter: TimeSeriesGetter = get_weather_time_series,
+                                deep: bool = False) -> Iterator[Tuple[int, pypsa.Network]]:
+    """
+    Build the networks of several weather years from a network built for a base year.
+
+    Topology, potentials and legacy capacities are only computed once, when building the base network.
+    For each year, only the weather-dependent time series (loads, capacity factors and inflows) are computed.
+    Networks are built one after the other, so that only one of them is in memory at a time.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        Base network, at hourly resolution.
+    years: List[int]
+        Weather years.
+    time_series_getter: TimeSeriesGetter (default: get_weather_time_series)
+        Function computing the weather-dependent time series of the network at other time stamps.
+    deep: bool (default: False)
+        Whether to copy the static data and time series of the base network in each network.
+
+    Returns
+    -------
+    Iterator[Tuple[int, pypsa.Network]]
+        Year and network of each year.
+    """
+    for year in years:
+        snapshots = move_snapshots_to_year(net.snapshots, year)
+        logger.info(f"Building network of weather year {year}.")
+        time_series = time_series_getter(net, pd.DatetimeIndex(snapshots.values))
+        yield year, get_weather_year_network(net, snapshots, time_series, deep)
+
+
+@traced
+def export_weather_year_networks(net: pypsa.Network, years: List[int], output_dir: str,
+                                 time_series_getter: TimeSeriesGetter = get_weather_time_series,
+                                 transform: Callable[[pypsa.Network], pypsa.Network] = None) -> List[str]:
+    """
+    Build and export the networks of several weather years from a network built for a base year.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        Base network, at hourly resolution.
+    years: List[int]
+        Weather years.
+    output_dir: str
+        Directory in which the network of each year is exported, in a sub-directory named after the year.
+    time_series_getter: TimeSeriesGetter (default: get_weather_time_series)
+        Function computing the weather-dependent time series of the network at other time stamps.
+    transform: Callable[[pypsa.Network], pypsa.Network] (default: None)
+        Function applied to each network before it is exported (e.g. resampling).
+
+    Returns
+    -------
+    List[str]
+        Directory of each network.
+    """
+    directories = []
+    for year, year_net in build_weather_year_networks(net, years, time_series_getter):
+        if transform is not None:
+            year_net = transform(year_net)
+        directory = f"{output_dir}{year}/"
+        makedirs(directory, exist_ok=True)
+        year_net.export_to_csv_folder(directory)
+        directories += [directory]
+    return directories
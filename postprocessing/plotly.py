@@ -5,7 +5,6 @@ from typing import List
 import numpy as np
 import pandas as pd
 
-from geojson import Polygon, FeatureCollection, MultiPolygon, Feature
 from shapely.ops import cascaded_union
 from shapely.geometry import Polygon as sPolygon, Point
 import shapely.wkt
@@ -14,9 +13,6 @@ import plotly.graph_objs as go
 
 from pypsa import Network
 
-from iepy.geographics import get_shapes
-from iepy.generation.vres.potentials.enspreso import get_capacity_potential_for_regions
-
 
 def get_map_layout(title: str, map_coords: List[float] = None, showcountries=True):
 
@@ -435,6 +431,9 @@ class SizingPlotly:
 
     def show_bus_marginal_price_choropleth(self, case):
 
+        # Only imported when needed to keep this module fast to import
+        from geojson import Polygon, FeatureCollection, MultiPolygon, Feature
+
         # buses_onshore_index = self.net.buses.index
         buses_onshore_index = self.net.buses[self.net.buses.onshore].index
 
@@ -494,6 +493,11 @@ class SizingPlotly:
 
     def get_map_divided_by_region(self, regions_dict, strategy='siting'):
 
+        # Only imported when needed to keep this module fast to import
+        from geojson import Polygon, FeatureCollection, MultiPolygon, Feature
+        from iepy.geographics import get_shapes
+        from iepy.generation.vres.potentials.enspreso import get_capacity_potential_for_regions
+
         all_xs = self.net.buses.x.values
         all_ys = self.net.buses.y.values
 
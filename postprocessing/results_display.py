@@ -1,5 +1,4 @@
 from postprocessing.utils import *
-from iepy.technologies import get_costs
 
 
 def display_generation(net: pypsa.Network):
@@ -31,6 +30,9 @@ def display_generation(net: pypsa.Network):
 def display_transmission(net: pypsa.Network):
     """Display information about transmission"""
 
+    # Only imported when needed to keep this module fast to import
+    from iepy.technologies import get_costs
+
     print('\n\n\n# --- TRANSMISSION --- #')
 
     if len(net.links.index) != 0:
@@ -24,6 +24,7 @@ if __name__ == "__main__":
     data_dir = f"{data_path}"
     tech_dir = f"{data_path}technologies/"
     output_dir = join(dirname(abspath(__file__)), f"../../output/e-highways/{strftime('%Y%m%d_%H%M%S')}/")
+    start_tracing(output_dir)
 
     # Run config
     config_fn = join(dirname(abspath(__file__)), 'config.yaml')
@@ -42,7 +43,8 @@ if __name__ == "__main__":
     # Time
     timeslice = config['time']['slice']
     time_resolution = config['time']['resolution']
-    timestamps = pd.date_range(timeslice[0], timeslice[1], freq=f"{time_resolution}H")
+    # Time series are computed at hourly resolution and averaged to the time resolution once the network is built
+    timestamps = pd.date_range(timeslice[0], timeslice[1], freq="1H")
 
     # Building network
     # Add location to Generators and StorageUnits
@@ -99,7 +101,8 @@ if __name__ == "__main__":
 
             if strategy == "bus":
                 # converters = {tech: tech_config[tech]["converter"] for tech in technologies}
-                net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"])
+                net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"],
+                                      max_workers=config["res"]["build_workers"])
             elif strategy == "no_siting":
                 net = add_res_in_grid_cells(net, technologies,
                                             config["region"], config["res"]["spatial_resolution"],
@@ -112,13 +115,7 @@ if __name__ == "__main__":
             #    net = add_generators_at_bus_test(net, config['res'], tech_config, config["region"], output_dir)
 
     # Remove offshore locations that have no RES generators associated to them
-    for bus_id in net.buses.dropna(subset=["offshore_region"]).index:
-        if len(net.generators[net.generators.bus == bus_id]) == 0:
-            # Remove the bus
-            net.remove("Bus", bus_id)
-            # Remove the lines associated to the bus
-            # !!!!! Change to links for transportation model -> turn back to line when needed
-            net.mremove("Link", net.links[net.links.bus0 == bus_id].index)
+    net = remove_empty_buses(net, net.buses.dropna(subset=["offshore_region"]).index)
 
     # Add conventional gen
     if config["dispatch"]["include"]:
@@ -141,16 +138,21 @@ if __name__ == "__main__":
     if config["battery"]["include"]:
         net = add_batteries(net, config["battery"]["type"])
 
+    # Average time series over time steps of the required resolution
+    net = resample_network(net, f"{time_resolution}H")
+
     co2_reference_kt = \
         get_reference_emission_levels_for_region(config["region"], config["co2_emissions"]["reference_year"])
-    co2_budget = co2_reference_kt*(1-config["co2_emissions"]["mitigation_factor"])*len(net.snapshots)/NHoursPerYear
+    co2_budget = co2_reference_kt*(1-config["co2_emissions"]["mitigation_factor"]) \
+        * net.snapshot_weightings.sum()/NHoursPerYear
     net.add("GlobalConstraint", "CO2Limit", carrier_attribute="co2_emissions", sense="<=", constant=co2_budget)
 
     # Compute and save results
     if not isdir(output_dir):
         makedirs(output_dir)
-    net.lopf(solver_name=config["solver"], solver_logfile=f"{output_dir}test.log",
-             solver_options=config["solver_options"][config["solver"]], pyomo=True)
+    with trace_stage("lopf", net):
+        net.lopf(solver_name=config["solver"], solver_logfile=f"{output_dir}test.log",
+                 solver_options=config["solver_options"][config["solver"]], pyomo=True)
 
     # if True:
     #     from pyomo.opt import ProblemFormat
@@ -170,4 +172,6 @@ if __name__ == "__main__":
     display_generation(net)
     display_transmission(net)
     display_storage(net)
-    display_co2(net)
\ No newline at end of file
+    display_co2(net)
+
+    stop_tracing()
@@ -58,7 +58,8 @@ def optimal_solve(main_output_dir, config):
     # Time
     timeslice = config['time']['slice']
     time_resolution = config['time']['resolution']
-    timestamps = pd.date_range(timeslice[0], timeslice[1], freq=f"{time_resolution}H")
+    # Time series are computed at hourly resolution and averaged to the time resolution once the network is built
+    timestamps = pd.date_range(timeslice[0], timeslice[1], freq="1H")
 
     # Building network
     # Add location to Generators and StorageUnits
@@ -97,7 +98,8 @@ def optimal_solve(main_output_dir, config):
     # Adding pv and wind generators
     if config['res']['include']:
         technologies = config['res']['techs']
-        net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"])
+        net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"],
+                              max_workers=config["res"]["build_workers"])
 
     # Add conventional gen
     if config["dispatch"]["include"]:
@@ -120,15 +122,19 @@ def optimal_solve(main_output_dir, config):
     if config["battery"]["include"]:
         net = add_batteries(net, config["battery"]["type"], fixed_duration=True)
 
+    # Average time series over time steps of the required resolution
+    net = resample_network(net, f"{time_resolution}H")
+
     config["solver_options"]['Crossover'] = 1
     net.config = config
     # Force to get the optimal solution
-    net.lopf(solver_name=config["solver"],
-             solver_logfile=f"{output_dir}solver.log",
-             solver_options=config["solver_options"],
-             extra_functionality=add_extra_functionalities,
-             keep_references=True,
-             pyomo=False)
+    with trace_stage("lopf", net):
+        net.lopf(solver_name=config["solver"],
+                 solver_logfile=f"{output_dir}solver.log",
+                 solver_options=config["solver_options"],
+                 extra_functionality=add_extra_functionalities,
+                 keep_references=True,
+                 pyomo=False)
 
     net.export_to_csv_folder(output_dir)
 
@@ -7,6 +7,7 @@ import pandas as pd
 
 from projects.epsilon_optimality.base import optimal_solve
 from projects.epsilon_optimality.mga import find_links_invariant
+from network.instrumentation import start_tracing, stop_tracing
 
 import logging
 logging.basicConfig(level=logging.INFO, format=f"%(levelname)s %(name) %(asctime)s - %(message)s")
@@ -23,6 +24,7 @@ if __name__ == '__main__':
     print(arguments)
     dir_name = arguments['dir_name'] if arguments['dir_name'] is not None else strftime('%Y%m%d_%H%M%S')
     output_dir = join(dirname(abspath(__file__)), f"../../output/epsilon_optimality/{dir_name}/")
+    start_tracing(output_dir)
     # Run config
     config_fn = join(dirname(abspath(__file__)), 'config.yaml')
     config = yaml.load(open(config_fn, 'r'), Loader=yaml.FullLoader)
@@ -55,3 +57,5 @@ if __name__ == '__main__':
             print(bus)
             find_links_invariant(optimal_net_dir, config, output_dir, epsilons,
                                  adjacent_links, bus)
+
+    stop_tracing()
@@ -4,6 +4,7 @@ import yaml
 
 from projects.mga.base import base_solve
 from projects.mga.mga import mga_solve
+from network.instrumentation import start_tracing, stop_tracing
 
 import logging
 logging.basicConfig(level=logging.INFO, format=f"%(levelname)s %(name) %(asctime)s - %(message)s")
@@ -14,6 +15,7 @@ if __name__ == '__main__':
 
     # Main directories
     output_dir = join(dirname(abspath(__file__)), f"../../output/mga/{strftime('%Y%m%d_%H%M%S')}/")
+    start_tracing(output_dir)
     # Run config
     config_fn = join(dirname(abspath(__file__)), 'config.yaml')
     config = yaml.load(open(config_fn, 'r'), Loader=yaml.FullLoader)
@@ -24,3 +26,4 @@ if __name__ == '__main__':
     # Solve network again with new constraints and objective
     mga_solve(base_net_dir, config, output_dir, config['epsilons'])
 
+    stop_tracing()
@@ -1,6 +1,7 @@
 from os.path import isdir
 from os import makedirs
 
+import numpy as np
 import pandas as pd
 import pypsa
 
@@ -8,6 +9,9 @@ from pypsa.linopt import get_var, linexpr, define_constraints, write_objective
 
 from iepy.technologies import get_costs
 
+from network.clones import get_base_network_clone
+from network.instrumentation import trace_stage
+
 
 def add_mga_constraint(net: pypsa.Network, epsilon):
 
@@ -17,10 +21,11 @@ def add_mga_constraint(net: pypsa.Network, epsilon):
     gens = net.generators.loc[gen_p_nom.index]
     gen_capex_expr = linexpr((gens.capital_cost, gen_p_nom)).sum()
     gen_exist_cap_cost = (gens.p_nom * gens.capital_cost).sum()
-    # Marginal cost
+    # Marginal cost (weighted by the snapshot weightings as in the objective)
+    weightings = net.snapshot_weightings[net.snapshots]
     gen_p = get_var(net, 'Generator', 'p')
     gens = net.generators.loc[gen_p.columns]
-    gen_opex_expr = linexpr((gens.marginal_cost, gen_p)).sum().sum()
+    gen_opex_expr = linexpr((np.outer(weightings, gens.marginal_cost), gen_p)).sum().sum()
     gen_cost_expr = gen_capex_expr + gen_opex_expr
 
     # Add storage cost
@@ -32,7 +37,7 @@ def add_mga_constraint(net: pypsa.Network, epsilon):
     # Marginal cost
     su_p_dispatch = get_var(net, 'StorageUnit', 'p_dispatch')
     sus = net.storage_units.loc[su_p_dispatch.columns]
-    su_opex_expr = linexpr((sus.marginal_cost, su_p_dispatch)).sum().sum()
+    su_opex_expr = linexpr((np.outer(weightings, sus.marginal_cost), su_p_dispatch)).sum().sum()
     su_cost_expr = su_capex_expr + su_opex_expr
 
     # Add transmission cost
@@ -85,15 +90,16 @@ def mga_solve(base_net_dir, config, main_output_dir, epsilons):
         if not isdir(output_dir):
             makedirs(output_dir)
 
-        net = pypsa.Network()
-        net.import_from_csv_folder(base_net_dir)
+        # The base network is only imported once
+        net = get_base_network_clone(base_net_dir)
         net.epsilon = epsilon
-        net.lopf(solver_name=config["solver"],
-                 solver_logfile=f"{output_dir}solver.log",
-                 solver_options=config["solver_options"],
-                 extra_functionality=min_transmission,
-                 skip_objective=True,
-                 pyomo=False)
+        with trace_stage("lopf", net):
+            net.lopf(solver_name=config["solver"],
+                     solver_logfile=f"{output_dir}solver.log",
+                     solver_options=config["solver_options"],
+                     extra_functionality=min_transmission,
+                     skip_objective=True,
+                     pyomo=False)
 
         net.export_to_csv_folder(output_dir)
 
@@ -103,13 +109,14 @@ def mga_solve(base_net_dir, config, main_output_dir, epsilons):
         if not isdir(output_dir):
             makedirs(output_dir)
 
-        net = pypsa.Network()
-        net.import_from_csv_folder(base_net_dir)
+        # The base network is only imported once
+        net = get_base_network_clone(base_net_dir)
         net.epsilon = epsilon
-        net.lopf(solver_name=config["solver"],
-                 solver_logfile=f"{output_dir}solver.log",
-                 solver_options=config["solver_options"],
-                 extra_functionality=max_transmission,
-                 skip_objective=True,
-                 pyomo=False)
+        with trace_stage("lopf", net):
+            net.lopf(solver_name=config["solver"],
+                     solver_logfile=f"{output_dir}solver.log",
+                     solver_options=config["solver_options"],
+                     extra_functionality=max_transmission,
+                     skip_objective=True,
+                     pyomo=False)
         net.export_to_csv_folder(output_dir)
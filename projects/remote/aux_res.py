@@ -1,3 +1,10 @@
+from typing import List, Tuple, Callable
+from concurrent.futures import ProcessPoolExecutor
+from os import makedirs, replace, getpid
+from os.path import join, isfile
+from hashlib import sha1
+import pickle
+
 from resite.resite import Resite
 
 import numpy as np
@@ -12,8 +19,101 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def build_remote_resite(countries: List[str], technologies: List[str], timeslice: List[str],
+                        spatial_res: float, regions_shapes: pd.DataFrame) -> Resite:
+    """Build the data of a Resite instance for a region outside Europe (run in a worker process)."""
+    r_remote = Resite(countries, technologies, timeslice, spatial_res)
+    # TODO: set add load to True for IS?
+    r_remote.build_data(False, compute_load=False, regions_shapes=regions_shapes)
+    return r_remote
+
+
+def build_eu_resite(countries: List[str], technologies: List[str], timeslice: List[str], spatial_res: float,
+                    min_cap_if_sel: float, use_ex_cap: bool, min_cap_pot: List[float],
+                    regions_shapes: pd.DataFrame) -> Resite:
+    """Build the data of a Resite instance for European countries."""
+    r_europe = Resite(countries, technologies, timeslice, spatial_res, min_cap_if_sel)
+    r_europe.build_data(use_ex_cap, min_cap_pot, regions_shapes=regions_shapes)
+    return r_europe
+
+
+def cached_build(build_func: Callable, cache_dir: str, key: Tuple, *args) -> Resite:
+    """
+    Build the data of a Resite instance, reusing the instance built by a previous run with the same inputs.
+
+    Parameters
+    ----------
+    build_func: Callable
+        Function building the Resite instance.
+    cache_dir: str
+        Directory where built instances are cached. If None, the instance is always built.
+    key: Tuple
+        Inputs identifying the instance (must have a deterministic string representation).
+    args:
+        Arguments of build_func.
+
+    Returns
+    -------
+    Resite
+        Resite instance with its data built.
+    """
+
+    if cache_dir is None:
+        return build_func(*args)
+
+    cache_fn = join(cache_dir, f"{build_func.__name__}_{sha1(repr(key).encode()).hexdigest()}.p")
+    if isfile(cache_fn):
+        logger.info(f"Loading {build_func.__name__} data from {cache_fn}.")
+        return pickle.load(open(cache_fn, 'rb'))
+
+    resite = build_func(*args)
+    # Write to a temporary file first so that concurrent runs never read a partially written instance
+    makedirs(cache_dir, exist_ok=True)
+    tmp_fn = f"{cache_fn}.{getpid()}.tmp"
+    pickle.dump(resite, open(tmp_fn, 'wb'))
+    replace(tmp_fn, cache_fn)
+
+    return resite
+
+
+def merge_resites(resite: Resite, other_resites: List[Resite]) -> Resite:
+    """
+    Add the sites and data of a series of Resite instances to a given Resite instance.
+
+    Each field is concatenated only once over all instances.
+
+    Parameters
+    ----------
+    resite: Resite
+        Resite instance to which the other instances are added.
+    other_resites: List[Resite]
+        Resite instances whose data must be added.
+
+    Returns
+    -------
+    resite: Resite
+        Updated Resite instance.
+    """
+
+    if len(other_resites) == 0:
+        return resite
+
+    all_resites = [resite] + other_resites
+
+    resite.regions = [region for r in all_resites for region in r.regions]
+    resite.technologies = list(set().union(*[r.technologies for r in all_resites]))
+    resite.min_cap_pot_dict = {tech: min_cap for r in all_resites for tech, min_cap in r.min_cap_pot_dict.items()}
+    resite.tech_points_tuples = np.concatenate([r.tech_points_tuples for r in all_resites])
+    resite.initial_sites_ds = pd.concat([r.initial_sites_ds for r in all_resites])
+    resite.tech_points_regions_ds = pd.concat([r.tech_points_regions_ds for r in all_resites])
+    for key, axis in [("load", 1), ("cap_potential_ds", 0), ("existing_cap_ds", 0), ("cap_factor_df", 1)]:
+        resite.data_dict[key] = pd.concat([r.data_dict[key] for r in all_resites], axis=axis)
+
+    return resite
+
+
 def add_res_at_sites(net, config, output_dir, eu_countries, ):
-    
+
     eu_technologies = config['res']['techs']
 
     logger.info(f"Adding RES {eu_technologies} generation.")
@@ -22,46 +122,47 @@ def add_res_at_sites(net, config, output_dir, eu_countries, ):
     use_ex_cap = config["res"]["use_ex_cap"]
     min_cap_pot = config["res"]["min_cap_pot"]
     min_cap_if_sel = config["res"]["min_cap_if_selected"]
+    timeslice = [net.snapshots[0], net.snapshots[-1]]
+    # Built data only depends on the following inputs (shapes are derived from the countries)
+    cache_dir = config.get("build_cache", None)
+    key = (spatial_res, str(timeslice[0]), str(timeslice[1]))
 
-    # Build sites for EU
-    r_europe = Resite(eu_countries, eu_technologies, [net.snapshots[0], net.snapshots[-1]], spatial_res, min_cap_if_sel)
-    regions_shapes = net.buses.loc[eu_countries, ["onshore_region", 'offshore_region']]
-    regions_shapes.columns = ['onshore', 'offshore']
-    r_europe.build_data(use_ex_cap, min_cap_pot, regions_shapes=regions_shapes)
-    net.cc_ds = r_europe.data_dict["capacity_credit_ds"]
-    
-    # Build sites for other regions
+    # Start building sites for other regions in worker processes
     non_eu_res = config["non_eu"]
-    all_remote_countries = []
+    remote_futures = []
+    executor = None
     if non_eu_res is not None:
+        executor = ProcessPoolExecutor(max_workers=config["res"].get("remote_build_workers", None))
         for region in non_eu_res.keys():
             if region in ["na", "me"]:
                 remote_countries = get_subregions(region)
             else:
                 remote_countries = [region]
-            all_remote_countries += remote_countries
-            remote_techs = non_eu_res[region]
-            r_remote = Resite(remote_countries, remote_techs, [net.snapshots[0], net.snapshots[-1]], spatial_res)
-            # TODO: set add load to True for IS?
             regions_shapes = net.buses.loc[remote_countries, ["onshore_region", 'offshore_region']]
             regions_shapes.columns = ['onshore', 'offshore']
-            r_remote.build_data(False, compute_load=False, regions_shapes=regions_shapes)
-
-            # Add sites to European ones
-            r_europe.regions += r_remote.regions
-            r_europe.technologies = list(set(r_europe.technologies).union(r_remote.technologies))
-            r_europe.min_cap_pot_dict = {**r_europe.min_cap_pot_dict, **r_remote.min_cap_pot_dict}
-            r_europe.tech_points_tuples = np.concatenate((r_europe.tech_points_tuples, r_remote.tech_points_tuples))
-            r_europe.initial_sites_ds = r_europe.initial_sites_ds.append(r_remote.initial_sites_ds)
-            r_europe.tech_points_regions_ds = \
-                r_europe.tech_points_regions_ds.append(r_remote.tech_points_regions_ds)
-            r_europe.data_dict["load"] = pd.concat([r_europe.data_dict["load"], r_remote.data_dict["load"]], axis=1)
-            r_europe.data_dict["cap_potential_ds"] = \
-                r_europe.data_dict["cap_potential_ds"].append(r_remote.data_dict["cap_potential_ds"])
-            r_europe.data_dict["existing_cap_ds"] = \
-                r_europe.data_dict["existing_cap_ds"].append(r_remote.data_dict["existing_cap_ds"])
-            r_europe.data_dict["cap_factor_df"] = \
-                pd.concat([r_europe.data_dict["cap_factor_df"], r_remote.data_dict["cap_factor_df"]], axis=1)
+            remote_key = key + (tuple(remote_countries), tuple(non_eu_res[region]))
+            remote_futures += [executor.submit(cached_build, build_remote_resite, cache_dir, remote_key,
+                                               remote_countries, non_eu_res[region], timeslice, spatial_res,
+                                               regions_shapes)]
+
+    try:
+        # Build sites for EU
+        regions_shapes = net.buses.loc[eu_countries, ["onshore_region", 'offshore_region']]
+        regions_shapes.columns = ['onshore', 'offshore']
+        eu_key = key + (tuple(eu_countries), tuple(eu_technologies), min_cap_if_sel, use_ex_cap, tuple(min_cap_pot))
+        r_europe = cached_build(build_eu_resite, cache_dir, eu_key, eu_countries, eu_technologies, timeslice,
+                                spatial_res, min_cap_if_sel, use_ex_cap, min_cap_pot, regions_shapes)
+        net.cc_ds = r_europe.data_dict["capacity_credit_ds"]
+
+        # Add sites of other regions to European ones
+        r_remotes = [future.result() for future in remote_futures]
+    finally:
+        # Do not leave worker processes behind if a build failed
+        if executor is not None:
+            for future in remote_futures:
+                future.cancel()
+            executor.shutdown()
+    r_europe = merge_resites(r_europe, r_remotes)
 
     # Update dictionary
     tech_points_dict = {}
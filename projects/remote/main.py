@@ -16,6 +16,9 @@ from iepy.geographics import get_subregions
 from iepy.load import get_load
 from network import *
 from network.globals.functionalities import add_extra_functionalities as add_funcs
+from network.solvers.presolve import reduce_generators, restore_generators
+from network.solvers.pruning import pruned_lopf
+from network.time_series_store import stored_time_series, get_snapshots_key
 from projects.remote.utils import upgrade_topology
 
 from iepy import data_path
@@ -40,6 +43,10 @@ def parse_args():
     parser.add_argument('-th', '--threads', type=int, help='Number of threads', default=1)
     parser.add_argument('-lm', '--link_multiplier', type=float, help='Links extension multiplier', default=None)
     parser.add_argument('-yr', '--year', type=str, help='Year of run')
+    parser.add_argument('-mem', '--memory_budget', type=float, help='Memory budget (in GB)', default=None)
+    parser.add_argument('-o', '--output_dir', type=str, help='Output directory', default=None)
+    parser.add_argument('-bc', '--build_cache', type=str, default=None,
+                        help='Directory where built RES data is cached to be reused by runs with the same inputs')
 
     # argument must be of the format tech1:[region1, region2]/tech2:[region2, region3]
     # only on technology accepted per region for now
@@ -67,7 +74,11 @@ if __name__ == '__main__':
     # Main directories
     data_dir = f"{data_path}"
     tech_dir = f"{data_path}technologies/"
-    output_dir = join(dirname(abspath(__file__)), f"../../output/remote/{strftime('%Y%m%d_%H%M%S')}/")
+    if args["output_dir"] is not None:
+        output_dir = join(args["output_dir"], "")
+    else:
+        output_dir = join(dirname(abspath(__file__)), f"../../output/remote/{strftime('%Y%m%d_%H%M%S')}/")
+    start_tracing(output_dir, args["memory_budget"])
 
     # Run config
     config_fn = join(dirname(abspath(__file__)), 'config.yaml')
@@ -124,7 +135,8 @@ if __name__ == '__main__':
     # Time
     timeslice = config['time']['slice']
     time_resolution = config['time']['resolution']
-    timestamps = pd.date_range(timeslice[0], timeslice[1], freq=f"{time_resolution}H")
+    # Time series are computed at hourly resolution and averaged to the time resolution once the network is built
+    timestamps = pd.date_range(timeslice[0], timeslice[1], freq="1H")
 
     # Building network
     # Add location to Generators and StorageUnits
@@ -156,7 +168,8 @@ if __name__ == '__main__':
 
     # Adding load
     logger.info("Adding load.")
-    load = get_load(timestamps=timestamps, countries=eu_countries, missing_data='interpolate')
+    load = stored_time_series("load", (tuple(eu_countries), ) + get_snapshots_key(timestamps), get_load,
+                              timestamps=timestamps, countries=eu_countries, missing_data='interpolate')
     load_indexes = "Load " + pd.Index(eu_countries)
     loads = pd.DataFrame(load.values, index=net.snapshots, columns=load_indexes)
     net.madd("Load", load_indexes, bus=eu_countries, p_set=loads)
@@ -196,7 +209,8 @@ if __name__ == '__main__':
 
     # Adding pv and wind generators at bus
     if config['res']['include'] and config['res']['strategy'] == "bus":
-        net = add_res_per_bus(net, config['res']['techs'], config["res"]["use_ex_cap"])
+        net = add_res_per_bus(net, config['res']['techs'], config["res"]["use_ex_cap"],
+                              max_workers=config["res"]["build_workers"])
 
     # Adding non-European nodes
     non_eu_res = config["non_eu"]
@@ -212,7 +226,8 @@ if __name__ == '__main__':
                 net = add_batteries(net, tech_type, neigh_countries)
             if config["res"]["strategy"] == "bus":
                 res_techs = non_eu_res[region]
-                net = add_res_per_bus(net, res_techs, bus_ids=neigh_countries)
+                net = add_res_per_bus(net, res_techs, bus_ids=neigh_countries,
+                                      max_workers=config["res"]["build_workers"])
 
     # Adding pv and wind generators at sites
     if config['res']['include']:
@@ -226,24 +241,44 @@ if __name__ == '__main__':
                        (net.generators.type.str.startswith("wind_onshore")))
         net.generators.loc[gens, "capital_cost"] *= config["eu_prices_multiplier"]
 
-    # net.lopf(solver_name=config["solver"],
-    #         solver_logfile=f"{output_dir_full}solver.log",
-    #         solver_options=config["solver_options"],
-    #         extra_functionality=add_funcs,
-    #         pyomo=config["pyomo"])
-    # net.export_to_csv_folder(output_dir_full)
-
-    # techs_to_keep = ['wind_onshore_national', 'wind_offshore_national',
-    #                 'pv_utility_national', 'pv_residential_national',
-    #                 'wind_onshore_noneu', 'pv_utility_noneu']
-    # gens_to_drop = net.generators[(net.generators.type.isin(techs_to_keep)) & (net.generators.p_nom_opt < 1e-3)].index
-    # net.generators = net.generators.drop(gens_to_drop)
-
-    net.lopf(solver_name=config["solver"],
-             solver_logfile=f"{output_dir}solver.log",
-             solver_options=config["solver_options"],
-             extra_functionality=add_funcs,
-             pyomo=config["pyomo"])
+    # Average time series over time steps of the required resolution
+    net = resample_network(net, f"{time_resolution}H")
+
+    presolve = config.get("presolve")
+    if presolve is not None and presolve["include"]:
+        net, presolve_report, presolve_time_series = reduce_generators(net, presolve["tolerance"])
+        presolve_report.to_csv(f"{output_dir}presolve.csv")
+
+    decomposition = config.get("decomposition")
+    with trace_stage("lopf", net):
+        if decomposition is not None and decomposition["include"]:
+            assert not config["pyomo"], "Error: The decomposition can only be used without pyomo."
+            history = benders_lopf(net, config["solver"], config["solver_options"],
+                                   decomposition["nb_blocks"], decomposition["freq"],
+                                   extra_functionality=add_funcs,
+                                   gap_tolerance=decomposition["gap_tolerance"],
+                                   max_iterations=decomposition["max_iterations"],
+                                   nb_processes=decomposition["nb_processes"])
+            history.to_csv(f"{output_dir}decomposition.csv")
+        elif config.get("pruning") is not None and config["pruning"]["include"]:
+            # Solve a first time with loose tolerances to remove unused RES sites before the accurate solve
+            pruning = config["pruning"]
+            pruned = pruned_lopf(net, config["solver"], config["solver_options"],
+                                 pruning["loose_solver_options"], pruning["tolerance"],
+                                 pruning["reduced_cost_tolerance"], pruning["max_verifications"],
+                                 solver_logfile=f"{output_dir}solver.log",
+                                 extra_functionality=add_funcs,
+                                 pyomo=config["pyomo"])
+            pd.Series(pruned).to_csv(f"{output_dir}pruned_generators.csv", index=False, header=False)
+        else:
+            net.lopf(solver_name=config["solver"],
+                     solver_logfile=f"{output_dir}solver.log",
+                     solver_options=config["solver_options"],
+                     extra_functionality=add_funcs,
+                     pyomo=config["pyomo"])
+
+    if presolve is not None and presolve["include"]:
+        net = restore_generators(net, presolve_report, presolve_time_series)
 
     if config["pyomo"] & config['keep_lp']:
         from pyomo.opt import ProblemFormat
@@ -253,3 +288,5 @@ if __name__ == '__main__':
         net.model.write(filename=join(output_dir, 'model.mps'))
 
     net.export_to_csv_folder(output_dir)
+
+    stop_tracing()
@@ -1,148 +1,191 @@
-from typing import List
+from typing import List, Tuple
+from os import makedirs, replace, getpid, walk
+from os.path import join, dirname, abspath, isfile, getmtime
+import pickle
 
+import numpy as np
 import pandas as pd
-from shapely.geometry import Polygon
+from shapely.geometry import box
+from pyproj import Geod
 
 import matplotlib.pyplot as plt
 
-import geopy.distance
 import pypsa
 
+from iepy import data_path
 from iepy.geographics import get_shapes, get_subregions
 from iepy.topologies.core.plot import plot_topology
 from iepy.technologies import get_costs
 
+# Directory where truncated shapes are cached across runs
+shapes_cache_dir = join(dirname(abspath(__file__)), "../../output/remote/cache/")
+# Directory of the shapes data read by iepy
+shapes_data_dir = join(data_path, "geographics")
+
+# Bounding boxes (min_x, min_y, max_x, max_y) used to truncate the onshore shapes of remote regions
+remote_regions_bboxes = {"GL": (-44.6, 59.5, -42., 60.6),
+                         "na": (-14., 27.7, 40., 40.),
+                         "me": (25., 27.7, 60., 60.)}
+
+# Position (x, y) of remote nodes. Nodes set to None are placed at the centroid of their (truncated) region.
+# Nodes which are not listed have no position.
+remote_nodes_positions = {"IS": None,
+                          "GL": (-44., 60.),
+                          "DZ": (3., 36.5),  # Algeria, Alger
+                          "EG": (31., 30.),  # Egypt, Cairo
+                          "LY": (22., 32.),  # Libya
+                          "MA": (-6., 35.),  # Morocco, Rabat
+                          "TN": (10., 36.5),  # Tunisia, Tunis
+                          "TR": None,
+                          "CY": (33.21, 35.1),  # Cyprus, Nicosia
+                          "IL": (34.76, 32.09),  # Tel-Aviv, Jerusalem
+                          "JO": (35.55, 31.56),  # Jordan, Amman
+                          "SA": None,
+                          "SY": (36.64, 34.63)}  # Syria, Homs
+
+# Remote nodes which are associated to a country
+remote_nodes_with_country = ["IS"]
+
+# Remote links as (name, bus0, bus1, carrier, length (km), p_nom (GW)).
+# Carriers 'ac' and 'dc' are replaced by the carriers passed to upgrade_topology.
+# Lengths set to NaN are computed as the geodesic distance between the two buses.
+# A link is only added if both its buses are present in the network.
+remote_links = pd.DataFrame([("IS-GB", "IS", "GB", "dc", np.nan, 0.),
+                             ("GL-IS", "GL", "IS", "dc", np.nan, 0.),
+                             ("DZ-MA", "DZ", "MA", "ac", np.nan, 0.),
+                             ("DZ-TN", "DZ", "TN", "ac", np.nan, 0.),
+                             ("LY-TN", "LY", "TN", "ac", 2000., 0.),
+                             ("EG-LY", "EG", "LY", "ac", 700., 0.),
+                             ("LY-GR", "LY", "GR", "dc", 900., 0.),
+                             ("MA-ES", "MA", "ES", "dc", np.nan, 0.),
+                             ("TN-IT", "TN", "IT", "dc", 600., 0.),
+                             ("IL-JO", "IL", "JO", "ac", np.nan, 0.),
+                             ("SY-JO", "SY", "JO", "ac", np.nan, 0.),
+                             ("IL-CY", "IL", "CY", "DC", np.nan, 0.),
+                             # This links comes from nowhere
+                             ("SA-JO", "SA", "JO", "ac", np.nan, 0.),
+                             ("EG-IL", "EG", "IL", "ac", np.nan, 0.),
+                             ("SA-EG", "SA", "EG", "ac", np.nan, 0.),
+                             ("SY-TR", "SY", "TR", "ac", np.nan, 0.),
+                             ("CY-GR", "CY", "GR", "dc", 850., 0.),
+                             # From TYNDP
+                             ("TR-GR", "TR", "GR", "dc", 1173.53, 0.66),
+                             ("TR-BG", "TR", "BG", "ac", 932.16, 1.2)],
+                            columns=["name", "bus0", "bus1", "carrier", "length", "p_nom"]).set_index("name")
+
+
+def get_shapes_version() -> float:
+    """Return the last modification time of the shapes data, which identifies the version of the cached shapes."""
+    return max((getmtime(join(root, fn)) for root, _, fns in walk(shapes_data_dir) for fn in fns), default=0.)
+
+
+def get_truncated_shapes(countries: List[str], bbox: Tuple[float, float, float, float] = None) -> pd.Series:
+    """
+    Return the onshore shapes of a series of countries truncated by a bounding box.
+
+    Truncated shapes are cached on disk so that the intersections are only computed once across runs.
+    Cached shapes are computed again when the shapes data is modified (the cache can also be cleared
+    by removing output/remote/cache/truncated_shapes.p).
+
+    Parameters
+    ----------
+    countries: List[str]
+        ISO codes of countries.
+    bbox: Tuple[float, float, float, float] (default: None)
+        Bounding box (min_x, min_y, max_x, max_y). If None, shapes are not truncated.
+
+    Returns
+    -------
+    pd.Series
+        Truncated shapes indexed by country.
+    """
+
+    cache_fn = join(shapes_cache_dir, "truncated_shapes.p")
+    cache = {}
+    if isfile(cache_fn):
+        with open(cache_fn, 'rb') as f:
+            cache = pickle.load(f)
+
+    version = get_shapes_version()
+    missing_countries = [c for c in countries if (c, bbox, version) not in cache]
+    if missing_countries:
+        shapes = get_shapes(missing_countries, "onshore")["geometry"]
+        # Shapes computed from previous versions of the data are dropped
+        cache = {key: shape for key, shape in cache.items() if len(key) == 3 and key[2] == version}
+        for c in missing_countries:
+            cache[(c, bbox, version)] = shapes.loc[c] if bbox is None else shapes.loc[c].intersection(box(*bbox))
+        # Write to a temporary file first so that concurrent runs never read a partially written cache
+        makedirs(shapes_cache_dir, exist_ok=True)
+        tmp_fn = f"{cache_fn}.{getpid()}.tmp"
+        with open(tmp_fn, 'wb') as f:
+            pickle.dump(cache, f)
+        replace(tmp_fn, cache_fn)
+
+    return pd.Series([cache[(c, bbox, version)] for c in countries], index=countries)
+
 
 def upgrade_topology(net: pypsa.Network, regions: List[str], plot: bool = False,
                      ac_carrier: str = "HVAC_OHL", dc_carrier: str = "HVDC_GLIS") -> pypsa.Network:
+    """
+    Add nodes and links for regions outside of Europe.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    regions: List[str]
+        Remote regions to add. Can be 'IS', 'GL', 'na' (North Africa) and 'me' (Middle East).
+    plot: bool (default: False)
+        Whether to plot the resulting topology.
+    ac_carrier: str (default: 'HVAC_OHL')
+        Carrier of AC links.
+    dc_carrier: str (default: 'HVDC_GLIS')
+        Carrier of DC links.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    assert "GL" not in regions or "IS" in regions, \
+        "Error: Cannot add a node in Greenland without adding a node in Iceland."
+
+    # Build nodes table
+    regions_shapes = []
+    for region in regions:
+        countries = get_subregions(region) if region in ["na", "me"] else [region]
+        regions_shapes += [get_truncated_shapes(countries, remote_regions_bboxes.get(region))]
+    buses = pd.concat(regions_shapes).rename("onshore_region").to_frame()
+    positions = [remote_nodes_positions.get(c, (np.nan, np.nan)) for c in buses.index]
+    positions = [(shape.centroid.x, shape.centroid.y) if pos is None else pos
+                 for pos, shape in zip(positions, buses.onshore_region)]
+    buses["x"], buses["y"] = zip(*positions)
+    buses["country"] = buses.index.where(buses.index.isin(remote_nodes_with_country))
+    buses["offshore_region"] = np.nan
 
-    buses = pd.DataFrame(columns=["x", "y", "country", "onshore_region", "offshore_region"])
-    links = pd.DataFrame(columns=["bus0", "bus1", "carrier", "length"])
-
-    if "IS" in regions:
-        buses.loc["IS", "onshore_region"] = get_shapes(["IS"], "onshore")["geometry"][0]
-        buses.loc["IS", ["x", "y"]] = buses.loc["IS", "onshore_region"].centroid
-        buses.loc["IS", "country"] = "IS"
-        # Adding link to GB
-        links.loc["IS-GB", ["bus0", "bus1", "carrier"]] = ["IS", "GB", dc_carrier]
-
-    if "GL" in regions:
-        assert 'IS' in regions, "Error: Cannot add a node in Greenland without adding a node in Iceland."
-        full_gl_shape = get_shapes(["GL"], "onshore")["geometry"][0]
-        trunc_gl_shape = full_gl_shape.intersection(Polygon([(-44.6, 59.5), (-44.6, 60.6), (-42, 60.6), (-42, 59.5)]))
-        buses.loc["GL", "onshore_region"] = trunc_gl_shape
-        buses.loc["GL", ["x", "y"]] = (-44., 60.)
-        # buses.loc["GL", "country"] = "GL"
-        # Adding link to IS
-        links.loc["GL-IS", ["bus0", "bus1", "carrier"]] = ["GL", "IS", dc_carrier]
-
-    if "na" in regions:
-        countries = get_subregions("na")
-        shapes = get_shapes(countries, "onshore")["geometry"]
-        trunc_shape = Polygon([(-14, 27.7), (-14, 40), (40, 40), (40, 27.7)])
-        for c in countries:
-            buses.loc[c, "onshore_region"] = shapes.loc[c].intersection(trunc_shape)
-            # buses.loc[c, "country"] = c
-        buses.loc["DZ", ["x", "y"]] = (3, 36.5)  # Algeria, Alger
-        buses.loc["EG", ["x", "y"]] = (31., 30.)  # Egypt, Cairo
-        buses.loc["LY", ["x", "y"]] = (22, 32) #(13., 32.5)  # Libya, Tripoli
-        buses.loc["MA", ["x", "y"]] = (-6., 35.)  # Morocco, Rabat
-        buses.loc["TN", ["x", "y"]] = (10., 36.5)  # Tunisia, Tunis
-        # Adding links
-        links.loc["DZ-MA", ["bus0", "bus1", "carrier"]] = ["DZ", "MA", ac_carrier]
-        links.loc["DZ-TN", ["bus0", "bus1", "carrier"]] = ["DZ", "TN", ac_carrier]
-        links.loc["LY-TN", ["bus0", "bus1", "carrier", "length"]] = ["LY", "TN", ac_carrier, 2000]
-        links.loc["EG-LY", ["bus0", "bus1", "carrier", "length"]] = ["EG", "LY", ac_carrier, 700]
-        if "GR" in net.buses.index:
-            links.loc["LY-GR", ["bus0", "bus1", "carrier", "length"]] = ["LY", "GR", dc_carrier, 900]
-        if "ES" in net.buses.index:
-            links.loc["MA-ES", ["bus0", "bus1", "carrier"]] = ["MA", "ES", dc_carrier]
-        if "IT" in net.buses.index:
-            links.loc["TN-IT", ["bus0", "bus1", "carrier", "length"]] = ["TN", "IT", dc_carrier, 600]
-
-    if "me" in regions:
-        # countries = ["AE", "BH", "CY", "IL", "IQ", "IR", "JO", "KW", "LB", "OM", "QA", "SA", "SY"]  # , "YE"]
-        countries = get_subregions("me")
-        shapes = get_shapes(countries, "onshore")["geometry"]
-        trunc_shape = Polygon([(25, 27.7), (25, 60), (60, 60), (60, 27.7)])
-        for c in countries:
-            buses.loc[c, "onshore_region"] = shapes.loc[c].intersection(trunc_shape)
-            # buses.loc[c, "country"] = c
-        # buses.loc["AE", ["x", "y"]] = (54.5, 24.5)  # UAE, Abu Dhabi
-        # buses.loc["BH", ["x", "y"]] = (50.35, 26.13)  # Bahrain, Manama
-        buses.loc["TR", ["x", "y"]] = buses.loc["TR", "onshore_region"].centroid
-        buses.loc["CY", ["x", "y"]] = (33.21, 35.1)  # Cyprus, Nicosia
-        buses.loc["IL", ["x", "y"]] = (34.76, 32.09)  # Tel-Aviv, Jerusalem
-        # if 'TR' in net.buses.index:
-        #     buses.loc["IQ", ["x", "y"]] = (44.23, 33.2)  # Iraq, Baghdad
-        #     buses.loc["IR", ["x", "y"]] = (51.23, 35.41)  # Iran, Tehran
-        # else:
-        #    buses = buses.drop(["IQ", "IR"])
-        buses.loc["JO", ["x", "y"]] = (35.55, 31.56)  # Jordan, Amman
-        # buses.loc["KW", ["x", "y"]] = (47.58, 29.22)  # Kuwait, Kuwait City
-        # buses.loc["LB", ["x", "y"]] = (35.3, 33.53)  # Lebanon, Beirut
-        # buses.loc["OM", ["x", "y"]] = (58.24, 23.35)  # Oman, Muscat
-        # buses.loc["QA", ["x", "y"]] = (51.32, 25.17)  # Qatar, Doha
-        buses.loc["SA", ["x", "y"]] = buses.loc["SA", "onshore_region"].centroid #(46.43, 24.38)  # Saudi Arabia, Riyadh
-        buses.loc["SY", ["x", "y"]] = (36.64, 34.63)  # Syria, Homs
-        # buses.loc["YE", ["x", "y"]] = (44.12, 15.20)  # Yemen, Sana
-        # Adding links
-        links.loc["IL-JO", ["bus0", "bus1", "carrier"]] = ["IL", "JO", ac_carrier]
-        # links.loc["IL-LI", ["bus0", "bus1", "carrier"]] = ["IL", "LB", ac_carrier]
-        # links.loc["SY-LI", ["bus0", "bus1", "carrier"]] = ["SY", "LB", ac_carrier]
-        links.loc["SY-JO", ["bus0", "bus1", "carrier"]] = ["SY", "JO", ac_carrier]
-        links.loc["IL-CY", ["bus0", "bus1", "carrier"]] = ["IL", "CY", "DC"]
-        # This links comes from nowhere
-        links.loc["SA-JO", ["bus0", "bus1", "carrier"]] = ["SA", "JO", ac_carrier]
-        # links.loc["CY-SY", ["bus0", "bus1", "carrier"]] = ["CY", "SY", "DC"]
-        # links.loc["OM-AE", ["bus0", "bus1", "carrier"]] = ["OM", "AE", ac_carrier]
-        # links.loc["QA-AE", ["bus0", "bus1", "carrier"]] = ["QA", "AE", ac_carrier]
-        # links.loc["QA-SA", ["bus0", "bus1", "carrier"]] = ["QA", "SA", ac_carrier]
-        # links.loc["BH-QA", ["bus0", "bus1", "carrier"]] = ["BH", "QA", ac_carrier]
-        # links.loc["BH-KW", ["bus0", "bus1", "carrier"]] = ["BH", "KW", ac_carrier]
-        # links.loc["BH-SA", ["bus0", "bus1", "carrier"]] = ["BH", "SA", ac_carrier]
-        # links.loc["YE-SA", ["bus0", "bus1", "carrier"]] = ["YE", "SA", ac_carrier]
-        if "EG" in buses.index:
-            links.loc["EG-IL", ["bus0", "bus1", "carrier"]] = ["EG", "IL", ac_carrier]
-            links.loc["SA-EG", ["bus0", "bus1", "carrier"]] = ["SA", "EG", ac_carrier]
-        #if "TR" in net.buses.index:
-        links.loc["SY-TR", ["bus0", "bus1", "carrier"]] = ["SY", "TR", ac_carrier]
-            # links.loc["IQ-TR", ["bus0", "bus1", "carrier"]] = ["IQ", "TR", ac_carrier]
-            # links.loc["IR-TR", ["bus0", "bus1", "carrier"]] = ["IR", "TR", ac_carrier]
-            # links.loc["IR-IQ", ["bus0", "bus1", "carrier"]] = ["IR", "IQ", ac_carrier]
-        if "GR" in net.buses.index:
-            links.loc["CY-GR", ["bus0", "bus1", "carrier", "length"]] = ["CY", "GR", dc_carrier, 850]
-            # From TYNDP
-            links.loc["TR-GR", ["bus0", "bus1", "carrier", "length"]] = ["TR", "GR", dc_carrier, 1173.53]  # p_nom = 0.66
-        if "BG" in net.buses.index:
-            links.loc["TR-BG", ["bus0", "bus1", "carrier", "length"]] = ["TR", "BG", ac_carrier, 932.16]  # p_nom = 1.2
-
-    buses = buses.infer_objects()
     net.madd("Bus", buses.index,
              x=buses.x, y=buses.y, country=buses.country,
-             onshore_region=buses.onshore_region, offshore_region=buses.offshore_region,)
-
-    # Adding length to the lines for which we did not fix it manually
-    for idx in links[links.length.isnull()].index:
-        bus0_id = links.loc[idx]["bus0"]
-        bus1_id = links.loc[idx]["bus1"]
-        bus0_x = net.buses.loc[bus0_id]["x"]
-        bus0_y = net.buses.loc[bus0_id]["y"]
-        bus1_x = net.buses.loc[bus1_id]["x"]
-        bus1_y = net.buses.loc[bus1_id]["y"]
-        links.loc[idx, "length"] = geopy.distance.geodesic((bus0_y, bus0_x), (bus1_y, bus1_x)).km
-
-    links['capital_cost'] = pd.Series(index=links.index)
-    for idx in links.index:
-        carrier = links.loc[idx].carrier
-        cap_cost, _ = get_costs(carrier, len(net.snapshots))
-        links.loc[idx, ('capital_cost', )] = cap_cost * links.length.loc[idx]
-    net.madd("Link", links.index, bus0=links.bus0, bus1=links.bus1, carrier=links.carrier, p_nom_extendable=True,
-             length=links.length, capital_cost=links.capital_cost)
+             onshore_region=buses.onshore_region, offshore_region=buses.offshore_region)
+
+    # Build links table, keeping links between the new nodes and existing ones
+    links = remote_links[(remote_links.bus0.isin(buses.index) | remote_links.bus1.isin(buses.index))
+                         & remote_links.bus0.isin(net.buses.index) & remote_links.bus1.isin(net.buses.index)].copy()
+    links["carrier"] = links.carrier.replace({"ac": ac_carrier, "dc": dc_carrier})
 
-    # from tyndp
-    if "TR" in net.buses.index:
-        net.links.loc[["TR-BG", "TR-GR"], "p_nom"] = [1.2, 0.66]
+    # Compute the length of the links for which it was not fixed manually
+    missing = links.length.isnull()
+    bus0_xy = net.buses.loc[links.bus0[missing], ["x", "y"]].values.astype(float)
+    bus1_xy = net.buses.loc[links.bus1[missing], ["x", "y"]].values.astype(float)
+    _, _, dist_m = Geod(ellps="WGS84").inv(bus0_xy[:, 0], bus0_xy[:, 1], bus1_xy[:, 0], bus1_xy[:, 1])
+    links.loc[missing, "length"] = np.asarray(dist_m) * 1e-3
+
+    # Get costs once per carrier
+    cap_cost_per_carrier = {carrier: get_costs(carrier, len(net.snapshots))[0] for carrier in links.carrier.unique()}
+    links["capital_cost"] = links.carrier.map(cap_cost_per_carrier) * links.length
+
+    net.madd("Link", links.index, bus0=links.bus0, bus1=links.bus1, carrier=links.carrier, p_nom_extendable=True,
+             p_nom=links.p_nom, length=links.length, capital_cost=links.capital_cost)
 
     if plot:
         plot_topology(net.buses, net.links)
@@ -0,0 +1,52 @@
+from os.path import join, dirname, abspath, isfile
+from os import makedirs
+from time import strftime
+import argparse
+import yaml
+
+from projects.sweep.runner import run_sweep
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description='Command line arguments.')
+
+    parser.add_argument('-c', '--config', type=str, help='Sweep configuration file',
+                        default=join(dirname(abspath(__file__)), 'config.yaml'))
+    parser.add_argument('-r', '--resume', type=str, default=None,
+                        help='Directory of a previous sweep to resume (its configuration is reused)')
+    parser.add_argument('-s', '--submit', action='store_true',
+                        help='Only create the sweep directory, jobs being run by projects/sweep/work_queue.py workers')
+
+    parsed_args = vars(parser.parse_args())
+
+    return parsed_args
+
+
+if __name__ == '__main__':
+
+    args = parse_args()
+
+    if args["resume"] is not None:
+        sweep_dir = join(args["resume"], "")
+        config_fn = join(sweep_dir, "config.yaml")
+        assert isfile(config_fn), f"Error: No sweep configuration found in {sweep_dir}."
+        config = yaml.load(open(config_fn, 'r'), Loader=yaml.FullLoader)
+    else:
+        sweep_dir = join(dirname(abspath(__file__)), f"../../output/sweep/{strftime('%Y%m%d_%H%M%S')}/")
+        config = yaml.load(open(args["config"], 'r'), Loader=yaml.FullLoader)
+        makedirs(sweep_dir)
+        yaml.dump(config, open(f"{sweep_dir}config.yaml", 'w'), sort_keys=False)
+
+    if args["submit"]:
+        logger.info(f"Sweep created in {sweep_dir}. Start workers with: "
+                    f"python projects/sweep/work_queue.py -d {sweep_dir}")
+        exit()
+
+    logger.info(f"Running sweep in {sweep_dir}")
+    summary = run_sweep(config, sweep_dir)
+    logger.info(f"Jobs status:\n{summary['status'].value_counts().to_string()}")
@@ -0,0 +1,297 @@
+from typing import Dict, List, Any, Callable
+from os import makedirs, replace, getpid, environ, pathsep
+from os.path import join, dirname, abspath, isfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from hashlib import sha1
+from socket import gethostname
+from time import strftime, time
+import subprocess
+import json
+import sys
+
+import pandas as pd
+
+from network.time_series_store import store_dir_variable
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Root of the repository, from which the scripts of the jobs are run
+repository_dir = abspath(join(dirname(abspath(__file__)), "../../"))
+
+# Possible status of a job
+job_status = ["pending", "running", "done", "failed"]
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Return all the combinations of values of a grid of arguments.
+
+    Parameters
+    ----------
+    grid: Dict[str, List[Any]]
+        List of values of each argument.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Value of each argument for each combination.
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in product(*[grid[name] for name in names])]
+
+
+def get_job_id(params: Dict[str, Any]) -> str:
+    """Return an identifier depending only on the values of the arguments of a job."""
+    return sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def get_job_command(main_fn: str, params: Dict[str, Any], output_dir: str) -> List[str]:
+    """
+    Return the command running a script with the arguments of a job.
+
+    Parameters
+    ----------
+    main_fn: str
+        Path to the script (relative to the root of the repository).
+    params: Dict[str, Any]
+        Value of each argument. Arguments set to None are not passed.
+    output_dir: str
+        Directory where the script saves its results.
+
+    Returns
+    -------
+    List[str]
+        Command
+    """
+    command = [sys.executable, join(repository_dir, main_fn)]
+    for name, value in params.items():
+        if value is not None:
+            command += [f"--{name}", str(value)]
+    return command + ["--output_dir", output_dir]
+
+
+def get_process_id() -> str:
+    """Return an identifier of the current process which is unique across the nodes sharing a file system."""
+    return f"{gethostname()}.{getpid()}"
+
+
+def write_json(fn: str, content: Dict[str, Any]):
+    """Write a json file atomically, so that a crash or a concurrent reader never sees a partially written file."""
+    tmp_fn = f"{fn}.{get_process_id()}.tmp"
+    json.dump(content, open(tmp_fn, 'w'), indent=2)
+    replace(tmp_fn, fn)
+
+
+def read_job_status(job_dir: str) -> Dict[str, Any]:
+    """Return the status of a job saved in its directory or None if the job has never been started."""
+    status_fn = join(job_dir, "status.json")
+    return json.load(open(status_fn, 'r')) if isfile(status_fn) else None
+
+
+def write_job_status(job_dir: str, status: Dict[str, Any]):
+    """Save the status of a job in its directory."""
+    assert status["status"] in job_status, f"Error: Status must be one of {job_status}."
+    write_json(join(job_dir, "status.json"), status)
+
+
+def run_job(main_fn: str, job_dir: str, params: Dict[str, Any], timeout: float = None,
+            heartbeat: Callable[[], bool] = None, heartbeat_interval: float = 30.,
+            time_series_store: str = None) -> Dict[str, Any]:
+    """
+    Run a job in its own process, saving its status before and after the run.
+
+    Parameters
+    ----------
+    main_fn: str
+        Path to the script (relative to the root of the repository).
+    job_dir: str
+        Directory of the job, where its status, log and results are saved.
+    params: Dict[str, Any]
+        Value of each argument of the script.
+    timeout: float (default: None)
+        Maximum duration of the job (in seconds).
+    heartbeat: Callable[[], bool] (default: None)
+        Function called periodically while the job runs and once more before saving its final status.
+        If it returns False, the job is stopped and its final status is not saved.
+    heartbeat_interval: float (default: 30.)
+        Time (in seconds) between two calls to heartbeat (and between two checks of the timeout).
+    time_series_store: str (default: None)
+        Directory of the time series store shared by the jobs (see network.time_series_store).
+
+    Returns
+    -------
+    Dict[str, Any]
+        Final status of the job.
+    """
+
+    makedirs(job_dir, exist_ok=True)
+    previous_status = read_job_status(job_dir)
+    status = {"params": params,
+              "status": "running",
+              "attempts": (0 if previous_status is None else previous_status["attempts"]) + 1,
+              "start": strftime('%Y-%m-%d %H:%M:%S'),
+              "end": None,
+              "returncode": None}
+    write_job_status(job_dir, status)
+
+    command = get_job_command(main_fn, params, join(job_dir, "output", ""))
+    env = {**environ, "PYTHONPATH": pathsep.join([repository_dir] + environ.get("PYTHONPATH", "").split(pathsep))}
+    if time_series_store is not None:
+        env[store_dir_variable] = time_series_store
+    start = time()
+    with open(join(job_dir, "log.txt"), 'w') as log_file:
+        process = subprocess.Popen(command, cwd=repository_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+        while status["returncode"] is None:
+            try:
+                status["returncode"] = process.wait(timeout=heartbeat_interval)
+            except subprocess.TimeoutExpired:
+                if timeout is not None and time() - start > timeout:
+                    logger.warning(f"Job {params} timed out.")
+                elif heartbeat is not None and not heartbeat():
+                    # The job now belongs to another worker which is in charge of its status
+                    logger.warning(f"Job {params} stopped by its heartbeat.")
+                    process.kill()
+                    process.wait()
+                    return status
+                else:
+                    continue
+                process.kill()
+                process.wait()
+                break
+
+    # The job may have been taken over since the last heartbeat
+    if heartbeat is not None and not heartbeat():
+        logger.warning(f"Job {params} finished after being taken over, its status is not saved.")
+        return status
+
+    status["status"] = "done" if status["returncode"] == 0 else "failed"
+    status["end"] = strftime('%Y-%m-%d %H:%M:%S')
+    write_job_status(job_dir, status)
+    logger.info(f"Job {params} {status['status']}.")
+
+    return status
+
+
+def get_jobs(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Return the arguments of each job of a sweep indexed by job identifier."""
+    return {get_job_id(params): params for params in expand_grid(config["grid"])}
+
+
+def get_job_args(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the arguments passed to all the jobs of a sweep."""
+    build_cache = config["build_cache"]
+    if build_cache is not None:
+        build_cache = join(repository_dir, build_cache)
+    return {**config["job_args"], "build_cache": build_cache}
+
+
+def get_time_series_store(config: Dict[str, Any]) -> str:
+    """Return the absolute path of the time series store shared by the jobs of a sweep, or None if there is none."""
+    time_series_store = config.get("time_series_store")
+    return None if time_series_store is None else join(repository_dir, time_series_store, "")
+
+
+def get_build_group(config: Dict[str, Any], params: Dict[str, Any]) -> tuple:
+    """Return the values of the arguments of a job which determine the data it builds."""
+    return tuple(str(params.get(arg)) for arg in config["build_args"])
+
+
+def get_nb_workers(resources: Dict[str, float], job_args: Dict[str, Any]) -> int:
+    """
+    Return the number of jobs that can run at the same time without exceeding the resources of the sweep.
+
+    Parameters
+    ----------
+    resources: Dict[str, float]
+        Total number of 'threads' and 'memory' (in GB) available.
+    job_args: Dict[str, Any]
+        Arguments passed to all jobs, including their number of 'threads' and their 'memory_budget' (in GB).
+
+    Returns
+    -------
+    int
+        Number of jobs
+    """
+    nb_workers = []
+    for resource, arg in [("threads", "threads"), ("memory", "memory_budget")]:
+        if resources.get(resource) is not None and job_args.get(arg) is not None:
+            assert job_args[arg] <= resources[resource], \
+                f"Error: A single job needs more {resource} ({job_args[arg]}) " \
+                f"than available ({resources[resource]})."
+            nb_workers += [int(resources[resource] // job_args[arg])]
+    return min(nb_workers) if nb_workers else 1
+
+
+def run_sweep(config: Dict[str, Any], sweep_dir: str) -> pd.DataFrame:
+    """
+    Run all the jobs of a sweep which are not done yet.
+
+    Jobs already done (e.g. before a crash) are skipped. Jobs which failed or which were interrupted are run again
+    until they reach the maximum number of attempts. Jobs sharing the same values of the build arguments
+    read and write the same build cache: one job of each group is run first and the other ones afterwards,
+    so that they reuse the data it built instead of building it concurrently. Time series (loads, capacity factors
+    and inflows) computed by a job are shared with the following ones through memory-mapped files.
+
+    Parameters
+    ----------
+    config: Dict[str, Any]
+        Sweep configuration.
+    sweep_dir: str
+        Directory of the sweep, containing one sub-directory per job.
+
+    Returns
+    -------
+    pd.DataFrame
+        Status of each job.
+    """
+
+    jobs = get_jobs(config)
+    job_args = get_job_args(config)
+
+    # Select jobs to run
+    leaders, followers = [], []
+    groups_started = set()
+    for job_id, params in jobs.items():
+        group = get_build_group(config, params)
+        status = read_job_status(join(sweep_dir, job_id))
+        if status is not None and status["status"] == "done":
+            groups_started.add(group)
+            continue
+        if status is not None and status["attempts"] >= config["max_attempts"]:
+            logger.warning(f"Job {params} reached the maximum number of attempts.")
+            continue
+        if group in groups_started:
+            followers += [job_id]
+        else:
+            groups_started.add(group)
+            leaders += [job_id]
+
+    time_series_store = get_time_series_store(config)
+    nb_workers = get_nb_workers(config["resources"], job_args)
+    logger.info(f"Running {len(leaders) + len(followers)} of {len(jobs)} jobs with {nb_workers} jobs at a time.")
+
+    # Each worker thread only waits for the process running its job
+    with ThreadPoolExecutor(max_workers=nb_workers) as executor:
+        for wave in [leaders, followers]:
+            list(executor.map(lambda job_id: run_job(config["main"], join(sweep_dir, job_id),
+                                                     {**jobs[job_id], **job_args}, config.get("timeout"),
+                                                     time_series_store=time_series_store),
+                              wave))
+
+    return get_summary(sweep_dir, jobs)
+
+
+def get_summary(sweep_dir: str, jobs: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """Save and return the arguments and status of each job of a sweep."""
+    summary = pd.DataFrame({job_id: {**params, **(read_job_status(join(sweep_dir, job_id)) or {"status": "pending"})}
+                            for job_id, params in jobs.items()}).T
+    summary = summary.drop(columns="params", errors="ignore")
+    summary_fn = join(sweep_dir, "summary.csv")
+    tmp_fn = f"{summary_fn}.{get_process_id()}.tmp"
+    summary.to_csv(tmp_fn)
+    replace(tmp_fn, summary_fn)
+
+    return summary
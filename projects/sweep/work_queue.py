@@ -0,0 +1,271 @@
+from typing import Dict, List, Tuple, Any
+from os import makedirs, link, stat, remove, rename, utime
+from os.path import join, dirname, isfile
+from glob import glob
+from time import strftime, time, sleep
+import argparse
+import json
+import yaml
+
+import pandas as pd
+
+from projects.sweep.runner import get_jobs, get_job_args, get_build_group, get_process_id, run_job, \
+    read_job_status, write_json, get_summary, get_time_series_store
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(asctime)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def get_lease_fn(sweep_dir: str, job_id: str) -> str:
+    """Return the path of the lease of a job."""
+    return join(sweep_dir, "leases", job_id)
+
+
+def read_lease(sweep_dir: str, job_id: str) -> Dict[str, Any]:
+    """Return the content of the lease of a job or None if the job is not claimed."""
+    try:
+        return json.load(open(get_lease_fn(sweep_dir, job_id), 'r'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def claim_job(sweep_dir: str, job_id: str, worker_id: str) -> bool:
+    """
+    Try to claim a job by creating its lease.
+
+    The lease is created by hard-linking a temporary file, which is atomic on local file systems and on NFS,
+    so that at most one worker can claim a job.
+
+    Parameters
+    ----------
+    sweep_dir: str
+        Directory of the sweep.
+    job_id: str
+        Identifier of the job.
+    worker_id: str
+        Identifier of the worker claiming the job.
+
+    Returns
+    -------
+    bool
+        True if the job was claimed by this worker.
+    """
+    lease_fn = get_lease_fn(sweep_dir, job_id)
+    makedirs(dirname(lease_fn), exist_ok=True)
+    tmp_fn = f"{lease_fn}.{worker_id}.tmp"
+    json.dump({"worker": worker_id, "claimed": strftime('%Y-%m-%d %H:%M:%S')}, open(tmp_fn, 'w'))
+    try:
+        link(tmp_fn, lease_fn)
+    except OSError:
+        pass
+    # On NFS, link can report an error although it succeeded, so check the number of links instead
+    claimed = stat(tmp_fn).st_nlink == 2
+    remove(tmp_fn)
+    return claimed
+
+
+def renew_lease(sweep_dir: str, job_id: str, worker_id: str) -> bool:
+    """Send a heartbeat for a job by updating the modification time of its lease. Returns False if the lease was lost."""
+    lease = read_lease(sweep_dir, job_id)
+    if lease is None or lease["worker"] != worker_id:
+        return False
+    try:
+        utime(get_lease_fn(sweep_dir, job_id))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def release_lease(sweep_dir: str, job_id: str, worker_id: str):
+    """Remove the lease of a job if it is owned by a worker."""
+    lease = read_lease(sweep_dir, job_id)
+    if lease is not None and lease["worker"] == worker_id:
+        try:
+            remove(get_lease_fn(sweep_dir, job_id))
+        except FileNotFoundError:
+            pass
+
+
+def reclaim_stale_lease(sweep_dir: str, job_id: str, lease_timeout: float) -> bool:
+    """
+    Remove the lease of a job if its worker has not sent any heartbeat for a given time.
+
+    Parameters
+    ----------
+    sweep_dir: str
+        Directory of the sweep.
+    job_id: str
+        Identifier of the job.
+    lease_timeout: float
+        Time (in seconds) without heartbeat after which a lease is stale.
+
+    Returns
+    -------
+    bool
+        True if the job is not claimed anymore.
+    """
+    lease_fn = get_lease_fn(sweep_dir, job_id)
+    try:
+        if time() - stat(lease_fn).st_mtime < lease_timeout:
+            return False
+    except FileNotFoundError:
+        return True
+
+    # Renaming is atomic, so only one worker can reclaim a stale lease
+    stale_fn = f"{lease_fn}.{get_process_id()}.stale"
+    try:
+        rename(lease_fn, stale_fn)
+    except FileNotFoundError:
+        return False
+    if time() - stat(stale_fn).st_mtime < lease_timeout:
+        # The lease was renewed or claimed again in the meantime, put it back
+        try:
+            link(stale_fn, lease_fn)
+        except OSError:
+            pass
+        remove(stale_fn)
+        return False
+
+    logger.warning(f"Reclaiming stale lease of job {job_id} ({json.load(open(stale_fn, 'r'))['worker']}).")
+    remove(stale_fn)
+    return True
+
+
+def claim_next_job(sweep_dir: str, config: Dict[str, Any], jobs: Dict[str, Dict[str, Any]],
+                   worker_id: str) -> Tuple[str, bool]:
+    """
+    Claim the next job of a sweep which must be run.
+
+    Jobs whose build data was already computed by a finished job are claimed first, then jobs whose build data
+    is not being computed by any job, and finally jobs whose build data is being computed by a running job.
+
+    Parameters
+    ----------
+    sweep_dir: str
+        Directory of the sweep.
+    config: Dict[str, Any]
+        Sweep configuration.
+    jobs: Dict[str, Dict[str, Any]]
+        Arguments of each job indexed by job identifier.
+    worker_id: str
+        Identifier of the worker.
+
+    Returns
+    -------
+    str
+        Identifier of the claimed job or None if no job could be claimed.
+    bool
+        Whether some jobs are claimed by other workers (and may still need to be run if these workers die).
+    """
+
+    def must_run(status):
+        return status is None or (status["status"] != "done" and status["attempts"] < config["max_attempts"])
+
+    groups_done, groups_running = set(), set()
+    candidates = []
+    for job_id, params in jobs.items():
+        status = read_job_status(join(sweep_dir, job_id))
+        group = get_build_group(config, params)
+        if status is not None and status["status"] == "done":
+            groups_done.add(group)
+        elif isfile(get_lease_fn(sweep_dir, job_id)) \
+                and not reclaim_stale_lease(sweep_dir, job_id, config["queue"]["lease_timeout"]):
+            groups_running.add(group)
+        elif must_run(status):
+            candidates += [(job_id, group)]
+
+    def priority(candidate):
+        _, group = candidate
+        return 0 if group in groups_done else (2 if group in groups_running else 1)
+
+    for job_id, _ in sorted(candidates, key=priority):
+        if claim_job(sweep_dir, job_id, worker_id):
+            # The job may have been run by another worker since its status was read
+            if must_run(read_job_status(join(sweep_dir, job_id))):
+                return job_id, True
+            release_lease(sweep_dir, job_id, worker_id)
+
+    return None, len(groups_running) != 0
+
+
+def write_catalog_entry(sweep_dir: str, job_id: str, status: Dict[str, Any], worker_id: str):
+    """Record a finished run of a job in the catalog of the sweep."""
+    makedirs(join(sweep_dir, "catalog"), exist_ok=True)
+    write_json(join(sweep_dir, "catalog", f"{job_id}_{status['attempts']}.json"),
+               {"job_id": job_id, "worker": worker_id, **status})
+
+
+def read_catalog(sweep_dir: str) -> pd.DataFrame:
+    """Return all the finished runs of the jobs of a sweep."""
+    entries = []
+    for entry_fn in sorted(glob(join(sweep_dir, "catalog", "*.json"))):
+        entry = json.load(open(entry_fn, 'r'))
+        entries += [{**entry.pop("params"), **entry}]
+    return pd.DataFrame(entries)
+
+
+def run_worker(sweep_dir: str, config: Dict[str, Any], max_jobs: int = None) -> List[str]:
+    """
+    Claim and run jobs of a sweep until all of them are done.
+
+    Any number of workers can run on any number of nodes sharing the sweep directory. Each worker runs one job
+    at a time and renews the lease of its job periodically. Jobs whose lease is not renewed in time
+    (e.g. because their worker crashed) are reclaimed by other workers.
+
+    Parameters
+    ----------
+    sweep_dir: str
+        Directory of the sweep.
+    config: Dict[str, Any]
+        Sweep configuration.
+    max_jobs: int (default: None)
+        Maximum number of jobs run by the worker. If None, no limit.
+
+    Returns
+    -------
+    List[str]
+        Identifiers of the jobs run by the worker.
+    """
+
+    worker_id = get_process_id()
+    jobs = get_jobs(config)
+    job_args = get_job_args(config)
+    time_series_store = get_time_series_store(config)
+    queue_params = config["queue"]
+
+    jobs_run = []
+    while max_jobs is None or len(jobs_run) < max_jobs:
+        job_id, waiting = claim_next_job(sweep_dir, config, jobs, worker_id)
+        if job_id is None:
+            if not waiting:
+                break
+            sleep(queue_params["poll_interval"])
+            continue
+        logger.info(f"Worker {worker_id} running job {jobs[job_id]}.")
+        try:
+            status = run_job(config["main"], join(sweep_dir, job_id), {**jobs[job_id], **job_args},
+                             config.get("timeout"), lambda: renew_lease(sweep_dir, job_id, worker_id),
+                             queue_params["heartbeat_interval"], time_series_store)
+            # A job still running has been reclaimed by another worker
+            if status["status"] != "running":
+                write_catalog_entry(sweep_dir, job_id, status, worker_id)
+        finally:
+            release_lease(sweep_dir, job_id, worker_id)
+        jobs_run += [job_id]
+
+    return jobs_run
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Command line arguments.')
+    parser.add_argument('-d', '--sweep_dir', type=str, required=True,
+                        help='Directory of a sweep created with projects/sweep/main.py')
+    parser.add_argument('-n', '--max_jobs', type=int, default=None, help='Maximum number of jobs run by the worker')
+    args = vars(parser.parse_args())
+
+    sweep_dir_ = join(args["sweep_dir"], "")
+    config_ = yaml.load(open(join(sweep_dir_, "config.yaml"), 'r'), Loader=yaml.FullLoader)
+    run_worker(sweep_dir_, config_, args["max_jobs"])
+    get_summary(sweep_dir_, get_jobs(config_))
@@ -2,8 +2,6 @@ from os.path import isdir
 from os import makedirs
 from time import strftime
 
-import resource
-
 import argparse
 
 from iepy.topologies.tyndp2018 import get_topology
@@ -11,6 +9,8 @@ from iepy.geographics import get_subregions
 from iepy.technologies import get_config_dict
 from iepy.load import get_load
 from network import *
+from network.resampling import resample_time_series
+from network.solvers.persistent import build_persistent_lopf, solve_persistent_lopf, sweep_persistent_lopf
 from postprocessing.results_display import *
 
 from iepy import data_path
@@ -23,11 +23,6 @@ logger = logging.getLogger(__name__)
 NHoursPerYear = 8760.
 
 
-def memory_limit():
-    rsrc = resource.RLIMIT_AS
-    resource.setrlimit(rsrc, (200e9, 200e9))
-
-
 def parse_args():
 
     parser = argparse.ArgumentParser(description='Command line arguments.')
@@ -35,6 +30,7 @@ def parse_args():
     parser.add_argument('-sr', '--spatial_res', type=float, help='Spatial resolution')
     parser.add_argument('-yr', '--year', type=str, help='Year of run')
     parser.add_argument('-th', '--threads', type=int, help='Number of threads')
+    parser.add_argument('-mem', '--memory_budget', type=float, help='Memory budget (in GB)')
     parser.add_argument('-fp-perc', '--perc_per_region', type=float,
                         help="Percentage of penetration of renewables for siting")
     parser.add_argument('-fp-tm', '--time_resolution', type=str, help="Time resolution to use for the siting.")
@@ -44,6 +40,9 @@ def parse_args():
     parser.add_argument('-excap', "--use_ex_cap", type=to_bool, help="Whether to use existing capacity",
                         default='false')
     parser.add_argument('-site', '--siting', type=to_bool, default='false', help="Whether to site or not.")
+    parser.add_argument('-wy', '--weather_years', type=str,
+                        help="Comma-separated weather years for which networks sharing the same static data "
+                             "are also exported")
 
     parsed_args = vars(parser.parse_args())
 
@@ -52,9 +51,6 @@ def parse_args():
 
 if __name__ == '__main__':
 
-    # Limit memory usage
-    memory_limit()
-
     args = parse_args()
     logger.info(args)
 
@@ -67,6 +63,11 @@ if __name__ == '__main__':
     config_fn = join(dirname(abspath(__file__)), 'config.yaml')
     config = yaml.load(open(config_fn, 'r'), Loader=yaml.FullLoader)
 
+    # Stop as soon as a stage exceeds the memory budget
+    if args["memory_budget"] is not None:
+        config["memory"]["budget"] = args["memory_budget"]
+    start_tracing(output_dir, config["memory"]["budget"])
+
     # TODO: maybe a cleaner options exists to update these parameters in files.
     solver_options = config["solver_options"][config["solver"]]
     if args["threads"] is not None:
@@ -130,7 +131,8 @@ if __name__ == '__main__':
     # Time
     timeslice = config['time']['slice']
     time_resolution = config['time']['resolution']
-    timestamps = pd.date_range(timeslice[0], timeslice[1], freq=f"{time_resolution}H")
+    # Time series are computed at hourly resolution and averaged to the time resolution once the network is built
+    timestamps = pd.date_range(timeslice[0], timeslice[1], freq="1H")
 
     # Building network
     # Add location to Generators and StorageUnits
@@ -142,6 +144,8 @@ if __name__ == '__main__':
 
     net = pypsa.Network(name="TYNDP2018 network", override_component_attrs=override_comp_attrs)
     net.set_snapshots(timestamps)
+    # Configuration used by the functionalities
+    net.config = config
 
     # Adding carriers
     for fuel in fuel_info.index[1:-1]:
@@ -164,6 +168,7 @@ if __name__ == '__main__':
         net = add_load_shedding(net, loads)
 
     # Adding pv and wind generators
+    res_candidates = None
     if config['res']['include']:
         for strategy, technologies in config['res']['strategies'].items():
             # If no technology is associated to this strategy, continue
@@ -173,7 +178,15 @@ if __name__ == '__main__':
             logger.info(f"Adding RES {technologies} generation with strategy {strategy}.")
 
             if strategy == "bus":
-                net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"])
+                net = add_res_per_bus(net, technologies, config["res"]["use_ex_cap"],
+                                      max_workers=config["res"]["build_workers"])
+            elif strategy == "no_siting" and config["res"]["column_generation"]["include"]:
+                # Candidates are only added to the network when they are attractive (see column_generation_lopf)
+                res_candidates, res_candidates_p_max_pu = \
+                    get_res_in_grid_cells(net, technologies,
+                                          config["region"], config["res"]["spatial_resolution"],
+                                          config["res"]["use_ex_cap"], config["res"]["limit_max_cap"],
+                                          config["res"]["min_cap_pot"])
             elif strategy == "no_siting":
                 net = add_res_in_grid_cells(net, technologies,
                                             config["region"], config["res"]["spatial_resolution"],
@@ -205,16 +218,63 @@ if __name__ == '__main__':
     if config["battery"]["include"]:
         net = add_batteries(net, config["battery"]["type"])
 
-    net.lopf(solver_name=config["solver"],
-             solver_logfile=f"{output_dir}solver.log",
-             solver_options=config["solver_options"][config["solver"]],
-             extra_functionality=add_extra_functionalities,
-             pyomo=True)
+    if args["weather_years"] is not None:
+        # Only the weather-dependent time series are computed for the other years
+        weather_years = [int(year) for year in args["weather_years"].split(",")]
+        export_weather_year_networks(net, weather_years, f"{output_dir}weather_years/",
+                                     transform=lambda year_net: resample_network(year_net, f"{time_resolution}H"))
+
+    # Average time series over time steps of the required resolution
+    net = resample_network(net, f"{time_resolution}H")
+    if res_candidates is not None:
+        res_candidates_p_max_pu = resample_time_series(res_candidates_p_max_pu, f"{time_resolution}H")
+
+    # Check that the model fits in memory before building it
+    fallbacks = config["memory"]["fallbacks"]
+    if res_candidates is not None:
+        # Candidates are not part of the network yet and could not be clustered with its generators
+        # (their availabilities are averaged over aggregated time steps by column_generation_lopf)
+        fallbacks = [fallback for fallback in fallbacks if fallback != "site_clustering"]
+    net = apply_memory_budget(net, config["memory"]["budget"], config["functionalities"], pyomo=config["pyomo"],
+                              fallbacks=fallbacks,
+                              max_time_aggregation=config["memory"]["max_time_aggregation"])
+
+    with trace_stage("lopf", net):
+        if res_candidates is not None:
+            column_generation = config["res"]["column_generation"]
+            history = column_generation_lopf(net, res_candidates, res_candidates_p_max_pu, config["solver"],
+                                             config["solver_options"][config["solver"]],
+                                             column_generation["nb_initial_per_bus"],
+                                             column_generation["max_columns_per_iteration"],
+                                             column_generation["reduced_cost_tolerance"],
+                                             column_generation["max_iterations"],
+                                             solver_logfile=f"{output_dir}solver.log",
+                                             extra_functionality=add_extra_functionalities,
+                                             pyomo=config["pyomo"])
+            history.to_csv(f"{output_dir}column_generation.csv")
+        elif config["persistent"]["include"]:
+            assert config["pyomo"], "Error: The persistent solver can only be used with pyomo."
+            build_persistent_lopf(net, f"{config['solver']}_persistent",
+                                  extra_functionality=add_extra_functionalities)
+            solve_persistent_lopf(net, config["solver_options"][config["solver"]], f"{output_dir}solver.log")
+        else:
+            net.lopf(solver_name=config["solver"],
+                     solver_logfile=f"{output_dir}solver.log",
+                     solver_options=config["solver_options"][config["solver"]],
+                     extra_functionality=add_extra_functionalities,
+                     pyomo=config["pyomo"])
 
     net.export_to_csv_folder(output_dir)
 
+    if res_candidates is None and config["persistent"]["include"]:
+        # Solve again the same model for each change of the functionalities
+        sweep_persistent_lopf(net, config["persistent"]["sweep"], output_dir,
+                              config["solver_options"][config["solver"]])
+
     # Display some results
     # display_generation(net)
     # display_transmission(net)
     # display_storage(net)
     # display_co2(net)
+
+    stop_tracing()
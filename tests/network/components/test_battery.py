@@ -30,3 +30,15 @@ def test_add_batteries():
         assert 0 <= su.loc[idx, "efficiency_dispatch"] <= 1
         assert 0 <= su.loc[idx, "efficiency_store"] <= 1
         assert 0 <= su.loc[idx, "self_discharge"] <= 1
+
+
+def test_get_store_links():
+    net = add_batteries(define_simple_network(), 'Li-ion', fixed_duration=False)
+    store_links = get_store_links(net)
+    assert len(store_links) == 4
+    for bus, links in store_links.iterrows():
+        assert net.links.loc[links.discharge, "bus0"] == bus
+        assert net.links.loc[links.charge, "bus1"] == bus
+    # The same mapping is rebuilt from the topology when it was not recorded
+    del net.store_links
+    assert get_store_links(net).sort_index().equals(store_links.sort_index())
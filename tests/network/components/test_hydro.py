@@ -2,6 +2,7 @@ import pytest
 
 from network.components.hydro import *
 from iepy.geographics import get_shapes
+from network.clones import clone_network
 from tests.network.utils import define_simple_network
 
 net_ = define_simple_network()
@@ -33,22 +34,22 @@ def test_add_phs_plants_wrong_topology():
 
 
 def test_add_phs_plants_missing_attributes():
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('onshore_region', axis=1)
     with pytest.raises(AssertionError):
         add_phs_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('x', axis=1)
     with pytest.raises(AssertionError):
         add_phs_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('y', axis=1)
     with pytest.raises(AssertionError):
         add_phs_plants(net, 'countries')
 
 
 def test_add_phs_plants_countries():
-    net = net_.copy()
+    net = clone_network(net_)
     net = add_phs_plants(net, 'countries')
     sus = net.storage_units
     idxs = ['ONBE Storage PHS', 'ONFR Storage PHS']
@@ -98,22 +99,22 @@ def test_add_ror_plants_wrong_topology():
 
 
 def test_add_ror_plants_missing_attributes():
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('onshore_region', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('x', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('y', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
 
 
 def test_add_ror_plants_countries():
-    net = net_.copy()
+    net = clone_network(net_)
     net = add_ror_plants(net, 'countries')
     gens = net.generators
     idxs = ['ONBE Generator ror', 'ONFR Generator ror']
@@ -157,22 +158,22 @@ def test_add_sto_plants_wrong_topology():
 
 
 def test_add_sto_plants_missing_attributes():
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('onshore_region', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('x', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
-    net = net_.copy()
+    net = clone_network(net_)
     net.buses = net.buses.drop('y', axis=1)
     with pytest.raises(AssertionError):
         add_ror_plants(net, 'countries')
 
 
 def test_add_sto_plants_countries():
-    net = net_.copy()
+    net = clone_network(net_)
     net = add_sto_plants(net, 'countries')
     sus = net.storage_units
     idxs = ['ONBE Storage reservoir', 'ONFR Storage reservoir']
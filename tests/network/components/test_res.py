@@ -1,7 +1,12 @@
 import pytest
 
+import numpy as np
+import pandas as pd
+
+import network.components.res as res
 from network.components.res import *
 from tests.network.utils import define_simple_network
+from tests.network.synthetic import define_synthetic_network
 
 
 net_ = define_simple_network()
@@ -219,4 +224,30 @@ def test_add_generators_per_bus_with_offshore():
     gen_ids = ["OFF1 Gen wind_offshore", "OFF1 Gen wind_floating"]
     for gen_id in gen_ids:
         check_gen_per_bus(gen_id, net)
-    assert net.generators.loc["OFF1 Gen wind_floating", "p_nom"] == 0
\ No newline at end of file
+    assert net.generators.loc["OFF1 Gen wind_floating", "p_nom"] == 0
+
+
+def test_add_generators_per_bus_max_workers(monkeypatch):
+    # Data of each technology only depends on its name, and of each bus on its position
+    def tech_value(tech):
+        return sum(map(ord, tech)) / 1e4
+    monkeypatch.setattr(res, "get_config_dict", lambda techs, attrs: {tech: {"filters": {}, "power_density": 1.,
+                                                                            "onshore": True} for tech in techs})
+    monkeypatch.setattr(res, "get_capacity_potential_for_shapes",
+                        lambda shapes, filters, power_density: np.array([shape.area for shape in shapes]))
+    monkeypatch.setattr(res, "get_cap_factor_for_countries",
+                        lambda tech, countries, snapshots, missing: pd.DataFrame(
+                            np.outer(np.ones(len(snapshots)), tech_value(tech) * np.arange(1, len(countries) + 1)),
+                            index=snapshots, columns=countries))
+    monkeypatch.setattr(res, "get_legacy_capacity_in_countries",
+                        lambda tech, countries: pd.Series(tech_value(tech), index=countries))
+    monkeypatch.setattr(res, "get_costs", lambda tech, nb_snapshots: (tech_value(tech), 0.))
+
+    technologies = ["pv_utility", "pv_residential", "wind_onshore"]
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=6)
+    sequential = add_generators_per_bus(net.copy(), technologies)
+    parallel = add_generators_per_bus(net.copy(), technologies, max_workers=2)
+
+    assert len(parallel.generators.index.difference(net.generators.index)) == 12
+    assert parallel.generators.equals(sequential.generators)
+    assert parallel.generators_t.p_max_pu.equals(sequential.generators_t.p_max_pu)
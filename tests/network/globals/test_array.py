@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+import network.globals.array.snsp as array_snsp
+import network.globals.array.curtailment as array_curtailment
+import network.globals.array.store as array_store
+import network.globals.array.imports as array_imports
+import network.globals.array.mga as array_mga
+import network.globals.nomopyomo.snsp as snsp
+import network.globals.nomopyomo.curtailment as curtailment
+import network.globals.nomopyomo.store as store
+import network.globals.nomopyomo.imports as imports
+import network.globals.nomopyomo.mga as mga
+from network.globals.array.expressions import LinearExpression
+from tests.network.synthetic import define_synthetic_network
+from tests.network.globals.test_nomopyomo import record_constraints, fake_get_var
+
+
+def get_terms(expr: str) -> list:
+    """Return the sorted terms of an expression written by pypsa.linopt."""
+    return sorted(expr.split("\n")[:-1])
+
+
+def assert_same_constraints(array_constraint, constraint):
+    """Check that two constraints have the same terms, senses and right-hand sides."""
+    lhs, array_lhs = constraint["lhs"], array_constraint["lhs"]
+    assert array_constraint["sense"] == constraint["sense"]
+    if isinstance(lhs, str):
+        assert get_terms(array_lhs) == get_terms(lhs)
+        assert np.isclose(array_constraint["rhs"], constraint["rhs"])
+        return
+
+    def get_values(x):
+        return x.reindex_like(array_lhs).values if isinstance(x, (pd.Series, pd.DataFrame)) \
+            else np.broadcast_to(x, array_lhs.shape)
+
+    assert array_lhs.shape == lhs.shape
+    assert all(get_terms(a) == get_terms(b) for a, b in zip(np.ravel(array_lhs.values), np.ravel(get_values(lhs))))
+    assert np.allclose(get_values(array_constraint["rhs"]), get_values(constraint["rhs"]))
+
+
+def test_linear_expression_sum_and_groupby():
+    labels = pd.DataFrame(np.arange(6).reshape(2, 3), index=["s0", "s1"], columns=["g0", "g1", "g2"])
+    expr = LinearExpression.from_variables(labels, pd.Series({"g0": 1., "g1": 2., "g2": 3.}))
+
+    assert expr.to_strings().loc["s1", "g2"] == "+3.000000 x5\n"
+    assert get_terms(expr.sum(1).to_strings()["s0"]) == ["+1.000000 x0", "+2.000000 x1", "+3.000000 x2"]
+    assert len(get_terms(expr.sum(0).sum(0).to_strings())) == 6
+
+    grouped = expr.groupby_sum(pd.Series({"g0": "B0", "g1": "B1", "g2": "B0"}), pd.Index(["B0", "B2"]), axis=1)
+    strings = grouped.to_strings()
+    assert list(strings.columns) == ["B0", "B2"]
+    assert get_terms(strings.loc["s1", "B0"]) == ["+1.000000 x3", "+3.000000 x5"]
+    assert strings.loc["s0", "B2"] == ""
+
+
+def test_snsp_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, snsp)
+    array_constraints = record_constraints(monkeypatch, array_snsp)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    snsp.add_snsp_constraint_tyndp(net, net.snapshots, 0.6)
+    array_snsp.add_snsp_constraint_tyndp(net, net.snapshots, 0.6)
+
+    assert_same_constraints(array_constraints[0], constraints[0])
+
+
+def test_curtailment_penalty_term(monkeypatch):
+    objectives = {}
+    for module in [curtailment, array_curtailment]:
+        objectives[module] = []
+        monkeypatch.setattr(module, "get_var", fake_get_var)
+        monkeypatch.setattr(module, "write_objective", lambda n, terms, o=objectives[module]: o.append(terms))
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.snapshot_weightings[:] = [1., 2., 3., 1.]
+    curtailment.add_curtailment_penalty_term(net, net.snapshots, 2.)
+    array_curtailment.add_curtailment_penalty_term(net, net.snapshots, 2.)
+
+    for array_terms, terms in zip(objectives[array_curtailment], objectives[curtailment]):
+        assert get_terms("".join(np.ravel(array_terms))) == get_terms("".join(np.ravel(terms)))
+
+
+def test_curtailment_constraints(monkeypatch):
+    constraints = record_constraints(monkeypatch, curtailment)
+    array_constraints = record_constraints(monkeypatch, array_curtailment)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.generators.loc[net.generators_t.p_max_pu.columns[0], "p_nom_extendable"] = False
+    curtailment.add_curtailment_constraints(net, net.snapshots, 0.2)
+    array_curtailment.add_curtailment_constraints(net, net.snapshots, 0.2)
+
+    assert_same_constraints(array_constraints[0], constraints[0])
+
+
+def test_store_links_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, store)
+    array_constraints = record_constraints(monkeypatch, array_store)
+    net = define_synthetic_network(nb_buses=3, nb_snapshots=4, nb_storage_per_bus=0, nb_closed_loop_storage_per_bus=1)
+    store.store_links_constraint(net, 0.8)
+    array_store.store_links_constraint(net, 0.8)
+
+    assert_same_constraints(array_constraints[0], constraints[0])
+
+
+def test_import_limit_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, imports)
+    array_constraints = record_constraints(monkeypatch, array_imports)
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=3)
+    net.snapshot_weightings[:] = [1., 3., 2.]
+    imports.add_import_limit_constraint(net, {"B000": 0.5, "B003": 0.2})
+    array_imports.add_import_limit_constraint(net, {"B000": 0.5, "B003": 0.2})
+
+    assert_same_constraints(array_constraints[0], constraints[0])
+
+
+def test_mga_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, mga)
+    array_constraints = record_constraints(monkeypatch, array_mga)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.snapshot_weightings[:] = [1., 2., 3., 1.]
+    net.objective = 100.
+    mga.add_mga_constraint(net, 0.1)
+    array_mga.add_mga_constraint(net, 0.1)
+
+    assert_same_constraints(array_constraints[0], constraints[0])
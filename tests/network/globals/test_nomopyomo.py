@@ -0,0 +1,145 @@
+from typing import List, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+import network.globals.nomopyomo.snsp as snsp
+import network.globals.nomopyomo.curtailment as curtailment
+import network.globals.nomopyomo.store as store
+import network.globals.nomopyomo.imports as imports
+import network.globals.nomopyomo.mga as mga
+from tests.network.synthetic import define_synthetic_network
+
+
+def fake_get_var(net: pypsa.Network, c: str, attr: str):
+    """Return variables numbered in the same way for all attributes, as pypsa.linopt.get_var after prepare_lopf."""
+    index = net.df(c).index
+    if attr.endswith("_nom"):
+        index = index[net.df(c)[attr + "_extendable"]]
+        return pd.Series(np.arange(len(index)), index=index)
+    return pd.DataFrame(np.arange(len(net.snapshots) * len(index)).reshape(len(net.snapshots), len(index)),
+                        index=net.snapshots, columns=index)
+
+
+def record_constraints(monkeypatch, module) -> List[Dict[str, Any]]:
+    """Replace the variables and constraints writers used by a module and return the recorded constraints."""
+    constraints = []
+    monkeypatch.setattr(module, "get_var", fake_get_var)
+    monkeypatch.setattr(module, "define_constraints",
+                        lambda n, lhs, sense, rhs, name, attr='', axes=None, spec='':
+                        constraints.append({"lhs": lhs, "sense": sense, "rhs": rhs, "name": name}))
+    return constraints
+
+
+def test_snsp_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, snsp)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    snsp.add_snsp_constraint_tyndp(net, net.snapshots, 0.6)
+
+    assert len(constraints) == 1
+    lhs = constraints[0]["lhs"]
+    assert list(lhs.index) == list(net.snapshots)
+    # One term per generator and storage unit at each snapshot
+    assert all(lhs.str.count("x") == len(net.generators) + len(net.storage_units))
+    # Non-synchronous units (wind, pv and batteries) have a positive coefficient, the others a negative one
+    assert lhs.iloc[0].count("+0.400000") == len(net.generators_t.p_max_pu.columns) + len(net.storage_units)
+    assert lhs.iloc[0].count("-0.600000") == len(net.generators) - len(net.generators_t.p_max_pu.columns)
+
+
+def test_curtailment_penalty_term(monkeypatch):
+    objective = []
+    monkeypatch.setattr(curtailment, "get_var", fake_get_var)
+    monkeypatch.setattr(curtailment, "write_objective", lambda n, terms: objective.append(terms))
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.generators.loc[net.generators.index[0], "p_nom_extendable"] = False
+    curtailment.add_curtailment_penalty_term(net, net.snapshots, 2.)
+
+    res_gens = net.generators_t.p_max_pu.columns
+    # One term per extendable generator on its capacity and one term per generator and snapshot on its generation
+    assert objective[0].shape == (len(res_gens) - 1, )
+    assert objective[0].iloc[0] == f"+{2. * net.generators_t.p_max_pu[res_gens[1]].sum():f} x0\n"
+    assert objective[1].shape == (len(net.snapshots), len(res_gens))
+    assert all(objective[1].stack().str.startswith("-2.000000"))
+
+    # Terms are weighted by the snapshot weightings
+    objective.clear()
+    net.snapshot_weightings[:] = 3.
+    curtailment.add_curtailment_penalty_term(net, net.snapshots, 2.)
+    assert objective[0].iloc[0] == f"+{6. * net.generators_t.p_max_pu[res_gens[1]].sum():f} x0\n"
+    assert all(objective[1].stack().str.startswith("-6.000000"))
+
+
+def test_curtailment_constraints(monkeypatch):
+    constraints = record_constraints(monkeypatch, curtailment)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    fixed_gen = net.generators.index[0]
+    net.generators.loc[fixed_gen, ["p_nom_extendable", "p_nom"]] = [False, 10.]
+    curtailment.add_curtailment_constraints(net, net.snapshots, 0.1)
+
+    assert len(constraints) == 1
+    lhs, rhs = constraints[0]["lhs"], constraints[0]["rhs"]
+    res_gens = net.generators_t.p_max_pu.columns
+    assert lhs.shape == rhs.shape == (len(net.snapshots), len(res_gens))
+    # No capacity variable and a constant right-hand side for the non-extendable generator
+    assert all(lhs[fixed_gen].str.count("x") == 1)
+    assert np.allclose(rhs[fixed_gen], -0.9 * 10. * net.generators_t.p_max_pu[fixed_gen])
+    assert all(lhs[res_gens[1]].str.count("x") == 2)
+    assert all(rhs[res_gens[1]] == 0.)
+
+
+def test_store_links_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, store)
+    net = define_synthetic_network(nb_buses=3, nb_snapshots=4, nb_storage_per_bus=0, nb_closed_loop_storage_per_bus=1)
+    # Pairing does not depend on the order of the links
+    net.links = net.links.sort_index(ascending=False)
+    store.store_links_constraint(net, 2.)
+
+    assert len(constraints) == 1
+    lhs = constraints[0]["lhs"]
+    assert list(lhs.index) == list(net.store_links.index)
+    link_ids = fake_get_var(net, 'Link', 'p_nom')
+    for store_bus, links in net.store_links.iterrows():
+        assert lhs[store_bus] == f"+2.000000 x{link_ids[links.discharge]}\n-1.000000 x{link_ids[links.charge]}\n"
+
+
+def test_import_limit_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, imports)
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=3)
+    imports.add_import_limit_constraint(net, {"B000": 0.5, "B003": 0.2, "B004": 1.})
+
+    assert len(constraints) == 1
+    lhs, rhs = constraints[0]["lhs"], constraints[0]["rhs"]
+    assert list(lhs.index) == list(rhs.index) == ["B000", "B003"]
+    assert np.isclose(rhs["B000"], 0.5 * net.loads_t.p_set["Load B000"].sum())
+    # B000 is the start bus of two links and B003 the end bus of two links, each with one term per snapshot
+    assert lhs["B000"].count("-1.0") == 2 * len(net.snapshots) and lhs["B000"].count("+1.0") == 0
+    assert lhs["B003"].count("+1.0") == 2 * len(net.snapshots) and lhs["B003"].count("-1.0") == 0
+
+    # Loads and flows are weighted by the snapshot weightings
+    constraints.clear()
+    net.snapshot_weightings[:] = [1., 3., 2.]
+    imports.add_import_limit_constraint(net, {"B000": 0.5})
+    lhs, rhs = constraints[0]["lhs"], constraints[0]["rhs"]
+    assert np.isclose(rhs["B000"], 0.5 * net.loads_t.p_set["Load B000"].mul(net.snapshot_weightings).sum())
+    assert lhs["B000"].count("-3.0") == 2 and lhs["B000"].count("-2.0") == 2 and lhs["B000"].count("-1.0") == 2
+
+
+def test_mga_constraint(monkeypatch):
+    constraints = record_constraints(monkeypatch, mga)
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.snapshot_weightings[:] = [1., 2., 3., 1.]
+    net.objective = 100.
+    mga.add_mga_constraint(net, 0.1)
+
+    assert len(constraints) == 1
+    lhs, rhs = constraints[0]["lhs"], constraints[0]["rhs"]
+    exist_cap_cost = sum((df.p_nom * df.capital_cost)[df.p_nom_extendable].sum()
+                         for df in [net.generators, net.storage_units, net.links])
+    assert np.isclose(rhs, 110. + exist_cap_cost)
+    # Operating costs are weighted by the snapshot weightings, as in the objective
+    gen_p = fake_get_var(net, 'Generator', 'p')
+    for s, w in net.snapshot_weightings.items():
+        for g, marginal_cost in net.generators.marginal_cost.items():
+            assert f"+{w * marginal_cost:f} x{gen_p.loc[s, g]}\n" in lhs
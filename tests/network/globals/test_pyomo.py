@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from pyomo.repn import generate_standard_repn
+
+import network.globals.pyomo.snsp as snsp
+import network.globals.pyomo.curtailment as curtailment
+import network.globals.pyomo.co2 as co2
+import network.globals.pyomo.imports as imports
+import network.globals.pyomo.dispatchable as dispatchable
+from tests.network.synthetic import define_synthetic_network, define_synthetic_pyomo_model
+
+
+def get_coefficients(expr) -> dict:
+    """Return the coefficient of each variable of a linear expression, indexed by the variable name."""
+    repn = generate_standard_repn(expr, compute_values=True)
+    return {var.name: coef for var, coef in zip(repn.linear_vars, repn.linear_coefs)}
+
+
+def define_network(nb_buses: int = 2, nb_snapshots: int = 4):
+    net = define_synthetic_network(nb_buses=nb_buses, nb_snapshots=nb_snapshots)
+    define_synthetic_pyomo_model(net)
+    return net
+
+
+def test_snsp_constraint():
+    net = define_network()
+    snsp.add_snsp_constraint_tyndp(net, net.snapshots, 0.6)
+
+    model = net.model
+    assert len(model.snsp) == len(net.snapshots)
+    coefficients = get_coefficients(model.snsp[net.snapshots[0]].body)
+    # One term per generator and storage unit, non-synchronous units (wind, pv and batteries) having
+    # a positive coefficient and the others a negative one
+    assert len(coefficients) == len(net.generators) + len(net.storage_units)
+    assert sorted(np.round(list(coefficients.values()), 6)) == \
+        [-0.6] * len(net.loads) + [0.4] * (len(net.generators_t.p_max_pu.columns) + len(net.storage_units))
+
+    # The share is a mutable parameter of the model
+    model.snsp_share = 0.5
+    assert set(np.round(list(get_coefficients(model.snsp[net.snapshots[0]].body).values()), 6)) == {-0.5, 0.5}
+
+
+def test_curtailment_constraints():
+    net = define_network()
+    curtailment.add_curtailment_constraints(net, net.snapshots, 0.1)
+
+    model = net.model
+    gens = net.generators_t.p_max_pu.columns
+    assert len(model.generation_curtailment) == len(model.limit_curtailment) == len(gens) * len(net.snapshots)
+    gen, s = gens[0], net.snapshots[1]
+    coefficients = get_coefficients(model.limit_curtailment[gen, s].body)
+    assert np.isclose(coefficients[model.generator_p_nom[gen].name], -0.1 * net.generators_t.p_max_pu.loc[s, gen])
+    assert model.generation_curtailment[gen, s].equality
+
+
+def test_curtailment_penalty_term():
+    net = define_network()
+    curtailment.add_curtailment_penalty_term(net, net.snapshots, 10.)
+
+    coefficients = get_coefficients(net.model.objective.expr)
+    curtailment_coefficients = [coef for name, coef in coefficients.items() if name.startswith("generator_c")]
+    assert curtailment_coefficients == [10.] * len(net.model.generator_c)
+
+    # Curtailment is weighted by the snapshot weightings
+    net = define_network()
+    net.snapshot_weightings[:] = 3.
+    curtailment.add_curtailment_penalty_term(net, net.snapshots, 10.)
+    coefficients = get_coefficients(net.model.objective.expr)
+    assert {coef for name, coef in coefficients.items() if name.startswith("generator_c")} == {30.}
+
+    # The cost is a mutable parameter of the model
+    net.model.curtailment_cost = 2.
+    coefficients = get_coefficients(net.model.objective.expr)
+    assert {coef for name, coef in coefficients.items() if name.startswith("generator_c")} == {6.}
+
+
+def test_co2_budgets(monkeypatch):
+    net = define_network()
+    net.generators.loc[net.generators.type == "ccgt", "carrier"] = "gas"
+    net.snapshot_weightings[:] = 2.
+    monkeypatch.setattr(co2, "get_tech_info", lambda tech, attrs: ("gas", 0.5))
+    monkeypatch.setattr(co2, "get_fuel_info", lambda fuel, attrs: pd.Series([0.2]))
+    monkeypatch.setattr(co2, "get_reference_emission_levels_for_region", lambda region, year: 8760.)
+    monkeypatch.setattr(co2, "get_co2_emission_level_for_country", lambda country, year: 8760.)
+
+    co2.add_co2_budget_global(net, "EU", 0.9, 1990)
+    constraint = net.model.generation_emissions_global
+    coefficients = get_coefficients(constraint.body)
+    # Emissions of one unit of generation of each gas generator at each (weighted) time step
+    assert len(coefficients) == len(net.loads) * len(net.snapshots)
+    assert np.allclose(list(coefficients.values()), 0.8)
+    assert np.isclose(constraint.upper(), 0.1 * 2. * len(net.snapshots))
+
+    buses = list(net.loads.bus)
+    co2.add_co2_budget_per_country(net, dict(zip(buses, [0.9, 0.5])), 1990)
+    constraints = net.model.generation_emissions_per_bus
+    assert len(get_coefficients(constraints[buses[0]].body)) == len(net.snapshots)
+    assert np.isclose(constraints[buses[1]].upper(), 0.5 * 2. * len(net.snapshots))
+
+
+def test_import_limit_constraint():
+    net = define_network(nb_buses=3)
+    net.snapshot_weightings[:] = 3.
+    buses = list(net.buses.index)
+    imports.add_import_limit_constraint(net, 0.5, buses)
+
+    constraints = net.model.import_constraint
+    assert len(constraints) == len(buses)
+    for bus in buses:
+        coefficients = get_coefficients(constraints[bus].body)
+        nb_links_in, nb_links_out = (net.links.bus1 == bus).sum(), (net.links.bus0 == bus).sum()
+        assert sorted(coefficients.values()) == \
+            [-3.] * nb_links_out * len(net.snapshots) + [3.] * nb_links_in * len(net.snapshots)
+        # Weighted load of the bus
+        assert np.isclose(constraints[bus].upper(), 0.5 * 3. * net.loads_t.p_set[f"Load {bus}"].sum())
+
+
+def test_dispatchable_constraints():
+    net = define_network()
+    dispatchable.dispatchable_capacity_lower_bound(net, dict.fromkeys(net.loads.bus, 0.5))
+    dispatchable.add_planning_reserve_constraint(net, 0.1)
+
+    model = net.model
+    bus = net.loads.bus[0]
+    peak_load = net.loads_t.p_set[f"Load {bus}"].max()
+    assert np.isclose(model.dispatchable_capacity_constraint[bus].lower(), 0.5 * peak_load)
+    assert get_coefficients(model.dispatchable_capacity_constraint[bus].body) == \
+        {model.generator_p_nom[f"{bus} Gen ccgt"].name: 1.}
+
+    coefficients = get_coefficients(model.planning_reserve_margin[bus].body)
+    # Dispatchable generators and RES generators with their capacity credit
+    assert sorted(coefficients.values()) == [0.1, 0.2, 1.]
+    assert np.isclose(model.planning_reserve_margin[bus].lower(), 1.1 * peak_load)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+
+import pypsa
+from pyomo.environ import Var, Constraint, Objective
+from pyomo.repn import generate_standard_repn
+
+import network.solvers.benders as benders
+from network.solvers.benders import get_time_blocks, build_operation_problem, build_master_problem, \
+    build_feasibility_problem, solve_operation_problem, benders_lopf
+from tests.network.synthetic import define_synthetic_network
+
+
+class LinprogSolver:
+    """Minimal replacement of a pyomo solver for linear master problems, using scipy."""
+
+    def solve(self, model):
+        variables = list(model.component_data_objects(Var))
+        positions = {id(var): i for i, var in enumerate(variables)}
+
+        def get_row(expr):
+            repn = generate_standard_repn(expr)
+            row = np.zeros(len(variables))
+            for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+                row[positions[id(var)]] += coef
+            return row, repn.constant
+
+        c, _ = get_row(next(model.component_data_objects(Objective)).expr)
+        a_ub, b_ub = [], []
+        for constraint in model.component_data_objects(Constraint):
+            row, constant = get_row(constraint.body)
+            if constraint.upper is not None:
+                a_ub, b_ub = a_ub + [row], b_ub + [constraint.upper() - constant]
+            if constraint.lower is not None:
+                a_ub, b_ub = a_ub + [-row], b_ub + [constant - constraint.lower()]
+        result = linprog(c, A_ub=np.array(a_ub) if a_ub else None, b_ub=b_ub if b_ub else None,
+                         bounds=[var.bounds for var in variables])
+        assert result.success
+        for var, x in zip(variables, result.x):
+            var.value = x
+
+
+def define_single_bus_network(load: float = 10.) -> pypsa.Network:
+    """Return a network with one bus, a constant load and one extendable generator."""
+    net = pypsa.Network()
+    net.set_snapshots(pd.date_range('2018-01-01 00:00', '2018-01-01 05:00', freq='1H'))
+    net.add("Bus", "bus")
+    net.add("Load", "load", bus="bus", p_set=load)
+    net.add("Generator", "gen", bus="bus", p_nom_extendable=True, capital_cost=1., marginal_cost=2.)
+    return net
+
+
+def test_get_time_blocks():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=48)
+    blocks = get_time_blocks(net.snapshots, nb_blocks=5)
+    assert [len(block) for block in blocks] == [10, 10, 10, 9, 9]
+    assert blocks[0].append(blocks[1:]).equals(net.snapshots)
+    assert [len(block) for block in get_time_blocks(net.snapshots, freq='D')] == [24, 24]
+
+
+def test_build_operation_problem():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=10)
+    net.config = {"pyomo": False}
+    block_net = build_operation_problem(net, net.snapshots[5:])
+
+    assert block_net.snapshots.equals(net.snapshots[5:])
+    assert block_net.config == net.config
+    assert (block_net.generators.capital_cost == 0.).all() and (block_net.links.capital_cost == 0.).all()
+    assert (net.generators.capital_cost != 0.).any()
+
+
+def test_build_master_problem():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=10)
+    net.generators.loc[net.generators.index[0], "p_nom_extendable"] = False
+    master = build_master_problem(net, 3)
+
+    assert list(master.generator_p_nom.keys()) == list(net.generators.index[1:])
+    gen = net.generators.index[1]
+    upper = net.generators.p_nom_max[gen]
+    assert master.generator_p_nom[gen].bounds == (net.generators.p_nom_min[gen], upper if np.isfinite(upper) else None)
+    assert len(master.operation_cost) == 3
+    assert len(master.cuts) == 0
+
+
+def test_build_feasibility_problem():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=10)
+    block_net = build_operation_problem(net, net.snapshots[5:])
+    feasibility_net = build_feasibility_problem(block_net)
+
+    slacks = feasibility_net.generators.index.difference(block_net.generators.index)
+    assert len(slacks) == 2 * len(net.buses)
+    assert (feasibility_net.generators.loc[slacks, "p_nom"] >= net.loads_t.p_set.sum(axis=1).max()).all()
+    assert (feasibility_net.generators.marginal_cost[block_net.generators.index] == 0.).all()
+    assert feasibility_net.generators_t.marginal_cost.empty
+    assert len(block_net.generators) == len(net.generators)
+
+
+def test_solve_operation_problem_infeasible(monkeypatch):
+    net = define_single_bus_network()
+    feasibility_net = build_feasibility_problem(net)
+
+    def lopf(n, **kwargs):
+        # Only the feasibility problem, with its slacks, can be solved
+        if "bus benders_slack_supply" not in n.generators.index:
+            return 'warning', 'infeasible'
+        n.objective = 60.
+        n.generators["benders_fix"] = 6.
+        return 'ok', 'optimal'
+    monkeypatch.setattr(pypsa.Network, "lopf", lopf)
+
+    capacities = {c: pd.Series(dtype=float) for c, _, _ in benders.investment_variables}
+    capacities["Generator"] = pd.Series([0.], index=["gen"])
+    feasible, infeasibility, gradients, results = solve_operation_problem(net, feasibility_net, capacities, "solver")
+    assert not feasible and results is None
+    assert infeasibility == 60.
+    assert gradients["Generator"]["gen"] == -6.
+
+
+def test_benders_lopf_infeasible_first_iterate(monkeypatch):
+    net = define_single_bus_network(load=10.)
+
+    def solve_operation_problem_(block_net, feasibility_net, capacities, *args):
+        # The generator can only supply the load if its capacity is larger than the load
+        nb_snapshots, capacity = len(block_net.snapshots), capacities["Generator"]["gen"]
+        gradients = {c: capacities[c] * 0. for c in capacities}
+        if capacity < 10. - 1e-6:
+            gradients["Generator"]["gen"] = -nb_snapshots
+            return False, (10. - capacity) * nb_snapshots, gradients, None
+        results = {("generators", "p"): pd.DataFrame(10., index=block_net.snapshots, columns=["gen"])}
+        return True, 2. * 10. * nb_snapshots, gradients, results
+    monkeypatch.setattr(benders, "solve_operation_problem", solve_operation_problem_)
+    monkeypatch.setattr(benders, "SolverFactory", lambda solver_name: LinprogSolver())
+
+    history = benders_lopf(net, "solver", nb_blocks=2)
+
+    # Without operational costs, the first master problem chooses no capacity
+    assert history.upper_bound.iloc[0] == np.inf
+    assert np.isclose(net.generators.p_nom_opt["gen"], 10.)
+    assert np.isclose(net.objective, 10. + 2. * 10. * len(net.snapshots))
+    assert history.gap.iloc[-1] <= 1e-3
+    assert (net.generators_t.p["gen"] == 10.).all()
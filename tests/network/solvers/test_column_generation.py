@@ -0,0 +1,51 @@
+import pandas as pd
+
+from network.solvers.column_generation import get_initial_candidates, column_generation_lopf
+from tests.network.synthetic import define_synthetic_network
+from tests.network.solvers.test_pruning import set_fake_solution
+
+
+def get_candidates(net):
+    """Remove the RES generators of a network and return them as candidates."""
+    res_gens = net.generators_t.p_max_pu.columns
+    candidates = net.generators.loc[res_gens].copy()
+    p_max_pu = net.generators_t.p_max_pu[res_gens].copy()
+    net.mremove("Generator", res_gens)
+    return candidates, p_max_pu
+
+
+def test_get_initial_candidates():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24, nb_res_sites_per_bus=4)
+    candidates, p_max_pu = get_candidates(net)
+    initial = get_initial_candidates(candidates, p_max_pu)
+
+    mean_cap_factors = p_max_pu.mean()
+    for (tech, bus), group in candidates.groupby(["type", "bus"]):
+        assert list(initial.intersection(group.index)) == [mean_cap_factors[group.index].idxmax()]
+
+    # Candidates with existing capacity are always part of the first solve
+    candidates.loc[candidates.index.difference(initial)[0], "p_nom_min"] = 1.
+    assert len(get_initial_candidates(candidates, p_max_pu)) == len(initial) + 1
+
+
+def test_column_generation_lopf():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24, nb_res_sites_per_bus=4)
+    candidates, p_max_pu = get_candidates(net)
+    solves = []
+
+    def fake_lopf(solver_name, solver_options, **kwargs):
+        # All candidates are attractive after the first solve, none after the second one
+        solves.append(list(net.generators.index))
+        set_fake_solution(net, 1e6 if len(solves) == 1 else 0., pd.Index([]))
+        net.objective = 1. / len(solves)
+        return "ok", "optimal"
+
+    net.lopf = fake_lopf
+    history = column_generation_lopf(net, candidates, p_max_pu, "gurobi", {}, max_columns_per_iteration=3)
+
+    initial = get_initial_candidates(candidates, p_max_pu)
+    assert len(solves) == 2
+    assert set(solves[0]).intersection(candidates.index) == set(initial)
+    assert len(set(solves[1]).intersection(candidates.index)) == len(initial) + 3
+    assert list(history.added) == [3, 0] and list(history.objective) == [1., 0.5]
+    assert net.generators_t.p_max_pu.columns.isin(candidates.index).all()
@@ -0,0 +1,155 @@
+from os.path import join, dirname, abspath
+import yaml
+
+import pandas as pd
+import pytest
+
+import pypsa
+from pyomo.environ import ConcreteModel, Var, Param, Constraint, Objective, NonNegativeReals
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+
+import network.solvers.persistent as persistent
+import network.globals.pyomo as funcs
+import network.globals.pyomo.co2 as co2
+from network.globals.functionalities import add_extra_functionalities
+from tests.network.synthetic import define_synthetic_network, define_synthetic_pyomo_model
+
+
+class RecordingSolver(PersistentSolver):
+    """Persistent solver recording the updates of the model instead of solving it."""
+
+    def __init__(self):
+        self.name = "recording"
+        self.removed, self.added, self.objectives = [], [], []
+
+    def remove_constraint(self, con):
+        self.removed.append(con)
+
+    def add_constraint(self, con):
+        self.added.append(con)
+
+    def set_objective(self, obj):
+        self.objectives.append(obj)
+
+
+def define_model(net):
+    """Return a model with constraints and an objective depending on mutable parameters, as functionalities."""
+    model = ConcreteModel()
+    snapshots = list(net.snapshots)
+    model.generator_p = Var(list(net.generators.index), snapshots, within=NonNegativeReals)
+    model.base = Constraint(snapshots, rule=lambda m, s: sum(m.generator_p[:, s]) >= 1.)
+    model.objective = Objective(expr=sum(model.generator_p[:, :]))
+    model.snsp_share = Param(initialize=0.6, mutable=True)
+    gen = net.generators.index[0]
+    model.snsp = Constraint(snapshots,
+                            rule=lambda m, s: m.generator_p[gen, s] <= m.snsp_share * sum(m.generator_p[:, s]))
+    model.curtailment_cost = Param(initialize=10., mutable=True)
+    model.objective.expr += model.curtailment_cost * sum(model.generator_p[gen, :])
+    return model
+
+
+def setup_network():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.model = define_model(net)
+    net.opt = RecordingSolver()
+    net.persistent_lopf = {"snapshots": net.snapshots, "formulation": "angles",
+                           "dependencies": persistent.get_parameter_dependencies(net.model, ["snsp"])}
+    return net
+
+
+def test_get_parameter_dependencies():
+    net = setup_network()
+    dependencies = net.persistent_lopf["dependencies"]
+    assert set(dependencies) == {"snsp_share", "curtailment_cost"}
+    assert len(dependencies["snsp_share"]) == len(net.snapshots)
+    assert dependencies["curtailment_cost"] == [net.model.objective]
+
+
+def test_solve_persistent_lopf_updates_parameters(monkeypatch):
+    net = setup_network()
+    solver = net.opt
+    solves = []
+    monkeypatch.setattr(persistent, "network_lopf_solve",
+                        lambda n, snapshots, formulation, solver_options, solver_logfile, free_memory,
+                        extra_postprocessing: solves.append(free_memory) or ("ok", "optimal"))
+
+    assert persistent.solve_persistent_lopf(net) == ("ok", "optimal")
+    assert solver.added == [] and solver.objectives == []
+
+    status = persistent.solve_persistent_lopf(net, parameters={"snsp_share": 0.8})
+    assert status == ("ok", "optimal")
+    assert net.model.snsp_share.value == 0.8
+    # Only the constraints depending on the parameter are replaced and the model is kept between solves
+    assert len(solver.removed) == len(solver.added) == len(net.snapshots)
+    assert all(con.parent_component().name == "snsp" for con in solver.added)
+    assert solver.objectives == []
+    assert solves == [set(), set()]
+
+    persistent.update_parameters(net, {"curtailment_cost": 5.})
+    assert solver.objectives == [net.model.objective]
+
+    with pytest.raises(AssertionError):
+        persistent.update_parameters(net, {"generator_p": 1.})
+
+
+def test_build_persistent_lopf_requires_persistent_solver(monkeypatch):
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    monkeypatch.setattr(persistent, "network_lopf_build_model", lambda n, *args, **kwargs: define_model(n))
+    monkeypatch.setattr(persistent, "network_lopf_prepare_solver", lambda n, solver_name, solver_io=None: object())
+    with pytest.raises(AssertionError):
+        persistent.build_persistent_lopf(net, "glpk")
+
+
+def test_get_parameter_dependencies_of_functionalities():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    define_synthetic_pyomo_model(net)
+    funcs.add_snsp_constraint_tyndp(net, net.snapshots, 0.6)
+    funcs.add_curtailment_constraints(net, net.snapshots, 0.1)
+
+    dependencies = persistent.get_parameter_dependencies(net.model, ["snsp", "generation_curtailment",
+                                                                     "limit_curtailment"])
+    assert set(dependencies) == {"snsp_share", "allowed_curtailment_share"}
+    assert len(dependencies["snsp_share"]) == len(net.snapshots)
+    # Curtailment is limited to 0 whatever the share when generators are not available
+    assert len(dependencies["allowed_curtailment_share"]) == (net.generators_t.p_max_pu != 0).values.sum()
+
+
+def test_sweep_persistent_lopf_with_tyndp_config(tmpdir, monkeypatch):
+    config_fn = join(dirname(abspath(__file__)), "../../../projects/tyndp2018/config.default.yaml")
+    config = yaml.load(open(config_fn, 'r'), Loader=yaml.FullLoader)
+    config["functionalities"]["snsp"]["include"] = True
+    config["persistent"]["sweep"] = [{"co2_emissions": {"mitigation_factor": 0.95}}, {"snsp": {"share": 0.8}}]
+
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    net.generators.loc[net.generators.type == "ccgt", "carrier"] = "gas"
+    net.config = config
+    monkeypatch.setattr(co2, "get_tech_info", lambda tech, attrs: ("gas", 0.5))
+    monkeypatch.setattr(co2, "get_fuel_info", lambda fuel, attrs: pd.Series([0.2]))
+    monkeypatch.setattr(co2, "get_reference_emission_levels_for_region", lambda region, year: 8760.)
+    monkeypatch.setattr(persistent, "network_lopf_build_model",
+                        lambda n, *args, **kwargs: define_synthetic_pyomo_model(n) or n.model)
+
+    def prepare_solver(n, solver_name, solver_io=None):
+        n.opt = RecordingSolver()
+        return n.opt
+    monkeypatch.setattr(persistent, "network_lopf_prepare_solver", prepare_solver)
+    solves = []
+    monkeypatch.setattr(persistent, "network_lopf_solve",
+                        lambda n, *args, **kwargs:
+                        solves.append(n.model.co2_reduction_share.value) or ("ok", "optimal"))
+    exports = []
+    monkeypatch.setattr(pypsa.Network, "export_to_csv_folder", lambda n, folder: exports.append(folder))
+
+    persistent.build_persistent_lopf(net, "gurobi_persistent", extra_functionality=add_extra_functionalities)
+    assert set(net.persistent_lopf["dependencies"]) == {"snsp_share", "co2_reduction_share"}
+
+    output_dir = f"{tmpdir}/"
+    persistent.sweep_persistent_lopf(net, config["persistent"]["sweep"], output_dir)
+
+    assert solves == [0.95, 0.95]
+    assert net.model.snsp_share.value == 0.8
+    assert exports == [f"{output_dir}sweep_0/", f"{output_dir}sweep_1/"]
+    functionalities = yaml.load(open(f"{output_dir}sweep_1/functionalities.yaml"), Loader=yaml.FullLoader)
+    assert functionalities["snsp"]["share"] == 0.8 and functionalities["co2_emissions"]["mitigation_factor"] == 0.95
+    # Only the constraints depending on updated parameters are replaced in the solver
+    assert len(net.opt.added) == 1 + len(net.snapshots)
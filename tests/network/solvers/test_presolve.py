@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+from network.solvers.presolve import reduce_generators, restore_generators
+from tests.network.synthetic import define_synthetic_network
+
+
+def define_network() -> pypsa.Network:
+    """Return a synthetic network with one duplicated, one dead and one dominated generator."""
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24)
+    gens = net.generators
+    res_gen = net.generators_t.p_max_pu.columns[0]
+    net.add("Generator", "duplicate", bus=gens.bus[res_gen], type=gens.type[res_gen], carrier=gens.carrier[res_gen],
+            p_nom_extendable=True, p_nom_max=10., capital_cost=gens.capital_cost[res_gen],
+            marginal_cost=gens.marginal_cost[res_gen], p_max_pu=net.generators_t.p_max_pu[res_gen])
+    net.add("Generator", "dead", bus="B000", type="ccgt", p_nom=10., p_max_pu=pd.Series(0., index=net.snapshots))
+    ccgt = "B000 Gen ccgt"
+    net.add("Generator", "dominated", bus="B000", type="ccgt", carrier=gens.carrier[ccgt], p_nom_extendable=True,
+            capital_cost=gens.capital_cost[ccgt] + 1., marginal_cost=gens.marginal_cost[ccgt])
+    return net
+
+
+def test_reduce_generators():
+    net = define_network()
+    res_gen = net.generators_t.p_max_pu.columns[0]
+    p_nom_max = net.generators.p_nom_max[res_gen]
+    nb_generators = len(net.generators)
+    net, report, time_series = reduce_generators(net)
+
+    assert report.reason.to_dict() == {res_gen: "representative", "duplicate": "merged",
+                                       "dead": "dead", "dominated": "dominated"}
+    assert report.replaced_by["duplicate"] == res_gen and report.replaced_by["dominated"] == "B000 Gen ccgt"
+    assert len(net.generators) == nb_generators - 3
+    assert "duplicate" not in net.generators_t.p_max_pu
+    assert (time_series["p_max_pu"]["dead"] == 0.).all()
+    assert np.isclose(net.generators.p_nom_max[res_gen], p_nom_max + 10.)
+
+
+def test_restore_generators():
+    net = define_network()
+    original_index = net.generators.index
+    res_gen = net.generators_t.p_max_pu.columns[0]
+    p_nom_max = net.generators.p_nom_max[res_gen]
+    net, report, time_series = reduce_generators(net)
+
+    # Solution using all the capacity of the representative generator
+    net.generators["p_nom_opt"] = net.generators.p_nom_max.clip(upper=1000.)
+    net.generators_t.p = pd.DataFrame(1., index=net.snapshots, columns=net.generators.index)
+    net = restore_generators(net, report, time_series)
+
+    assert set(net.generators.index) == set(original_index)
+    assert np.isclose(net.generators.p_nom_max[res_gen], p_nom_max)
+    assert np.isclose(net.generators.p_nom_opt["duplicate"], 10.)
+    assert np.isclose(net.generators.p_nom_opt[res_gen], p_nom_max)
+    assert net.generators.p_nom_opt[["dead", "dominated"]].tolist() == [10., 0.]
+    assert np.allclose(net.generators_t.p[[res_gen, "duplicate"]].sum(axis=1), 1.)
+    assert (net.generators_t.p["dead"] == 0.).all()
+    assert net.generators_t.p_max_pu["duplicate"].equals(net.generators_t.p_max_pu[res_gen])
+
+
+def test_restore_generators_time_series():
+    net = define_network()
+    res_gen = net.generators_t.p_max_pu.columns[0]
+    net.generators_t.marginal_cost = pd.DataFrame(np.arange(len(net.snapshots), dtype=float), index=net.snapshots,
+                                                  columns=["duplicate"])
+    net, report, _ = reduce_generators(net)
+    # Generators with different marginal cost series are not merged
+    assert "duplicate" not in report.index
+
+    net = define_network()
+    marginal_cost = np.arange(len(net.snapshots), dtype=float)
+    net.generators_t.marginal_cost = pd.DataFrame({res_gen: marginal_cost, "duplicate": marginal_cost},
+                                                  index=net.snapshots)
+    original = {attr: df.copy() for attr, df in net.generators_t.items() if len(df.columns) != 0}
+    net, report, time_series = reduce_generators(net)
+    assert report.reason["duplicate"] == "merged"
+    net = restore_generators(net, report, time_series)
+
+    # Dead generators keep their null availability instead of falling back to the static one
+    assert (net.generators_t.p_max_pu["dead"] == 0.).all()
+    for attr, df in original.items():
+        pd.testing.assert_frame_equal(net.generators_t[attr][df.columns], df)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+from network.solvers.pricing import get_capacity_reduced_costs
+from network.solvers.pruning import get_prunable_generators, pruned_lopf
+from tests.network.synthetic import define_synthetic_network
+
+
+def set_fake_solution(net: pypsa.Network, price: float, built: pd.Index):
+    """Set the results of a solve where only some generators are built and prices are the same everywhere."""
+    net.generators["p_nom_opt"] = 0.
+    net.generators.loc[built, "p_nom_opt"] = 1.
+    net.generators_t.p = pd.DataFrame(0., index=net.snapshots, columns=net.generators.index)
+    net.buses_t.marginal_price = pd.DataFrame(price, index=net.snapshots, columns=net.buses.index)
+
+
+def test_capacity_reduced_costs():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=4)
+    set_fake_solution(net, 100., net.generators.index)
+    gens = net.generators.loc[net.generators_t.p_max_pu.columns]
+    reduced_costs = get_capacity_reduced_costs(net, gens, net.generators_t.p_max_pu)
+
+    expected = gens.capital_cost - (100. - gens.marginal_cost) * net.generators_t.p_max_pu[gens.index].sum()
+    assert np.allclose(reduced_costs, expected)
+
+
+def test_get_prunable_generators():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24)
+    res_gens = net.generators_t.p_max_pu.columns
+    set_fake_solution(net, 0., res_gens[:1])
+
+    # Without revenues, all RES generators which are not built can be removed
+    assert list(get_prunable_generators(net)) == list(res_gens[1:])
+    # With very high prices, no generator can be removed
+    set_fake_solution(net, 1e6, res_gens[:1])
+    assert len(get_prunable_generators(net)) == 0
+
+
+def test_pruned_lopf():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24)
+    res_gens = net.generators_t.p_max_pu.columns
+    solves = []
+
+    def fake_lopf(solver_name, solver_options, **kwargs):
+        # Prices only make the first RES generator attractive after the first solve
+        solves.append((list(net.generators.index), solver_options))
+        set_fake_solution(net, 0., res_gens[:1])
+        if len(solves) > 1:
+            net.buses_t.marginal_price.loc[:, :] = 1e6
+        return "ok", "optimal"
+
+    net.lopf = fake_lopf
+    pruned = pruned_lopf(net, "gurobi", {"Crossover": 1}, {"Crossover": 0}, max_verifications=1)
+
+    assert solves[0][1] == {"Crossover": 0} and solves[1][1] == {"Crossover": 1}
+    assert set(solves[0][0]) - set(solves[1][0]) == set(res_gens[1:])
+    # Removed generators are attractive at the prices of the accurate solve, so they are added back and solved again
+    assert len(solves) == 3 and set(solves[2][0]) == set(net.generators.index)
+    assert len(pruned) == 0
+
+
+def test_pruned_lopf_time_series():
+    net = define_synthetic_network(nb_buses=2, nb_snapshots=24)
+    res_gens = net.generators_t.p_max_pu.columns
+    marginal_cost = pd.DataFrame(np.random.default_rng(0).uniform(0., 1., (len(net.snapshots), len(res_gens))),
+                                 index=net.snapshots, columns=res_gens)
+    net.generators_t.marginal_cost = marginal_cost.copy()
+    p_max_pu = net.generators_t.p_max_pu.copy()
+    solves = []
+
+    def fake_lopf(solver_name, solver_options, **kwargs):
+        solves.append(net.generators_t.marginal_cost.copy())
+        set_fake_solution(net, 0., res_gens[:1])
+        if len(solves) > 1:
+            net.buses_t.marginal_price.loc[:, :] = 1e6
+        return "ok", "optimal"
+
+    net.lopf = fake_lopf
+    pruned_lopf(net, "gurobi", {}, max_verifications=1)
+
+    # Generators added back for the verification solve and at the end get back all their time series
+    assert list(solves[1].columns) == list(res_gens[:1])
+    assert solves[2][res_gens].equals(marginal_cost)
+    assert net.generators_t.marginal_cost[res_gens].equals(marginal_cost)
+    assert net.generators_t.p_max_pu[res_gens].equals(p_max_pu[res_gens])
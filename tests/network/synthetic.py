@@ -0,0 +1,255 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from pyomo.environ import ConcreteModel, Var, Objective
+from pyomo.core.expr.numeric_expr import LinearExpression
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+
+from network.components.battery import replace_su_closed_loop
+
+# Countries cyclically associated to synthetic buses
+synthetic_countries = ["BE", "NL", "LU", "FR", "DE", "AT", "CH", "IT", "ES", "PT",
+                       "GB", "IE", "DK", "NO", "SE", "FI", "PL", "CZ", "SK", "HU"]
+
+# Technologies cyclically associated to RES sites
+synthetic_res_technologies = ["wind_onshore", "pv_utility"]
+
+
+def get_synthetic_profiles(tech: str, timestamps: pd.DatetimeIndex, nb_profiles: int,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    Return random capacity factor profiles with a shape typical of a technology.
+
+    Parameters
+    ----------
+    tech: str
+        'pv_utility' for diurnal profiles, any other technology for auto-correlated wind-like profiles.
+    timestamps: pd.DatetimeIndex
+        Time stamps of the profiles.
+    nb_profiles: int
+        Number of profiles.
+    rng: np.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        Capacity factors between 0 and 1 (time stamps x profiles).
+    """
+
+    if tech.startswith("pv"):
+        daylight = np.clip(np.sin(np.pi * (timestamps.hour.values - 6) / 12), 0., None)
+        cloudiness = rng.uniform(0.5, 1., (len(timestamps), nb_profiles))
+        return (daylight[:, np.newaxis] * cloudiness).round(3)
+
+    # First-order auto-regressive process mapped between 0 and 1
+    noise = rng.normal(0., 0.3, (len(timestamps), nb_profiles))
+    profiles = np.zeros(noise.shape)
+    profiles[0] = noise[0]
+    for t in range(1, len(timestamps)):
+        profiles[t] = 0.9 * profiles[t - 1] + noise[t]
+    return (1. / (1. + np.exp(-profiles))).round(3)
+
+
+def define_synthetic_network(nb_buses: int = 4, nb_snapshots: int = 24, nb_res_sites_per_bus: int = 2,
+                             nb_storage_per_bus: int = 1, nb_closed_loop_storage_per_bus: int = 0,
+                             nb_links: int = None, seed: int = 0) -> pypsa.Network:
+    """
+    Returns a synthetic PyPSA network which can be built without any external data.
+
+    Buses are placed on a square grid and associated to square onshore regions. Each bus has a load,
+    a set of extendable RES generators with random profiles, an extendable CCGT generator and a set of
+    extendable storage units. Buses are connected by extendable DC links.
+
+    Parameters
+    ----------
+    nb_buses: int (default: 4)
+        Number of buses.
+    nb_snapshots: int (default: 24)
+        Number of hourly time steps.
+    nb_res_sites_per_bus: int (default: 2)
+        Number of RES generators per bus.
+    nb_storage_per_bus: int (default: 1)
+        Number of storage units per bus.
+    nb_closed_loop_storage_per_bus: int (default: 0)
+        Number of storage units per bus modelled as a store connected to the bus by a charge and a discharge link
+        (as done by network.components.battery.add_batteries without fixed duration).
+    nb_links: int (default: None)
+        Number of links. By default, each bus is connected to its right and upper neighbours on the grid.
+        If a higher number is given, additional links are drawn at random.
+    seed: int (default: 0)
+        Seed of the random number generator.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Synthetic network
+    """
+
+    assert nb_buses > 0, "Error: The number of buses must be positive."
+
+    rng = np.random.default_rng(seed)
+    net = pypsa.Network()
+    net.set_snapshots(pd.date_range('2015-01-01T00:00', periods=nb_snapshots, freq='1H'))
+
+    # Buses on a grid of cells of 1 degree
+    grid_width = int(np.ceil(np.sqrt(nb_buses)))
+    buses = pd.DataFrame(index=[f"B{i:03d}" for i in range(nb_buses)])
+    buses["i"] = np.arange(nb_buses) % grid_width
+    buses["j"] = np.arange(nb_buses) // grid_width
+    buses["x"] = buses["i"] + 0.5
+    buses["y"] = 45. + buses["j"] + 0.5
+    buses["country"] = [synthetic_countries[i % len(synthetic_countries)] for i in range(nb_buses)]
+    buses["onshore_region"] = [box(x - 0.5, y - 0.5, x + 0.5, y + 0.5) for x, y in zip(buses.x, buses.y)]
+    buses["offshore_region"] = np.nan
+    net.madd("Bus", buses.index, x=buses.x, y=buses.y, country=buses.country,
+             onshore_region=buses.onshore_region, offshore_region=buses.offshore_region)
+
+    # Loads with a daily pattern
+    hours = net.snapshots.hour.values[:, np.newaxis]
+    peak_load = rng.uniform(5., 50., nb_buses)
+    loads = peak_load * (0.75 + 0.2 * np.sin(2 * np.pi * (hours - 8) / 24)
+                         + rng.normal(0., 0.02, (nb_snapshots, nb_buses)))
+    net.madd("Load", "Load " + buses.index, bus=buses.index,
+             p_set=pd.DataFrame(loads, index=net.snapshots, columns="Load " + buses.index))
+
+    # RES generators located at random points in the region of their bus
+    if nb_res_sites_per_bus > 0:
+        sites = buses.loc[buses.index.repeat(nb_res_sites_per_bus), ["x", "y"]]
+        sites["bus"] = sites.index
+        sites["tech"] = [synthetic_res_technologies[i % len(synthetic_res_technologies)]
+                         for i in range(len(sites))]
+        sites["x"] = (sites.x + rng.uniform(-0.5, 0.5, len(sites))).round(3)
+        sites["y"] = (sites.y + rng.uniform(-0.5, 0.5, len(sites))).round(3)
+        sites.index = [f"Gen {tech} {x}-{y}" for tech, x, y in zip(sites.tech, sites.x, sites.y)]
+        cap_factors = pd.DataFrame(0., index=net.snapshots, columns=sites.index)
+        for tech in sites.tech.unique():
+            tech_sites = sites.index[sites.tech == tech]
+            cap_factors[tech_sites] = get_synthetic_profiles(tech, net.snapshots, len(tech_sites), rng)
+        net.madd("Generator", sites.index, bus=sites.bus, type=sites.tech, x=sites.x, y=sites.y,
+                 p_nom_extendable=True, p_nom_max=rng.uniform(10., 100., len(sites)),
+                 capital_cost=np.where(sites.tech == "pv_utility", 40., 90.), marginal_cost=0.,
+                 p_max_pu=cap_factors)
+        # Capacity credits indexed as expected by the planning reserve margin functionality
+        net.cc_ds = pd.Series(np.where(sites.tech == "pv_utility", 0.1, 0.2),
+                              index=sites.index.str.split(' ', 1).str[1])
+
+    # Dispatchable generators
+    net.madd("Generator", buses.index, suffix=" Gen ccgt", bus=buses.index, type="ccgt",
+             p_nom_extendable=True, capital_cost=60., marginal_cost=50.)
+
+    # Storage units
+    for k in range(nb_storage_per_bus + nb_closed_loop_storage_per_bus):
+        suffix = " StorageUnit Li-ion" + ("" if k == 0 else f"_{k}")
+        net.madd("StorageUnit", buses.index, suffix=suffix, bus=buses.index, type="Li-ion",
+                 p_nom_extendable=True, max_hours=4., capital_cost=20., marginal_cost=0.1,
+                 capital_cost_e=10., marginal_cost_e=0., efficiency_dispatch=0.95, efficiency_store=0.95,
+                 standing_loss=0.001, cyclic_state_of_charge=True)
+    for su in net.storage_units.index[len(buses) * nb_storage_per_bus:]:
+        replace_su_closed_loop(net, su)
+
+    # Links between neighbouring buses and, if requested, additional random pairs of buses
+    ids = np.arange(nb_buses)
+    right = ids[(buses.i.values + 1 < grid_width) & (ids + 1 < nb_buses)]
+    up = ids[ids + grid_width < nb_buses]
+    pairs = sorted([(buses.index[k], buses.index[k + 1]) for k in right]
+                   + [(buses.index[k], buses.index[k + grid_width]) for k in up])
+    nb_links = len(pairs) if nb_links is None else nb_links
+    pairs = pairs[:nb_links]
+    existing_pairs = set(pairs)
+    max_nb_links = nb_buses * (nb_buses - 1) // 2
+    while len(pairs) < min(nb_links, max_nb_links):
+        bus0, bus1 = sorted(rng.choice(buses.index, 2, replace=False))
+        if (bus0, bus1) not in existing_pairs:
+            existing_pairs.add((bus0, bus1))
+            pairs.append((bus0, bus1))
+    if len(pairs) != 0:
+        links = pd.DataFrame(pairs, columns=["bus0", "bus1"])
+        links.index = links.bus0 + "-" + links.bus1
+        # Approximate length (in km) of the link
+        dx = (buses.x[links.bus0].values - buses.x[links.bus1].values) * 111. * np.cos(np.deg2rad(45.))
+        dy = (buses.y[links.bus0].values - buses.y[links.bus1].values) * 111.
+        links["length"] = np.sqrt(dx ** 2 + dy ** 2).round(2)
+        net.madd("Link", links.index, bus0=links.bus0, bus1=links.bus1, carrier="DC", p_min_pu=-1.,
+                 p_nom_extendable=True, length=links.length, capital_cost=links.length * 0.5)
+
+    return net
+
+
+def add_synthetic_results(net: pypsa.Network, seed: int = 0) -> pypsa.Network:
+    """
+    Fill a network with random optimal capacities and dispatch, as if it had been solved.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+    seed: int (default: 0)
+        Seed of the random number generator.
+
+    Returns
+    -------
+    net: pypsa.Network
+        Updated network
+    """
+
+    rng = np.random.default_rng(seed)
+    nb_snapshots = len(net.snapshots)
+
+    def random_dispatch(columns: List[str], low: float, high: float) -> pd.DataFrame:
+        return pd.DataFrame(rng.uniform(low, high, (nb_snapshots, len(columns))),
+                            index=net.snapshots, columns=columns)
+
+    gens = net.generators
+    gens["p_nom_opt"] = gens.p_nom + rng.uniform(0., 10., len(gens))
+    p_max_pu = get_switchable_as_dense(net, "Generator", "p_max_pu")
+    net.generators_t.p = p_max_pu * gens.p_nom_opt * random_dispatch(gens.index, 0.5, 1.)
+
+    sus = net.storage_units
+    sus["p_nom_opt"] = sus.p_nom + rng.uniform(0., 5., len(sus))
+    net.storage_units_t.p = random_dispatch(sus.index, -1., 1.) * sus.p_nom_opt
+    net.storage_units_t.spill = random_dispatch(sus.index, 0., 0.1)
+
+    links = net.links
+    links["p_nom_opt"] = links.p_nom + rng.uniform(0., 5., len(links))
+    net.links_t.p0 = random_dispatch(links.index, -1., 1.) * links.p_nom_opt
+    net.links_t.p1 = -net.links_t.p0
+
+    return net
+
+
+def define_synthetic_pyomo_model(net: pypsa.Network):
+    """
+    Give a network a pyomo model with the variables and objective of the lopf model used by the functionalities.
+
+    The model is built without pypsa.opf.network_lopf_build_model, so that functionalities can be built
+    quickly and independently of the constraints of PyPSA.
+
+    Parameters
+    ----------
+    net: pypsa.Network
+        A PyPSA Network instance.
+
+    Returns
+    -------
+    pyomo.environ.ConcreteModel
+        Model, also stored in net.model.
+    """
+
+    snapshots = list(net.snapshots)
+    model = ConcreteModel()
+    model.generator_p = Var(list(net.generators.index), snapshots)
+    model.generator_p_nom = Var(list(net.generators.index[net.generators.p_nom_extendable]))
+    model.storage_p_dispatch = Var(list(net.storage_units.index), snapshots)
+    model.storage_p_nom = Var(list(net.storage_units.index[net.storage_units.p_nom_extendable]))
+    model.link_p = Var(list(net.links.index), snapshots)
+    model.link_p_nom = Var(list(net.links.index[net.links.p_nom_extendable]))
+    model.objective = Objective(expr=LinearExpression(
+        constant=0., linear_coefs=list(net.generators.capital_cost[net.generators.p_nom_extendable]),
+        linear_vars=list(model.generator_p_nom.values())))
+    net.model = model
+    return model
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+import pypsa
+
+import network.clones as clones
+from network.clones import clone_network, load_base_network, get_base_network_clone
+from tests.network.synthetic import define_synthetic_network
+
+
+def test_clone_network_shares_time_series():
+    net = define_synthetic_network()
+    clone = clone_network(net)
+
+    assert np.shares_memory(clone.generators_t.p_max_pu.values, net.generators_t.p_max_pu.values)
+    assert clone.loads_t.p_set.equals(net.loads_t.p_set)
+    # Time series can not be modified in place, but can be replaced
+    with pytest.raises(ValueError):
+        clone.generators_t.p_max_pu.iloc[0, 0] = 0.5
+    clone.generators_t.p_max_pu = clone.generators_t.p_max_pu * 0.5
+    assert not np.allclose(clone.generators_t.p_max_pu.values, net.generators_t.p_max_pu.values)
+
+
+def test_clone_network_copies_static_data():
+    net = define_synthetic_network()
+    net.config = {"solver": "gurobi"}
+    clone = clone_network(net)
+
+    clone.generators.loc[clone.generators.index[0], "p_nom_max"] = -1.
+    assert (net.generators.p_nom_max != -1.).all()
+    assert clone.config is net.config
+    assert (clone.snapshots == net.snapshots).all()
+
+    # Time series are copied with deep
+    deep_clone = clone_network(net, deep=True)
+    deep_clone.generators_t.p_max_pu.iloc[0, 0] = 0.5
+    assert not np.shares_memory(deep_clone.generators_t.p_max_pu.values, net.generators_t.p_max_pu.values)
+
+
+def test_clone_network_drops_results():
+    net = define_synthetic_network()
+    net.generators_t.p = net.generators_t.p_max_pu.copy()
+    clone = clone_network(net)
+    assert clone.generators_t.p.empty and clone.generators_t.p.index.equals(net.snapshots)
+    assert not clone.generators_t.p_max_pu.empty
+
+
+def test_load_base_network(tmpdir, monkeypatch):
+    net_dir = tmpdir.mkdir("base")
+    net_dir.join("generators.csv").write("name\n")
+
+    imports = []
+
+    def import_synthetic_network(net, folder):
+        imports.append(folder)
+        synthetic_net = define_synthetic_network()
+        for c in synthetic_net.iterate_components():
+            net.import_components_from_dataframe(c.df, c.name)
+    monkeypatch.setattr(pypsa.Network, "import_from_csv_folder", import_synthetic_network)
+    monkeypatch.setattr(clones, "_base_networks", {})
+
+    base_net = load_base_network(str(net_dir))
+    clone = get_base_network_clone(str(net_dir))
+    assert len(imports) == 1
+    assert clone is not base_net
+    assert clone.generators.equals(base_net.generators)
+
+    # Modified folders are imported again
+    fn = str(net_dir.join("generators.csv"))
+    os.utime(fn, (os.path.getatime(fn), os.path.getmtime(fn) + 10.))
+    load_base_network(str(net_dir))
+    assert len(imports) == 2
@@ -0,0 +1,50 @@
+import json
+from os.path import join
+
+import pandas as pd
+import pytest
+
+import pypsa
+
+from network.instrumentation import start_tracing, stop_tracing, trace_stage
+from network.topology import remove_empty_buses
+
+
+def define_network() -> pypsa.Network:
+    net = pypsa.Network()
+    net.set_snapshots(pd.date_range('2015-01-01T00:00', '2015-01-01T03:00', freq='1H'))
+    net.madd("Bus", ["B1", "B2"])
+    return net
+
+
+def test_trace_stage_without_tracing():
+    net = define_network()
+    with trace_stage("add", net):
+        net.add("Load", "Load B1", bus="B1")
+    assert stop_tracing() is None
+
+
+def test_trace_stage_records(tmpdir):
+    start_tracing(str(tmpdir))
+    net = define_network()
+    with trace_stage("add", net):
+        net.add("Load", "Load B1", bus="B1")
+        net = remove_empty_buses(net)
+    tracer = stop_tracing()
+
+    assert [r["name"] for r in tracer.records] == ["network.topology.remove_empty_buses", "add"]
+    assert tracer.records[0]["depth"] == 1
+    assert tracer.records[1]["components_added"] == {"Bus": -1, "Load": 1}
+    records = json.load(open(join(str(tmpdir), "trace.json"), 'r'))
+    assert len(records) == 2
+    assert tracer.summary().loc["add", "calls"] == 1
+
+
+def test_trace_stage_memory_budget():
+    start_tracing(memory_budget=0.)
+    try:
+        with pytest.raises(MemoryError):
+            with trace_stage("add"):
+                pass
+    finally:
+        stop_tracing()
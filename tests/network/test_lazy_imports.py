@@ -0,0 +1,25 @@
+from os.path import join
+import yaml
+
+import pytest
+
+import network
+from benchmarks.import_time import time_statement, repository_dir
+
+import_time_config = yaml.load(open(join(repository_dir, "benchmarks/import_time.default.yaml"), 'r'),
+                               Loader=yaml.FullLoader)
+
+
+@pytest.mark.parametrize("params", import_time_config["statements"], ids=lambda p: p["statement"])
+def test_no_forbidden_imports(params):
+    _, modules = time_statement(params["statement"], import_time_config["baseline"], repeats=1)
+    forbidden = [m for m in modules
+                 if any(m == f or m.startswith(f + ".") for f in params["forbidden_modules"])]
+    assert forbidden == []
+
+
+def test_lazy_attributes():
+    assert set(network.__all__) <= set(dir(network))
+    assert network.remove_empty_buses.__name__ == "remove_empty_buses"
+    with pytest.raises(AttributeError):
+        network.add_nothing
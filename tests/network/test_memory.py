@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import network.memory as memory
+from network.memory import count_model_size, estimate_memory, convert_time_series_to_float32, \
+    cluster_res_generators, aggregate_snapshots, apply_memory_budget
+from tests.network.synthetic import define_synthetic_network
+
+
+def test_count_model_size_functionalities():
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=24)
+    size = count_model_size(net)
+    conf_func = {"snsp": {"include": True, "share": 0.65}}
+    assert count_model_size(net, conf_func)["constraints"] == size["constraints"] + 24
+    assert count_model_size(net, conf_func)["variables"] == size["variables"]
+
+
+def test_estimate_memory_grows_with_snapshots():
+    small = estimate_memory(define_synthetic_network(nb_snapshots=24))
+    large = estimate_memory(define_synthetic_network(nb_snapshots=240))
+    assert large["variables"] > small["variables"]
+    assert large["constraints"] > small["constraints"]
+
+
+def test_convert_time_series_to_float32():
+    net = convert_time_series_to_float32(define_synthetic_network())
+    assert (net.generators_t.p_max_pu.dtypes == np.float32).all()
+    assert (net.loads_t.p_set.dtypes == np.float32).all()
+
+
+def test_cluster_res_generators():
+    net = define_synthetic_network(nb_buses=4, nb_res_sites_per_bus=4)
+    p_nom_max = net.generators.groupby(["bus", "type"]).p_nom_max.sum()
+    net = cluster_res_generators(net)
+    res_gens = net.generators.loc[net.generators_t.p_max_pu.columns]
+    assert len(res_gens) == 4 * 2
+    assert "B000 Gen wind_onshore" in res_gens.index
+    assert np.allclose(res_gens.set_index(["bus", "type"]).p_nom_max.sort_index(), p_nom_max.loc[res_gens.bus.unique()]
+                       .loc[res_gens.set_index(["bus", "type"]).sort_index().index])
+    assert net.generators_t.p_max_pu.values.max() <= 1.
+
+
+def test_aggregate_snapshots():
+    net = define_synthetic_network(nb_snapshots=24)
+    energy = net.loads_t.p_set.sum().sum()
+    net = aggregate_snapshots(net, 3)
+    assert len(net.snapshots) == 8
+    assert (net.snapshot_weightings == 3.).all()
+    assert np.isclose(net.loads_t.p_set.multiply(net.snapshot_weightings, axis=0).sum().sum(), energy)
+
+
+def test_apply_memory_budget_fallbacks(monkeypatch):
+    # The memory of the process is fixed so that budgets do not depend on the memory used by the tests
+    monkeypatch.setattr(memory, "get_rss_gb", lambda: 1.)
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=48)
+    estimate = estimate_memory(net)
+    # Budget only leaving space for a third of the model
+    budget = estimate["baseline"] + (estimate["time_series"] + estimate["variables"] + estimate["constraints"]) / 3.
+    net = apply_memory_budget(net, budget, fallbacks=["time_aggregation"])
+    assert len(net.snapshots) in [12, 16]
+    assert net.snapshot_weightings.sum() == 48
+
+
+def test_apply_memory_budget_float32(monkeypatch):
+    monkeypatch.setattr(memory, "get_rss_gb", lambda: 1.)
+    net = define_synthetic_network(nb_buses=4, nb_snapshots=48)
+    estimate = estimate_memory(net)
+    float32_estimate = estimate_memory(convert_time_series_to_float32(define_synthetic_network(nb_buses=4,
+                                                                                               nb_snapshots=48)),
+                                       baseline=estimate["baseline"])
+    assert np.isclose(float32_estimate["time_series"], estimate["time_series"] / 2., rtol=0.1)
+    assert float32_estimate["total"] < estimate["total"]
+
+    # Budget only fitting with single precision time series: time steps are not aggregated
+    budget = (estimate["total"] + float32_estimate["total"]) / 2.
+    net = apply_memory_budget(net, budget, fallbacks=["float32", "time_aggregation"])
+    assert (net.generators_t.p_max_pu.dtypes == np.float32).all()
+    assert len(net.snapshots) == 48
+
+
+def test_apply_memory_budget_fail_fast():
+    net = define_synthetic_network()
+    with pytest.raises(MemoryError):
+        apply_memory_budget(net, 0., fallbacks=["float32"])
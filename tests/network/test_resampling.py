@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from network.resampling import get_time_step_groups, resample_time_series, resample_network, \
+    resample_time_series_to_snapshots
+from network.memory import aggregate_snapshots
+from tests.network.synthetic import define_synthetic_network
+
+
+def test_get_time_step_groups():
+    snapshots = pd.date_range("2016-01-01 00:00", "2016-01-01 07:00", freq="1H")
+    groups, new_snapshots = get_time_step_groups(snapshots, "3H")
+    assert list(groups) == [0, 0, 0, 1, 1, 1, 2, 2]
+    assert new_snapshots.equals(pd.date_range("2016-01-01 00:00", "2016-01-01 07:00", freq="3H"))
+
+
+def test_get_time_step_groups_non_contiguous_snapshots():
+    snapshots = pd.date_range("2016-01-01 00:00", periods=3, freq="1H").append(
+        pd.date_range("2016-01-01 09:00", periods=3, freq="1H"))
+    groups, new_snapshots = get_time_step_groups(snapshots, "3H")
+    assert list(groups) == [0, 0, 0, 1, 1, 1]
+    assert list(new_snapshots.hour) == [0, 9]
+
+
+def test_resample_time_series():
+    df = pd.DataFrame({"a": np.arange(6.)}, index=pd.date_range("2016-01-01", periods=6, freq="1H"))
+    assert list(resample_time_series(df, "2H").a) == [0.5, 2.5, 4.5]
+    assert list(resample_time_series(df, "3H", "sum").a) == [3., 12.]
+    with pytest.raises(AssertionError):
+        resample_time_series(df, "3H", "max")
+
+
+def test_resample_time_series_to_snapshots():
+    net = define_synthetic_network(nb_snapshots=24)
+    p_max_pu = net.generators_t.p_max_pu.copy()
+    net = aggregate_snapshots(resample_network(net, "2H"), 3)
+
+    # Time steps of 6 hours: availabilities are averaged over each of them instead of being taken at their first hour
+    resampled = resample_time_series_to_snapshots(p_max_pu, net.snapshots, net.snapshot_weightings)
+    assert resampled.index.equals(net.snapshots)
+    assert np.allclose(resampled.values, p_max_pu.groupby(np.arange(24) // 6).mean().values)
+    assert np.allclose(resampled.values, net.generators_t.p_max_pu[p_max_pu.columns].values)
+
+    # Hours outside of the time steps are ignored
+    resampled = resample_time_series_to_snapshots(p_max_pu, net.snapshots[:2], net.snapshot_weightings)
+    assert np.allclose(resampled.values, p_max_pu.iloc[:12].groupby(np.arange(12) // 6).mean().values)
+    with pytest.raises(AssertionError):
+        resample_time_series_to_snapshots(p_max_pu.iloc[:12], net.snapshots, net.snapshot_weightings)
+
+
+def test_resample_network_preserves_energy():
+    net = define_synthetic_network(nb_snapshots=48)
+    load = net.loads_t.p_set.sum()
+    res_energy = net.generators_t.p_max_pu.sum()
+    p_max_pu = net.generators_t.p_max_pu.copy()
+
+    # Partial last time step
+    net = resample_network(net, "5H")
+    assert len(net.snapshots) == 10
+    assert list(net.snapshot_weightings) == [5.] * 9 + [3.]
+    assert np.allclose(net.loads_t.p_set.multiply(net.snapshot_weightings, axis=0).sum(), load)
+    assert np.allclose(net.generators_t.p_max_pu.multiply(net.snapshot_weightings, axis=0).sum(), res_energy)
+    # Averages instead of sampling at the first hour of each time step
+    assert np.allclose(net.generators_t.p_max_pu.iloc[0], p_max_pu.iloc[:5].mean())
+
+
+def test_resample_network_hourly():
+    net = define_synthetic_network(nb_snapshots=24)
+    net = resample_network(net, "1H")
+    assert len(net.snapshots) == 24
+    assert (net.snapshot_weightings == 1.).all()
@@ -0,0 +1,35 @@
+from tests.network.synthetic import define_synthetic_network, add_synthetic_results
+
+
+def test_define_synthetic_network():
+    net = define_synthetic_network(nb_buses=9, nb_snapshots=48, nb_res_sites_per_bus=3, nb_storage_per_bus=1,
+                                   nb_closed_loop_storage_per_bus=1)
+    assert len(net.snapshots) == 48
+    assert len(net.loads) == 9
+    assert len(net.generators) == 9 * 3 + 9
+    assert len(net.storage_units) == 9
+    assert len(net.stores) == 9
+    # 12 links between neighbouring buses on a 3x3 grid and 2 links per closed-loop storage
+    assert len(net.links) == 12 + 2 * 9
+    assert net.generators_t.p_max_pu.values.min() >= 0.
+    assert net.generators_t.p_max_pu.values.max() <= 1.
+
+
+def test_define_synthetic_network_nb_links():
+    net = define_synthetic_network(nb_buses=5, nb_links=8)
+    assert len(net.links) == 8
+    assert not net.links.index.duplicated().any()
+
+
+def test_define_synthetic_network_seed():
+    net1 = define_synthetic_network(seed=1)
+    net2 = define_synthetic_network(seed=1)
+    assert net1.generators.index.equals(net2.generators.index)
+    assert net1.loads_t.p_set.equals(net2.loads_t.p_set)
+
+
+def test_add_synthetic_results():
+    net = add_synthetic_results(define_synthetic_network())
+    assert (net.generators.p_nom_opt >= net.generators.p_nom).all()
+    assert net.generators_t.p.shape == (len(net.snapshots), len(net.generators))
+    assert (net.links_t.p0 + net.links_t.p1 == 0).all().all()
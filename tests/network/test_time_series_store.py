@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from network.time_series_store import store_dir_variable, stored_time_series, get_snapshots_key
+
+
+def get_counted_compute(calls):
+    def compute(snapshots, factor=1.):
+        calls.append(len(snapshots))
+        return pd.DataFrame({"BE": factor * np.arange(len(snapshots)), "NL": np.ones(len(snapshots))},
+                            index=snapshots)
+    return compute
+
+
+def test_stored_time_series_without_store(monkeypatch):
+    monkeypatch.delenv(store_dir_variable, raising=False)
+    snapshots = pd.date_range("2016-01-01", periods=24, freq="1H")
+    calls = []
+    compute = get_counted_compute(calls)
+    for _ in range(2):
+        stored_time_series("test", get_snapshots_key(snapshots), compute, snapshots, factor=2.)
+    assert calls == [24, 24]
+
+
+def test_stored_time_series_with_store(monkeypatch, tmp_path):
+    monkeypatch.setenv(store_dir_variable, f"{tmp_path}/store/")
+    snapshots = pd.date_range("2016-01-01", periods=24, freq="1H")
+    calls = []
+    compute = get_counted_compute(calls)
+    key = get_snapshots_key(snapshots)
+    df = stored_time_series("test", key, compute, snapshots, factor=2.)
+    df_again = stored_time_series("test", key, compute, snapshots, factor=2.)
+
+    assert calls == [24]
+    pd.testing.assert_frame_equal(df, compute(snapshots, factor=2.))
+    assert df_again.index.equals(snapshots)
+    assert list(df_again.columns) == ["BE", "NL"]
+    # Stored time series are shared and therefore read-only
+    with pytest.raises(ValueError):
+        df_again.values[0, 0] = 1.
+
+    # Other inputs are stored separately
+    other_snapshots = pd.date_range("2017-01-01", periods=12, freq="1H")
+    stored_time_series("test", get_snapshots_key(other_snapshots), compute, other_snapshots)
+    assert calls == [24, 24, 12]
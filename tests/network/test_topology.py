@@ -0,0 +1,48 @@
+import pandas as pd
+
+import pypsa
+
+from network.topology import remove_empty_buses, get_incidence_matrix
+
+
+def define_star_network() -> pypsa.Network:
+    """
+    Returns a network with one central bus connected by links to three peripheral buses.
+
+    Only the central bus and the first peripheral bus have components attached to them.
+    """
+    net = pypsa.Network()
+    net.set_snapshots(pd.date_range('2015-01-01T00:00', '2015-01-01T03:00', freq='1H'))
+    net.madd("Bus", ["C", "P1", "P2", "P3"])
+    net.madd("Link", ["C-P1", "P2-C", "C-P3"], bus0=["C", "P2", "C"], bus1=["P1", "C", "P3"])
+    net.add("Load", "Load C", bus="C", p_set=1.)
+    net.add("Generator", "Gen P1", bus="P1", p_nom=1.)
+    return net
+
+
+def test_remove_empty_buses():
+    net = remove_empty_buses(define_star_network())
+    assert list(net.buses.index) == ["C", "P1"]
+    assert list(net.links.index) == ["C-P1"]
+
+
+def test_remove_empty_buses_subset():
+    net = remove_empty_buses(define_star_network(), ["P2"])
+    assert list(net.buses.index) == ["C", "P1", "P3"]
+    assert list(net.links.index) == ["C-P1", "C-P3"]
+
+
+def test_remove_empty_buses_keep_branches():
+    net = define_star_network()
+    net.add("Bus", "P4")
+    net = remove_empty_buses(net, remove_branches=False)
+    assert list(net.buses.index) == ["C", "P1", "P2", "P3"]
+    assert len(net.links) == 3
+
+
+def test_get_incidence_matrix():
+    net = define_star_network()
+    incidence = get_incidence_matrix(net.buses.index, net.links).toarray()
+    assert incidence.tolist() == [[-1, 1, -1], [1, 0, 0], [0, -1, 0], [0, 0, 1]]
+    incidence = get_incidence_matrix(net.buses.index[:2], net.links).toarray()
+    assert incidence.tolist() == [[-1, 1, -1], [1, 0, 0]]
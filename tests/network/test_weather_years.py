@@ -0,0 +1,62 @@
+from os.path import isdir
+
+import numpy as np
+import pandas as pd
+
+import pypsa
+
+from network.weather_years import move_snapshots_to_year, get_weather_year_network, build_weather_year_networks, \
+    export_weather_year_networks
+from network.resampling import resample_network
+from tests.network.synthetic import define_synthetic_network
+
+
+def get_fake_time_series(net, snapshots):
+    """Return loads of a new year, twice the ones of the base year."""
+    return {("loads", "p_set"): pd.DataFrame(2 * net.loads_t.p_set.values[:len(snapshots)], index=snapshots,
+                                             columns=net.loads_t.p_set.columns)}
+
+
+def test_move_snapshots_to_year():
+    snapshots = pd.date_range("2016-02-28 00:00", "2016-03-01 23:00", freq="1H")
+    moved = move_snapshots_to_year(snapshots, 2015)
+    assert len(moved) == 48
+    assert list(moved.index.day.unique()) == [28, 1]
+    assert (moved.dt.year == 2015).all()
+    # February 29th is kept when moving to a leap year
+    assert len(move_snapshots_to_year(snapshots, 2020)) == 72
+
+
+def test_get_weather_year_network():
+    net = define_synthetic_network(nb_snapshots=24)
+    snapshots = move_snapshots_to_year(net.snapshots, 2018)
+    year_net = get_weather_year_network(net, snapshots, get_fake_time_series(net, snapshots.values))
+
+    assert year_net.snapshots.equals(pd.DatetimeIndex(snapshots.values))
+    assert np.allclose(year_net.loads_t.p_set.values, 2 * net.loads_t.p_set.values)
+    # Static data and other time series are shared with the base network
+    assert np.shares_memory(year_net.generators.p_nom_max.values, net.generators.p_nom_max.values)
+    assert np.shares_memory(year_net.generators_t.p_max_pu.values, net.generators_t.p_max_pu.values)
+    assert year_net.generators_t.p_max_pu.index.equals(year_net.snapshots)
+    # Results written to the network of a year do not modify the base network
+    year_net.generators["p_nom_opt"] = 1.
+    assert (net.generators.p_nom_opt != 1.).all()
+
+    deep_net = get_weather_year_network(net, snapshots, {}, deep=True)
+    assert not np.shares_memory(deep_net.generators.p_nom_max.values, net.generators.p_nom_max.values)
+    assert not np.shares_memory(deep_net.generators_t.p_max_pu.values, net.generators_t.p_max_pu.values)
+
+
+def test_build_and_export_weather_year_networks(monkeypatch, tmp_path):
+    net = define_synthetic_network(nb_snapshots=24)
+    years = [year for year, _ in build_weather_year_networks(net, [2017, 2018], get_fake_time_series)]
+    assert years == [2017, 2018]
+
+    exported = []
+    monkeypatch.setattr(pypsa.Network, "export_to_csv_folder",
+                        lambda n, directory: exported.append((directory, n.snapshots[0].year, len(n.snapshots))))
+    directories = export_weather_year_networks(net, [2017, 2018], f"{tmp_path}/", get_fake_time_series,
+                                               transform=lambda n: resample_network(n, "3H"))
+    assert directories == [f"{tmp_path}/2017/", f"{tmp_path}/2018/"]
+    assert exported == [(f"{tmp_path}/2017/", 2017, 8), (f"{tmp_path}/2018/", 2018, 8)]
+    assert isdir(f"{tmp_path}/2017/")
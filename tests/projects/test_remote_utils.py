@@ -0,0 +1,33 @@
+from os import utime
+from os.path import getmtime
+
+import pandas as pd
+from shapely.geometry import box
+
+import projects.remote.utils as utils
+
+
+def test_get_truncated_shapes_cache(tmpdir, monkeypatch):
+    data_dir = tmpdir.mkdir("geographics")
+    shapes_fn = str(data_dir.join("shapes.geojson"))
+    open(shapes_fn, 'w').close()
+    monkeypatch.setattr(utils, "shapes_data_dir", str(data_dir))
+    monkeypatch.setattr(utils, "shapes_cache_dir", str(tmpdir.mkdir("cache")))
+
+    # Shapes of all countries are squares whose size changes with the data
+    reads = []
+
+    def get_shapes(countries, which):
+        reads.append(list(countries))
+        return pd.DataFrame({"geometry": [box(0., 0., len(reads), len(reads)) for _ in countries]}, index=countries)
+    monkeypatch.setattr(utils, "get_shapes", get_shapes)
+
+    bbox = (0., 0., 1.5, 1.5)
+    assert utils.get_truncated_shapes(["MA", "DZ"], bbox)["MA"].area == 1.
+    assert utils.get_truncated_shapes(["DZ"], bbox)["DZ"].area == 1.
+    assert reads == [["MA", "DZ"]]
+
+    # Modified shapes data is read again
+    utime(shapes_fn, (getmtime(shapes_fn) + 10., getmtime(shapes_fn) + 10.))
+    assert utils.get_truncated_shapes(["MA", "DZ"], bbox)["DZ"].area == 1.5 ** 2
+    assert len(reads) == 2
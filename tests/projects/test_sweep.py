@@ -0,0 +1,65 @@
+from os.path import join
+
+import pytest
+
+from projects.sweep.runner import expand_grid, get_job_id, get_nb_workers, read_job_status, run_sweep
+from network.time_series_store import store_dir_variable
+
+
+def test_expand_grid():
+    jobs = expand_grid({"year": ['2016', '2017'], "spatial_res": [0.5, 1.0], "non_eu": [None]})
+    assert len(jobs) == 4
+    assert jobs[0] == {"year": '2016', "spatial_res": 0.5, "non_eu": None}
+    assert len(set(get_job_id(params) for params in jobs)) == 4
+
+
+def test_get_nb_workers():
+    assert get_nb_workers({"threads": 16, "memory": 100}, {"threads": 4, "memory_budget": 30}) == 3
+    assert get_nb_workers({"threads": 16, "memory": None}, {"threads": 4}) == 4
+    with pytest.raises(AssertionError):
+        get_nb_workers({"threads": 2}, {"threads": 4})
+
+
+def test_run_sweep_resume(tmpdir):
+    # Script failing for one value of its argument unless a flag file exists
+    script_fn = join(str(tmpdir), "script.py")
+    flag_fn = join(str(tmpdir), "flag")
+    open(script_fn, 'w').write(
+        "import argparse, os, sys\n"
+        "parser = argparse.ArgumentParser()\n"
+        "parser.add_argument('--year')\n"
+        "parser.add_argument('--threads')\n"
+        "parser.add_argument('--output_dir')\n"
+        "args = parser.parse_args()\n"
+        f"sys.exit(1 if args.year == '2017' and not os.path.isfile({flag_fn!r}) else 0)\n")
+    config = {"main": script_fn, "grid": {"year": ['2016', '2017']}, "job_args": {"threads": 1},
+              "resources": {"threads": 2}, "build_args": ["year"], "build_cache": None, "max_attempts": 2}
+    sweep_dir = join(str(tmpdir), "sweep")
+
+    summary = run_sweep(config, sweep_dir)
+    assert list(summary.set_index("year").loc[['2016', '2017'], "status"]) == ["done", "failed"]
+
+    # Resuming only runs the failed job again
+    open(flag_fn, 'w').close()
+    summary = run_sweep(config, sweep_dir)
+    assert list(summary.set_index("year").loc[['2016', '2017'], "attempts"]) == [1, 2]
+    assert all(summary.status == "done")
+    assert read_job_status(join(sweep_dir, get_job_id({"year": '2017'})))["returncode"] == 0
+
+
+def test_run_sweep_time_series_store(tmpdir):
+    # Script failing if the time series store is not given to the job
+    script_fn = join(str(tmpdir), "script.py")
+    store_dir = join(str(tmpdir), "store")
+    open(script_fn, 'w').write(
+        "import argparse, os, sys\n"
+        "parser = argparse.ArgumentParser()\n"
+        "parser.add_argument('--year')\n"
+        "parser.add_argument('--output_dir')\n"
+        "args = parser.parse_args()\n"
+        f"sys.exit(0 if os.environ.get({store_dir_variable!r}) == {join(store_dir, '')!r} else 1)\n")
+    config = {"main": script_fn, "grid": {"year": ['2016']}, "job_args": {}, "resources": {"threads": 1},
+              "build_args": ["year"], "build_cache": None, "time_series_store": store_dir, "max_attempts": 1}
+
+    summary = run_sweep(config, join(str(tmpdir), "sweep"))
+    assert all(summary.status == "done")
@@ -0,0 +1,102 @@
+from os import makedirs, utime, environ
+from os.path import join, isfile
+from time import time
+import subprocess
+import json
+import sys
+import yaml
+
+from projects.sweep.runner import get_job_id, read_job_status, repository_dir
+from projects.sweep.work_queue import claim_job, renew_lease, release_lease, reclaim_stale_lease, \
+    get_lease_fn, read_catalog, run_worker
+
+
+def define_sweep(tmpdir, nb_years: int = 6) -> (str, dict):
+    # Script recording each of its runs
+    script_fn = join(str(tmpdir), "script.py")
+    open(script_fn, 'w').write(
+        "import argparse, os, time\n"
+        "parser = argparse.ArgumentParser()\n"
+        "parser.add_argument('--year')\n"
+        "parser.add_argument('--threads')\n"
+        "parser.add_argument('--output_dir')\n"
+        "args = parser.parse_args()\n"
+        "time.sleep(0.2)\n"
+        f"open(os.path.join({str(tmpdir)!r}, 'runs_' + args.year + '_' + str(os.getpid())), 'w').close()\n")
+    config = {"main": script_fn, "grid": {"year": [str(2010 + i) for i in range(nb_years)]},
+              "job_args": {"threads": 1}, "resources": {"threads": 1}, "build_args": [], "build_cache": None,
+              "max_attempts": 2,
+              "queue": {"heartbeat_interval": 0.1, "lease_timeout": 5., "poll_interval": 0.1}}
+    sweep_dir = join(str(tmpdir), "sweep", "")
+    makedirs(sweep_dir)
+    yaml.dump(config, open(join(sweep_dir, "config.yaml"), 'w'))
+    return sweep_dir, config
+
+
+def test_claim_and_release(tmpdir):
+    sweep_dir = str(tmpdir)
+    assert claim_job(sweep_dir, "job", "w1")
+    assert not claim_job(sweep_dir, "job", "w2")
+    assert renew_lease(sweep_dir, "job", "w1")
+    assert not renew_lease(sweep_dir, "job", "w2")
+    release_lease(sweep_dir, "job", "w2")
+    assert isfile(get_lease_fn(sweep_dir, "job"))
+    release_lease(sweep_dir, "job", "w1")
+    assert claim_job(sweep_dir, "job", "w2")
+
+
+def test_reclaim_stale_lease(tmpdir):
+    sweep_dir = str(tmpdir)
+    assert claim_job(sweep_dir, "job", "w1")
+    assert not reclaim_stale_lease(sweep_dir, "job", 60.)
+    utime(get_lease_fn(sweep_dir, "job"), (time() - 120., time() - 120.))
+    assert reclaim_stale_lease(sweep_dir, "job", 60.)
+    assert not renew_lease(sweep_dir, "job", "w1")
+    assert claim_job(sweep_dir, "job", "w2")
+
+
+def test_run_worker_after_crash(tmpdir):
+    sweep_dir, config = define_sweep(tmpdir, 2)
+    # Job left running by a worker which died
+    job_id = get_job_id({"year": '2010'})
+    makedirs(join(sweep_dir, job_id))
+    json.dump({"params": {"year": '2010'}, "status": "running", "attempts": 1},
+              open(join(sweep_dir, job_id, "status.json"), 'w'))
+    assert claim_job(sweep_dir, job_id, "dead_worker")
+    utime(get_lease_fn(sweep_dir, job_id), (time() - 60., time() - 60.))
+
+    assert sorted(run_worker(sweep_dir, config)) == sorted([job_id, get_job_id({"year": '2011'})])
+    assert read_job_status(join(sweep_dir, job_id))["attempts"] == 2
+    assert all(read_catalog(sweep_dir).status == "done")
+
+
+def test_run_worker_lease_taken_over(tmpdir):
+    sweep_dir, config = define_sweep(tmpdir, 1)
+    job_id = get_job_id({"year": '2010'})
+    # The lease is taken over by another worker while the job runs, between two heartbeats
+    config["queue"]["heartbeat_interval"] = 60.
+    open(config["main"], 'a').write(
+        f"open({get_lease_fn(sweep_dir, job_id)!r}, 'w').write('{{\"worker\": \"other_worker\"}}')\n")
+
+    assert run_worker(sweep_dir, config, max_jobs=1) == [job_id]
+    # The final status is left to the other worker
+    status = read_job_status(join(sweep_dir, job_id))
+    assert status["status"] == "running" and status["returncode"] is None
+    assert read_catalog(sweep_dir).empty
+    assert isfile(get_lease_fn(sweep_dir, job_id))
+
+
+def test_several_workers(tmpdir):
+    sweep_dir, config = define_sweep(tmpdir)
+    workers = [subprocess.Popen([sys.executable, join(repository_dir, "projects/sweep/work_queue.py"),
+                                 "-d", sweep_dir], cwd=repository_dir,
+                                env={**environ, "PYTHONPATH": repository_dir}, stderr=subprocess.DEVNULL)
+               for _ in range(3)]
+    for worker in workers:
+        assert worker.wait(timeout=120) == 0
+
+    # Each job is run exactly once
+    catalog = read_catalog(sweep_dir)
+    assert sorted(catalog.year) == sorted(config["grid"]["year"])
+    assert all(catalog.status == "done") and all(catalog.attempts == 1)
+    assert len(tmpdir.listdir(lambda p: p.basename.startswith("runs_"))) == len(config["grid"]["year"])